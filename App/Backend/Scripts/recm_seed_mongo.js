@@ -102,6 +102,7 @@ const seedRecommendationTest = async () => {
             }
         ];
 
+        const newEventIds = [];
         for (const evtData of testEvents) {
             let existingEvent = await Event.findOne({ title: evtData.title });
             const eventPayload = {
@@ -121,7 +122,7 @@ const seedRecommendationTest = async () => {
             if (!existingEvent) {
                 const newEvent = await Event.create(eventPayload);
                 console.log(`   ✅ Created Event: ${evtData.title}`);
-                await axios.post(`${PYTHON_AI_SERVICE_URL}/recommend/add/${newEvent._id}`);
+                newEventIds.push(newEvent._id.toString());
             } else {
                 console.log(`   Event exists: ${evtData.title}`);
                 existingEvent.categoryTags = evtData.categoryTags; // Ensure tags are synced
@@ -129,6 +130,12 @@ const seedRecommendationTest = async () => {
             }
         }
 
+        // Index all new events with one bulk request instead of one per event
+        if (newEventIds.length > 0) {
+            const { data } = await axios.post(`${PYTHON_AI_SERVICE_URL}/recommend/bulk/add`, { event_ids: newEventIds });
+            console.log('   AI index results:', data.results);
+        }
+
         // ----------------------------------------------------------------
         // 4. CREATE MULTIPLE TEST USERS (Varied Profiles)
         // ----------------------------------------------------------------
@@ -46,4 +46,17 @@ export const getContentBasedRecommendations = async (req, res) => {
       console.error("Rebuild Index Error:", err);
       return res.status(500).json({ error: "Rebuilding search index failed" });
     }
-  };
\ No newline at end of file
+  };
+
+  export const getIndexJobStatus = async (req, res) => {
+    try {
+      const response = await pythonClient.get(`/recommend/jobs/${req.params.jobId}`);
+      return res.json(response.data);
+    } catch (err) {
+      if (err.response?.status === 404) {
+        return res.status(404).json({ error: "Index job not found" });
+      }
+      console.error("Index Job Status Error:", err);
+      return res.status(500).json({ error: "Fetching index job status failed" });
+    }
+  };
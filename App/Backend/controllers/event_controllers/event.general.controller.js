@@ -1,6 +1,7 @@
 import Event from "../../models/event.model.js";
 import Registration from "../../models/registration.model.js";
 import SponsorAd from "../../models/sponsorad.model.js";
+import { pythonClient } from "../../services/ai.service.js";
 
 
 export const getListOfAllEvents = async (req, res) => {
@@ -168,6 +169,14 @@ export const addRatingReviewByEID = async (req, res) => {
 
     await event.save();
 
+    pythonClient.post("/recommend/interactions/rating", {
+      event_id: String(eventId),
+      user_id: String(req.user.id),
+      rating,
+    }).catch((aiError) => {
+      console.error(`AI Service: Failed to record rating for event ${eventId}`, aiError.message);
+    });
+
     res.status(201).json({ success: true, message: "Review added successfully", ratings: event.ratings });
   } catch (error) {
     res.status(500).json({ success: false, message: "Failed to add review", error: error.message });
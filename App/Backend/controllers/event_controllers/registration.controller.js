@@ -4,6 +4,7 @@ import InboxEntity from "../../models/inbox.model.js";
 import crypto from "crypto";
 import StudentTeam from "../../models/studentTeam.model.js";
 import Team from "../../models/organizerTeam.model.js";
+import { pythonClient } from "../../services/ai.service.js";
 
 const notify = async ({ type, from, to, eventId, title, description, role }) => {
   try {
@@ -138,6 +139,15 @@ export const submitRegistration = async (req, res) => {
       amountPaid: finalFee 
     });
 
+    // Let the AI service update its interaction matrix without a full rebuild
+    pythonClient.post("/recommend/interactions/registration", {
+      event_id: String(eventId),
+      user_id: String(req.user.id),
+      team_id: teamId ? String(teamId) : null,
+    }).catch((aiError) => {
+      console.error(`AI Service: Failed to record registration for event ${eventId}`, aiError.message);
+    });
+
     if (finalFee === 0 || paymentStatus === "not_required") {
       event.registrations.push(registration._id);
       await event.save();
@@ -1,4 +1,5 @@
 import User from "../models/user.model.js";
+import { pythonClient } from "../services/ai.service.js";
 import mongoose from "mongoose";
 
 export const getUserProfileById = async (req, res) => {
@@ -77,6 +78,11 @@ export const updateUserProfile = async (req, res) => {
       return res.status(404).json({ error: "User not found" });
     }
 
+    // Let the AI service drop cached recommendations built from the old profile
+    pythonClient.post(`/recommend/invalidate/${updatedUser._id}`).catch((aiError) => {
+      console.error(`AI Service: Failed to invalidate recommendations for ${updatedUser._id}`, aiError.message);
+    });
+
     // Clean the object for the frontend
     const userObject = updatedUser.toObject();
     userObject.id = userObject._id;
@@ -1,6 +1,6 @@
 import { Router } from "express";
 import auth from "../middleware/auth.middleware.js";
-import { getRecommendations, getContentBasedRecommendations, queryChatBot, rebuildSearchIndex } from "../controllers/ai.controller.js";
+import { getRecommendations, getContentBasedRecommendations, queryChatBot, rebuildSearchIndex, getIndexJobStatus } from "../controllers/ai.controller.js";
 
 const { authentication, authorizeRoles } = auth;
 
@@ -34,4 +34,11 @@ router.post(
   rebuildSearchIndex
 );
 
+router.get(
+  "/rebuild-index/:jobId",
+  authentication,
+  authorizeRoles("admin"),
+  getIndexJobStatus
+);
+
 export default router;
@@ -1,8 +1,20 @@
+import asyncio
+from functools import lru_cache
 from langgraph.graph import StateGraph, END
 from app.agent.types import State
 from app.tools.mongo_tools import generate_mongo_query, run_mongo_query, generate_answer
 
-async def chat_agent(question: str, user_role: str, user_id: str) -> str:
+# In-flight agent runs keyed on (normalized question, role, user scope).
+# Identical concurrent questions share one pipeline execution.
+_inflight: dict = {}
+
+
+def _flight_key(question: str, user_role: str, user_id: str):
+    normalized = " ".join(question.lower().split()).rstrip(" ?!.")
+    return (normalized, user_role, user_id if user_id else None)
+
+
+def build_graph():
     builder = StateGraph(State)
 
     builder.add_node("generate_mongo_query", generate_mongo_query)
@@ -14,7 +26,38 @@ async def chat_agent(question: str, user_role: str, user_id: str) -> str:
     builder.add_edge("run_mongo_query", "generate_answer")
     builder.add_edge("generate_answer", END)
 
-    graph = builder.compile()
+    return builder.compile()
+
+
+@lru_cache(maxsize=None)
+def get_graph():
+    """
+    The compiled graph, built once per process. It keeps no per-run state,
+    so concurrent requests share it.
+    """
+    return build_graph()
+
+
+async def _run_agent(question: str, user_role: str, user_id: str) -> str:
+    graph = get_graph()
 
     result = await graph.ainvoke({"question": question, "user_role": user_role, "user_id": user_id if user_id else None})
     return result.get("answer", "No answer generated.")
+
+
+async def chat_agent(question: str, user_role: str, user_id: str) -> str:
+    key = _flight_key(question, user_role, user_id)
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_run_agent(question, user_role, user_id))
+        _inflight[key] = task
+
+        def _forget(done):
+            if _inflight.get(key) is done:
+                del _inflight[key]
+
+        task.add_done_callback(_forget)
+
+    # shield: one caller disconnecting must not cancel the run the others share
+    return await asyncio.shield(task)
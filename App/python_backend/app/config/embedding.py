@@ -0,0 +1,138 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from app.config.qdrant import VECTOR_SIZE
+from app.config.metrics import observe_stage
+from app.config.lazy import LazyClient
+
+load_dotenv()
+
+# gemini (default) or local
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "gemini").lower()
+
+# all-mpnet-base-v2 natively produces 768-dim vectors (= VECTOR_SIZE)
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2")
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "4"))
+
+
+class EmbeddingProvider:
+    """
+    Turns texts into VECTOR_SIZE-dimensional vectors. Subclasses implement
+    embed_batch(); embed() splits the input into batches and runs them on a
+    shared thread pool, preserving input order.
+    """
+
+    name = "base"
+    batch_size = EMBED_BATCH_SIZE
+
+    def __init__(self, workers=EMBED_WORKERS):
+        self.workers = workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def embed_batch(self, texts):
+        raise NotImplementedError
+
+    def _timed_batch(self, texts):
+        with observe_stage(f"{self.name}_embedding"):
+            return self.embed_batch(texts)
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"embed-{self.name}")
+            return self._pool
+
+    def embed(self, texts):
+        texts = list(texts)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1 or self.workers <= 1:
+            results = [self._timed_batch(b) for b in batches]
+        else:
+            results = list(self._executor().map(self._timed_batch, batches))
+        return [vec for batch in results for vec in batch]
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    """Gemini API embeddings, truncated server-side to VECTOR_SIZE."""
+
+    name = "gemini"
+    # Gemini accepts at most 100 contents per embed_content request
+    batch_size = min(EMBED_BATCH_SIZE, 100)
+
+    def __init__(self, workers=EMBED_WORKERS):
+        super().__init__(workers)
+        from google import genai
+
+        self.client = genai.Client()
+
+    def embed_batch(self, texts):
+        from google.genai import types
+
+        response = self.client.models.embed_content(
+            model='gemini-embedding-001',
+            contents=texts,
+            config=types.EmbedContentConfig(
+                task_type='SEMANTIC_SIMILARITY',
+                # 👇 This is the crucial part that tells the API to truncate the vector
+                output_dimensionality=VECTOR_SIZE
+            )
+        )
+        return [e.values for e in response.embeddings]
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    In-process CPU embeddings via sentence-transformers (optional dependency).
+    Vectors are normalized and truncated / zero-padded to VECTOR_SIZE, so the
+    model can be swapped without touching the Qdrant collection size.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name=LOCAL_EMBEDDING_MODEL, workers=EMBED_WORKERS):
+        super().__init__(workers)
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBEDDING_PROVIDER=local requires the sentence-transformers package"
+            ) from e
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed_batch(self, texts):
+        import numpy as np
+
+        vectors = self.model.encode(
+            texts, batch_size=len(texts), normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+        dim = vectors.shape[1]
+        if dim > VECTOR_SIZE:
+            # Matryoshka-style truncation, then renormalize
+            vectors = vectors[:, :VECTOR_SIZE]
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        elif dim < VECTOR_SIZE:
+            # Zero padding leaves cosine similarity unchanged
+            vectors = np.pad(vectors, ((0, 0), (0, VECTOR_SIZE - dim)))
+        return vectors.tolist()
+
+
+PROVIDERS = {
+    "gemini": GeminiEmbeddingProvider,
+    "local": LocalEmbeddingProvider,
+}
+
+
+def get_embedding_provider(name=EMBEDDING_PROVIDER):
+    if name not in PROVIDERS:
+        raise RuntimeError(f"Unknown EMBEDDING_PROVIDER '{name}'. Expected one of: {', '.join(PROVIDERS)}")
+    return PROVIDERS[name]()
+
+
+embedding_provider = LazyClient(get_embedding_provider, "embedding provider")
@@ -0,0 +1,45 @@
+import threading
+
+
+class LazyClient:
+    """
+    Module-level stand-in for an expensive client (network handshake, model
+    load, heavy import). factory() runs on first attribute access and the
+    result is shared from then on, so importing a module that holds one
+    costs nothing. reset() drops the instance (e.g. on shutdown) and returns
+    it so the caller can close it.
+    """
+
+    def __init__(self, factory, name):
+        self._factory = factory
+        self._name = name
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+
+    @property
+    def initialized(self):
+        return self._instance is not None
+
+    def reset(self):
+        with self._lock:
+            instance, self._instance = self._instance, None
+        return instance
+
+    def __getattr__(self, item):
+        return getattr(self.resolve(), item)
+
+    def __getitem__(self, key):
+        return self.resolve()[key]
+
+    def __repr__(self):
+        state = "initialized" if self.initialized else "not initialized"
+        return f"<LazyClient {self._name} ({state})>"
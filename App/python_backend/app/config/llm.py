@@ -1,10 +1,17 @@
 import os
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
+from app.config.lazy import LazyClient
 
 load_dotenv()
 
-llm = ChatGroq(
-    model_name="openai/gpt-oss-20b",
-    temperature=0
-)
\ No newline at end of file
+
+def _make_llm():
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        model_name="openai/gpt-oss-20b",
+        temperature=0
+    )
+
+
+llm = LazyClient(_make_llm, "llm")
@@ -0,0 +1,12 @@
+import os
+import logging
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+
+def setup_logging():
+    """key=value style log lines; verbosity is controlled by LOG_LEVEL."""
+    logging.basicConfig(
+        level=LOG_LEVEL,
+        format="ts=%(asctime)s level=%(levelname)s logger=%(name)s msg=%(message)s",
+    )
@@ -0,0 +1,42 @@
+import os
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+# Per-stage latency for the recommender and bot pipelines
+STAGE_LATENCY = Histogram(
+    "cems_stage_duration_seconds",
+    "Time spent in each recommender / bot pipeline stage",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+CACHE_REQUESTS = Counter(
+    "cems_recommend_cache_requests_total",
+    "Recommendation cache lookups by outcome (hit, miss, coalesced)",
+    ["endpoint", "outcome"],
+)
+
+EMBEDDING_FAILURES = Counter(
+    "cems_embedding_failures_total",
+    "Embedding API calls that raised",
+)
+
+ZERO_VECTOR_FALLBACKS = Counter(
+    "cems_zero_vector_fallbacks_total",
+    "Embeddings replaced by an all-zero vector (empty text or API failure)",
+)
+
+
+def observe_stage(stage: str):
+    """Context manager / decorator timing one pipeline stage."""
+    return STAGE_LATENCY.labels(stage).time()
+
+
+def render_metrics():
+    """Prometheus exposition. Aggregates all workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,12 +1,123 @@
 import os
+import logging
+import threading
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import MongoClient, ReadPreference, compression_support
+from app.config.lazy import LazyClient
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 MONGO_URI = os.getenv("MONGO_URI")
 if not MONGO_URI:
     raise RuntimeError("MONGO_URI not set in .env")
 
-mongo_client = MongoClient(MONGO_URI)
-db = mongo_client['main']
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "main")
+
+# One pool per worker process is shared by every module, so size it for the
+# whole app: request threads plus the job and precompute threads.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+
+# Wire compressors in order of preference; ones this pymongo install cannot
+# use (missing zstd/snappy library) are skipped. zlib is always available.
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+
+# Recommender reads tolerate slightly stale data, so they can be served by
+# secondaries. Writes and the job/lease bookkeeping always use the primary.
+RECOMMENDER_READ_PREFERENCE = os.getenv("MONGO_RECOMMENDER_READ_PREFERENCE", "secondaryPreferred")
+READ_PREFERENCES = {
+    "primary": "PRIMARY",
+    "primaryPreferred": "PRIMARY_PREFERRED",
+    "secondary": "SECONDARY",
+    "secondaryPreferred": "SECONDARY_PREFERRED",
+    "nearest": "NEAREST",
+}
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_lazy_handles = []
+
+
+def available_compressors(names=MONGO_COMPRESSORS):
+    wanted = [n.strip() for n in names.split(",") if n.strip()]
+    # pymongo knows which library each compressor needs for this Python version
+    return [n for n in wanted if getattr(compression_support, f"_have_{n}", lambda: False)()]
+
+
+def client_options():
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "appname": "cems-python-backend",
+    }
+    compressors = available_compressors()
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
+
+def get_mongo_client():
+    """
+    The process-wide MongoClient. Created on first use; a forked child gets
+    its own client since MongoClient is not fork-safe.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = MongoClient(MONGO_URI, **client_options())
+                _client_pid = os.getpid()
+    return _client
+
+
+def get_db(read_preference=None):
+    """
+    Handle on the app database. read_preference is a mode name such as
+    "secondaryPreferred"; None uses the client default (primary).
+    """
+    client = get_mongo_client()
+    if read_preference is None:
+        return client[MONGO_DB_NAME]
+    if read_preference not in READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference '{read_preference}'. Choose from: {', '.join(READ_PREFERENCES)}")
+    mode = getattr(ReadPreference, READ_PREFERENCES[read_preference])
+    return client.get_database(MONGO_DB_NAME, read_preference=mode)
+
+
+def lazy_db(read_preference=None):
+    """
+    Module-level database handle that opens the shared client on first use
+    instead of at import time.
+    """
+    handle = LazyClient(lambda: get_db(read_preference), f"mongo:{read_preference or 'primary'}")
+    _lazy_handles.append(handle)
+    return handle
+
+
+def close_mongo_client():
+    """Close the shared client (app shutdown). A later get_db() reconnects."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            logger.info("Closed MongoDB client")
+        _client = None
+        # A closed MongoClient cannot be reused; handles must pick up the next one
+        for handle in _lazy_handles:
+            handle.reset()
+
+
+mongo_client = LazyClient(get_mongo_client, "mongo")
+db = lazy_db()
+_lazy_handles.append(mongo_client)
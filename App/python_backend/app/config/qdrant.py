@@ -1,14 +1,113 @@
 from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
 from dotenv import load_dotenv
 import os
+import logging
+from app.config.lazy import LazyClient
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 QDRANT_COLLECTION_NAME = os.getenv("QDRANT_COLLECTION_NAME")
 
-qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+# qdrant (default), local (in-process NumPy index persisted under
+# VECTOR_STORE_PATH) or auto (local only when the Qdrant server is unreachable)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "qdrant").lower()
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", "vector_store")
+VECTOR_STORE_MMAP = os.getenv("VECTOR_STORE_MMAP", "false").lower() in ("1", "true", "yes")
+# How often a worker checks the local store's files for writes made by other
+# workers (0 checks on every call)
+VECTOR_STORE_SYNC_SECONDS = float(os.getenv("VECTOR_STORE_SYNC_SECONDS", "1"))
+
+
+def _local_store():
+    from app.config.vector_store import LocalVectorStore
+
+    return LocalVectorStore(VECTOR_STORE_PATH, mmap=VECTOR_STORE_MMAP, sync_seconds=VECTOR_STORE_SYNC_SECONDS)
+
+
+def _make_client():
+    if VECTOR_STORE == "local":
+        return _local_store()
+
+    client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    if VECTOR_STORE == "auto":
+        try:
+            client.get_collections()
+        except Exception as e:
+            logger.warning("Qdrant unreachable (%s); using the local vector store at %s", e, VECTOR_STORE_PATH)
+            return _local_store()
+    return client
+
+
+qdrant_client = LazyClient(_make_client, "qdrant")
 
 COLLECTION_NAME = QDRANT_COLLECTION_NAME
-VECTOR_SIZE = 768  
+# Embedding models trained Matryoshka-style (gemini-embedding-001) can be
+# truncated to e.g. 256 dims; changing it requires a rebuild of the index.
+VECTOR_SIZE = int(os.getenv("EMBEDDING_DIMENSIONS", "768"))
+
+# Event collection storage / index settings
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none").lower()  # none, scalar or binary
+QDRANT_QUANTIZATION_ALWAYS_RAM = os.getenv("QDRANT_QUANTIZATION_ALWAYS_RAM", "true").lower() in ("1", "true", "yes")
+QDRANT_ON_DISK = os.getenv("QDRANT_ON_DISK", "false").lower() in ("1", "true", "yes")
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "0")) or None
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "0")) or None
+
+# Event search settings
+QDRANT_SEARCH_EF = int(os.getenv("QDRANT_SEARCH_EF", "0")) or None
+QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "true").lower() in ("1", "true", "yes")
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+
+
+def quantization_config(quantization=None, always_ram=None):
+    quantization = QDRANT_QUANTIZATION if quantization is None else quantization
+    always_ram = QDRANT_QUANTIZATION_ALWAYS_RAM if always_ram is None else always_ram
+    if quantization == "none":
+        return None
+    if quantization == "scalar":
+        return qmodels.ScalarQuantization(scalar=qmodels.ScalarQuantizationConfig(
+            type=qmodels.ScalarType.INT8, quantile=0.99, always_ram=always_ram
+        ))
+    if quantization == "binary":
+        return qmodels.BinaryQuantization(binary=qmodels.BinaryQuantizationConfig(always_ram=always_ram))
+    raise RuntimeError(f"Unknown QDRANT_QUANTIZATION '{quantization}'. Expected none, scalar or binary")
+
+
+def collection_config(size=None, quantization=None, on_disk=None, hnsw_m=None, hnsw_ef_construct=None):
+    """Keyword arguments for create_collection; unset values come from the environment."""
+    m = QDRANT_HNSW_M if hnsw_m is None else hnsw_m
+    ef_construct = QDRANT_HNSW_EF_CONSTRUCT if hnsw_ef_construct is None else hnsw_ef_construct
+    return {
+        "vectors_config": qmodels.VectorParams(
+            size=VECTOR_SIZE if size is None else size,
+            distance=qmodels.Distance.COSINE,
+            on_disk=QDRANT_ON_DISK if on_disk is None else on_disk,
+        ),
+        "hnsw_config": qmodels.HnswConfigDiff(m=m, ef_construct=ef_construct) if m or ef_construct else None,
+        "quantization_config": quantization_config(quantization),
+    }
+
+
+def search_params(hnsw_ef=None, quantization=None, rescore=None, oversampling=None):
+    """SearchParams for event searches, or None when everything is at Qdrant's defaults."""
+    hnsw_ef = QDRANT_SEARCH_EF if hnsw_ef is None else hnsw_ef
+    quantization = QDRANT_QUANTIZATION if quantization is None else quantization
+    quantized = None
+    if quantization != "none":
+        # Search the compressed vectors, then rescore the best
+        # oversampling * limit candidates with the original ones
+        quantized = qmodels.QuantizationSearchParams(
+            rescore=QDRANT_RESCORE if rescore is None else rescore,
+            oversampling=QDRANT_OVERSAMPLING if oversampling is None else oversampling,
+        )
+    if hnsw_ef is None and quantized is None:
+        return None
+    return qmodels.SearchParams(hnsw_ef=hnsw_ef, quantization=quantized)
+
+# Demographic (user) vectors live in their own collection so similar-user
+# lookups are a filtered vector search instead of a full scan in Python.
+USER_COLLECTION_NAME = os.getenv("QDRANT_USER_COLLECTION_NAME", "cems_user_demographics")
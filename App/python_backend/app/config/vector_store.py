@@ -0,0 +1,565 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import defaultdict
+from contextlib import nullcontext
+import numpy as np
+from qdrant_client.http import models as qmodels
+from app.config.locks import file_lock
+
+logger = logging.getLogger(__name__)
+
+# A collection on disk is a base (POINTS_FILE naming the vectors file of its
+# generation) plus a log of the upserts made since, appended instead of
+# rewriting the collection on every write
+POINTS_FILE = "points.json"
+VECTORS_FILE = "vectors.npy"  # base vectors of collections written before generations
+LOG_FILE = "updates.jsonl"
+LOG_VECTORS_FILE = "updates.f32"
+
+# The log is folded into a new base once it holds more rows than the base
+# (and at least this many), so rewrites cost O(1) amortized per point
+COMPACT_MIN_ROWS = 1000
+
+
+def _point_id(pid):
+    """Normalize ids the way Qdrant does: ints stay ints, UUID strings are canonicalized."""
+    if isinstance(pid, int):
+        return pid
+    return str(uuid.UUID(str(pid)))
+
+
+def _values(payload, key):
+    value = payload
+    for part in key.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return []
+        value = value[part]
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _hashable(value):
+    return isinstance(value, (str, int, float, bool))
+
+
+class _Snapshot:
+    """
+    Immutable view of one collection. Writers build a new snapshot and swap
+    it in, so searches never see a half-applied upsert or delete.
+    """
+
+    def __init__(self, vectors, ids, payloads, index=None):
+        self.vectors = vectors
+        self.ids = ids
+        self.payloads = payloads
+        self.index = {pid: i for i, pid in enumerate(ids)} if index is None else index
+        self._value_index = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows_by_value(self, key):
+        """value -> row numbers for one payload key, built on first use."""
+        with self._lock:
+            rows = self._value_index.get(key)
+            if rows is None:
+                grouped = defaultdict(list)
+                for row, payload in enumerate(self.payloads):
+                    for value in _values(payload, key):
+                        if _hashable(value):
+                            grouped[value].append(row)
+                rows = self._value_index[key] = {v: np.array(r) for v, r in grouped.items()}
+            return rows
+
+    def _rows_mask(self, rows):
+        mask = np.zeros(len(self), dtype=bool)
+        if len(rows):
+            mask[np.concatenate(rows) if isinstance(rows, list) else rows] = True
+        return mask
+
+    def _field_mask(self, condition):
+        match = condition.match
+        if match is not None and hasattr(match, "value"):
+            return self._rows_mask(self.rows_by_value(condition.key).get(match.value, []))
+        if match is not None and hasattr(match, "any"):
+            by_value = self.rows_by_value(condition.key)
+            return self._rows_mask([by_value[v] for v in match.any if v in by_value])
+        if match is not None and hasattr(match, "except_"):
+            excluded = set(match.except_)
+            return np.fromiter(
+                (bool(vs) and all(v not in excluded for v in vs)
+                 for vs in (_values(p, condition.key) for p in self.payloads)),
+                dtype=bool, count=len(self),
+            )
+        if match is not None:
+            raise ValueError(f"Unsupported match {type(match).__name__} on '{condition.key}'")
+
+        rng = condition.range
+        if rng is None:
+            raise ValueError(f"Unsupported condition on '{condition.key}'")
+
+        def in_range(v):
+            if not isinstance(v, (int, float)) or isinstance(v, bool):
+                return False
+            return ((rng.gt is None or v > rng.gt) and (rng.gte is None or v >= rng.gte)
+                    and (rng.lt is None or v < rng.lt) and (rng.lte is None or v <= rng.lte))
+
+        return np.fromiter(
+            (any(in_range(v) for v in _values(p, condition.key)) for p in self.payloads),
+            dtype=bool, count=len(self),
+        )
+
+    def _condition_mask(self, condition):
+        if hasattr(condition, "has_id"):
+            rows = [self.index[pid] for pid in map(_point_id, condition.has_id) if pid in self.index]
+            return self._rows_mask(np.array(rows, dtype=int))
+        if hasattr(condition, "must") or hasattr(condition, "should"):
+            return self.mask(condition)
+        return self._field_mask(condition)
+
+    def mask(self, flt):
+        """Evaluate a qdrant Filter (must / should / must_not) to a boolean row mask."""
+        mask = np.ones(len(self), dtype=bool)
+        for condition in flt.must or []:
+            mask &= self._condition_mask(condition)
+        if flt.should:
+            any_of = np.zeros(len(self), dtype=bool)
+            for condition in flt.should:
+                any_of |= self._condition_mask(condition)
+            mask &= any_of
+        for condition in flt.must_not or []:
+            mask &= ~self._condition_mask(condition)
+        return mask
+
+
+class _Collection:
+    def __init__(self, size, distance, snapshot=None, generation=None):
+        self.size = size
+        self.distance = distance
+        self.snapshot = snapshot or _Snapshot(np.empty((0, size), dtype=np.float32), [], [])
+        # snapshot.vectors is the head of this buffer; rows past it are spare
+        # capacity that appends fill without copying the collection
+        self._buffer = self.snapshot.vectors
+        # On-disk state the snapshot reflects: the base generation and
+        # POINTS_FILE it was read from or written to, and how much of the log
+        # has been applied since
+        self.generation = generation or uuid.uuid4().hex
+        self.base = None
+        self.base_rows = len(self.snapshot)
+        self.log_offset = 0
+        self.log_rows = 0
+
+    def apply(self, ids, payloads, rows):
+        """
+        Upsert normalized rows and swap in the new snapshot. New points go
+        into the buffer's spare capacity, which grows geometrically, so a
+        batch costs its own size; overwriting an existing point copies the
+        buffer first, as searches may still be reading the old snapshot.
+        """
+        if not ids:
+            return
+        snap = self.snapshot
+        n = len(snap)
+        all_ids, all_payloads, index = list(snap.ids), list(snap.payloads), dict(snap.index)
+        updates, appended = {}, []
+        for pid, payload, row in zip(ids, payloads, rows):
+            i = index.get(pid)
+            if i is None:
+                i = index[pid] = len(all_ids)
+                all_ids.append(pid)
+                all_payloads.append(payload)
+                appended.append(row)
+            else:
+                all_payloads[i] = payload
+                if i < n:
+                    updates[i] = row
+                else:
+                    appended[i - n] = row
+        end = n + len(appended)
+        buffer = self._buffer
+        if updates or len(buffer) < end or not buffer.flags.writeable:
+            capacity = end if len(buffer) >= end else max(end, 2 * len(buffer))
+            grown = np.empty((capacity, self.size), dtype=np.float32)
+            grown[:n] = buffer[:n]
+            buffer = grown
+        if appended:
+            buffer[n:end] = np.stack(appended)
+        for i, row in updates.items():
+            buffer[i] = row
+        self._buffer = buffer
+        self.snapshot = _Snapshot(buffer[:end], all_ids, all_payloads, index)
+
+    def replace(self, snapshot):
+        self.snapshot = snapshot
+        self._buffer = snapshot.vectors
+
+    def normalize(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.size)
+        if self.distance == "Cosine":
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        return vectors
+
+    def scores(self, vectors, query):
+        if self.distance == "Euclid":
+            return -np.linalg.norm(vectors - query, axis=1)
+        return vectors @ query
+
+
+class LocalVectorStore:
+    """
+    In-process replacement for the subset of QdrantClient used by the
+    recommenders. Each collection is a float32 matrix (rows normalized for
+    Cosine, so search is a single dot product) plus a JSON list of ids and
+    payloads. Payload filters are evaluated as NumPy masks over per-key
+    value indexes.
+
+    With a path, every write is persisted before it returns: upserts are
+    appended to the collection's log and the log is folded into a new base
+    generation once it outgrows the base; deletes write a new base. Writers
+    in several processes take a lock on the path, and every process picks
+    up the others' writes (a new base or log entries) when it next uses the
+    collection, checking at most every sync_seconds. Bases are
+    memory-mapped read-only when mmap=True.
+    """
+
+    def __init__(self, path=None, mmap=False, sync_seconds=1.0):
+        self.path = path
+        self.mmap = mmap
+        self.sync_seconds = sync_seconds
+        self._collections = {}
+        self._checked = {}
+        self._lock = threading.RLock()
+        if path:
+            os.makedirs(path, exist_ok=True)
+            for name in self._names_on_disk():
+                self._sync(name)
+            logger.info("Loaded %d collections from %s", len(self._collections), path)
+
+    # persistence
+    def _directory(self, name):
+        return os.path.join(self.path, name)
+
+    def _names_on_disk(self):
+        return sorted(
+            name for name in os.listdir(self.path)
+            if os.path.exists(os.path.join(self.path, name, POINTS_FILE))
+        )
+
+    @staticmethod
+    def _identity(path):
+        st = os.stat(path)
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _sync(self, name):
+        """Bring the collection in line with its files, which another process may have changed."""
+        points_path = os.path.join(self._directory(name), POINTS_FILE)
+        try:
+            identity = self._identity(points_path)
+        except FileNotFoundError:
+            self._collections.pop(name, None)
+            return
+        col = self._collections.get(name)
+        try:
+            if col is None or col.base != identity:
+                self._collections[name] = self._load(name)
+            elif not self._replay(name, col):
+                self._collections[name] = self._load(name)
+        except (FileNotFoundError, ValueError) as e:
+            # A writer replaced the base while it was being read; the next check retries
+            logger.info("Could not reload collection %s yet: %s", name, e)
+
+    def _refresh(self, name):
+        if not self.path:
+            return
+        now = time.monotonic()
+        if now - self._checked.get(name, float("-inf")) < self.sync_seconds:
+            return
+        with self._lock:
+            self._sync(name)
+            self._checked[name] = now
+
+    def _load(self, name):
+        directory = self._directory(name)
+        points_path = os.path.join(directory, POINTS_FILE)
+        identity = self._identity(points_path)
+        with open(points_path) as f:
+            meta = json.load(f)
+        vectors = np.load(os.path.join(directory, meta.get("vectors", VECTORS_FILE)),
+                          mmap_mode="r" if self.mmap else None)
+        col = _Collection(meta["size"], meta["distance"], _Snapshot(vectors, meta["ids"], meta["payloads"]),
+                          generation=meta.get("generation"))
+        col.base = identity
+        if not self._replay(name, col):
+            raise ValueError("unreadable log")
+        return col
+
+    def _replay(self, name, col):
+        """
+        Apply log entries written since col.log_offset. Returns False when
+        the log no longer continues from there (it was folded into a base).
+        """
+        directory = self._directory(name)
+        try:
+            size = os.path.getsize(os.path.join(directory, LOG_FILE))
+        except FileNotFoundError:
+            size = 0
+        if size < col.log_offset:
+            return False
+        if size == col.log_offset:
+            return True
+        with open(os.path.join(directory, LOG_FILE), "rb") as f:
+            f.seek(col.log_offset)
+            data = f.read(size - col.log_offset)
+        # A line still being written is picked up by the next check
+        complete = data[:data.rfind(b"\n") + 1]
+        ids, payloads, rows = [], [], []
+        for line in complete.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                return False
+            if entry["generation"] != col.generation:
+                continue
+            count = len(entry["ids"])
+            block = np.fromfile(os.path.join(directory, LOG_VECTORS_FILE), dtype=np.float32,
+                                count=count * col.size, offset=entry["offset"] * col.size * 4)
+            if block.size != count * col.size:
+                return False
+            ids.extend(entry["ids"])
+            payloads.extend(entry["payloads"])
+            rows.extend(block.reshape(count, col.size))
+        if ids:
+            col.apply(ids, payloads, rows)
+        col.log_offset += len(complete)
+        col.log_rows += len(ids)
+        return True
+
+    def _append(self, name, ids, payloads, rows):
+        """Persist an upsert already applied to the collection, as a log entry or by writing a new base."""
+        if not self.path or not ids:
+            return
+        col = self._collections[name]
+        if col.log_rows + len(ids) > max(col.base_rows, COMPACT_MIN_ROWS):
+            self._write_base(name)
+            return
+        directory = self._directory(name)
+        row_bytes = col.size * 4
+        with open(os.path.join(directory, LOG_VECTORS_FILE), "ab") as f:
+            # Drop a partial row left by a writer that died mid-append
+            offset = f.seek(0, os.SEEK_END) // row_bytes
+            f.truncate(offset * row_bytes)
+            f.seek(offset * row_bytes)
+            f.write(np.asarray(rows, dtype=np.float32).tobytes())
+        # Written after its vectors, so a complete line always has them
+        line = json.dumps({"generation": col.generation, "offset": offset, "ids": ids, "payloads": payloads})
+        line = (line + "\n").encode()
+        with open(os.path.join(directory, LOG_FILE), "ab") as f:
+            # Everything past what this process applied is a partial line of a dead writer
+            f.truncate(col.log_offset)
+            f.write(line)
+        col.log_offset += len(line)
+        col.log_rows += len(ids)
+
+    def _write_base(self, name):
+        """Write the collection as a new base generation and start an empty log."""
+        if not self.path:
+            return
+        directory = self._directory(name)
+        os.makedirs(directory, exist_ok=True)
+        col = self._collections[name]
+        snap = col.snapshot
+        generation = uuid.uuid4().hex
+        vectors_file = f"vectors-{generation}.npy"
+
+        tmp = os.path.join(directory, "vectors.tmp.npy")
+        np.save(tmp, np.asarray(snap.vectors))
+        os.replace(tmp, os.path.join(directory, vectors_file))
+
+        # Replacing POINTS_FILE publishes the generation
+        tmp = os.path.join(directory, "points.tmp.json")
+        with open(tmp, "w") as f:
+            json.dump({"size": col.size, "distance": col.distance, "generation": generation,
+                       "vectors": vectors_file, "ids": snap.ids, "payloads": snap.payloads}, f)
+        os.replace(tmp, os.path.join(directory, POINTS_FILE))
+        for file_name in (LOG_FILE, LOG_VECTORS_FILE):
+            open(os.path.join(directory, file_name), "wb").close()
+        # Keep the previous generation's vectors for processes still loading it
+        for file_name in os.listdir(directory):
+            if file_name.startswith("vectors") and file_name not in (vectors_file, f"vectors-{col.generation}.npy"):
+                os.remove(os.path.join(directory, file_name))
+
+        col.generation = generation
+        col.base = self._identity(os.path.join(directory, POINTS_FILE))
+        col.base_rows, col.log_offset, col.log_rows = len(snap), 0, 0
+        if self.mmap:
+            vectors = np.load(os.path.join(directory, vectors_file), mmap_mode="r")
+            col.replace(_Snapshot(vectors, snap.ids, snap.payloads, snap.index))
+
+    def _write_lock(self):
+        """Inter-process lock held while writing, so writers see each other's changes."""
+        return file_lock(self.path) if self.path else nullcontext()
+
+    def _get(self, collection_name):
+        self._refresh(collection_name)
+        col = self._collections.get(collection_name)
+        if col is None:
+            raise ValueError(f"Collection {collection_name} not found")
+        return col
+
+    # collections
+    def get_collections(self):
+        if self.path:
+            with self._lock:
+                for name in set(self._names_on_disk()) | set(self._collections):
+                    self._refresh(name)
+        return qmodels.CollectionsResponse(
+            collections=[qmodels.CollectionDescription(name=n) for n in self._collections]
+        )
+
+    def create_collection(self, collection_name, vectors_config, **kwargs):
+        with self._lock, self._write_lock():
+            if self.path:
+                self._sync(collection_name)
+            if collection_name in self._collections:
+                raise ValueError(f"Collection {collection_name} already exists")
+            distance = getattr(vectors_config.distance, "value", vectors_config.distance)
+            self._collections[collection_name] = _Collection(vectors_config.size, distance)
+            self._write_base(collection_name)
+        return True
+
+    def recreate_collection(self, collection_name, vectors_config, **kwargs):
+        self.delete_collection(collection_name)
+        return self.create_collection(collection_name, vectors_config, **kwargs)
+
+    def delete_collection(self, collection_name, **kwargs):
+        with self._lock, self._write_lock():
+            if self.path:
+                self._sync(collection_name)
+            if self._collections.pop(collection_name, None) is None:
+                return False
+            if self.path:
+                directory = self._directory(collection_name)
+                # POINTS_FILE first: without it the directory is not a collection
+                os.remove(os.path.join(directory, POINTS_FILE))
+                for file_name in os.listdir(directory):
+                    os.remove(os.path.join(directory, file_name))
+                os.rmdir(directory)
+        return True
+
+    def create_payload_index(self, collection_name, field_name, field_schema=None, **kwargs):
+        # Value indexes are built lazily for whichever keys filters touch
+        self._get(collection_name)
+
+    def count(self, collection_name, count_filter=None, exact=True):
+        snap = self._get(collection_name).snapshot
+        return qmodels.CountResult(count=len(snap) if count_filter is None else int(snap.mask(count_filter).sum()))
+
+    # points
+    def upsert(self, collection_name, points, **kwargs):
+        points = list(points)
+        with self._lock, self._write_lock():
+            if self.path:
+                self._sync(collection_name)
+            col = self._get(collection_name)
+            ids = [_point_id(point.id) for point in points]
+            payloads = [point.payload or {} for point in points]
+            rows = col.normalize([point.vector for point in points]) if points else []
+            col.apply(ids, payloads, rows)
+            self._append(collection_name, ids, payloads, rows)
+        return qmodels.UpdateResult(operation_id=0, status=qmodels.UpdateStatus.COMPLETED)
+
+    def delete(self, collection_name, points_selector, **kwargs):
+        with self._lock, self._write_lock():
+            if self.path:
+                self._sync(collection_name)
+            col = self._get(collection_name)
+            snap = col.snapshot
+            if isinstance(points_selector, list) or hasattr(points_selector, "points"):
+                flt = qmodels.Filter(must=[qmodels.HasIdCondition(
+                    has_id=list(getattr(points_selector, "points", points_selector))
+                )])
+            else:
+                flt = getattr(points_selector, "filter", points_selector)
+            keep = np.flatnonzero(~snap.mask(flt))
+            col.replace(_Snapshot(
+                np.array(snap.vectors)[keep],
+                [snap.ids[i] for i in keep],
+                [snap.payloads[i] for i in keep],
+            ))
+            self._write_base(collection_name)
+        return qmodels.UpdateResult(operation_id=0, status=qmodels.UpdateStatus.COMPLETED)
+
+    def retrieve(self, collection_name, ids, with_payload=True, with_vectors=False, **kwargs):
+        snap = self._get(collection_name).snapshot
+        records = []
+        for pid in ids:
+            row = snap.index.get(_point_id(pid))
+            if row is None:
+                continue
+            records.append(qmodels.Record(
+                id=snap.ids[row],
+                payload=snap.payloads[row] if with_payload else None,
+                vector=snap.vectors[row].tolist() if with_vectors else None,
+            ))
+        return records
+
+    def scroll(self, collection_name, scroll_filter=None, limit=10, offset=None,
+               with_payload=True, with_vectors=False, **kwargs):
+        """Pages through points in insertion order; offset is the next row number."""
+        snap = self._get(collection_name).snapshot
+        rows = np.arange(len(snap))
+        if scroll_filter is not None:
+            rows = rows[snap.mask(scroll_filter)]
+        start = offset or 0
+        page = rows[start:start + limit]
+        next_offset = start + limit if start + limit < len(rows) else None
+        return [
+            qmodels.Record(
+                id=snap.ids[i],
+                payload=snap.payloads[i] if with_payload else None,
+                vector=snap.vectors[i].tolist() if with_vectors else None,
+            )
+            for i in page
+        ], next_offset
+
+    def search(self, collection_name, query_vector, query_filter=None, limit=10, offset=0,
+               with_payload=True, with_vectors=False, score_threshold=None, **kwargs):
+        col = self._get(collection_name)
+        snap = col.snapshot
+        if not len(snap):
+            return []
+
+        scores = col.scores(snap.vectors, col.normalize(query_vector)[0])
+        candidates = np.arange(len(snap))
+        if query_filter is not None:
+            candidates = candidates[snap.mask(query_filter)]
+        if score_threshold is not None:
+            candidates = candidates[scores[candidates] >= score_threshold]
+
+        k = min(offset + limit, len(candidates))
+        if k == 0:
+            return []
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")][offset:]
+
+        return [
+            qmodels.ScoredPoint(
+                id=snap.ids[i],
+                version=0,
+                score=float(scores[i]),
+                payload=snap.payloads[i] if with_payload else None,
+                vector=snap.vectors[i].tolist() if with_vectors else None,
+            )
+            for i in top
+        ]
+
+    def close(self, **kwargs):
+        # Every write is already persisted; nothing to flush
+        pass
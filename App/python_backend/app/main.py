@@ -1,8 +1,35 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from app.config.log import setup_logging
+from app.config.metrics import render_metrics
+from app.config.mongo import close_mongo_client
+from app.config.qdrant import qdrant_client
 from app.router import recommender_router, bot_router
-from app.recommender.utils import start_periodic_rebuild
+from app.recommender.utils import start_periodic_rebuild, start_delta_sync, REBUILD_INTERVAL_HOURS, DELTA_SYNC_SECONDS
+from app.warmup import readiness, start_warm_up
 
-app = FastAPI(title="Backend that handles AI/ML part")
+setup_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients (Mongo, Qdrant, embeddings, LLM) are opened by the background
+    # warm-up; /ready reports 503 until it is done
+    stop_warm_up = start_warm_up()
+    stop_scheduler = start_periodic_rebuild(REBUILD_INTERVAL_HOURS) if REBUILD_INTERVAL_HOURS > 0 else None
+    # Replays other workers' interaction deltas and cache invalidations
+    stop_delta_sync = start_delta_sync(DELTA_SYNC_SECONDS) if DELTA_SYNC_SECONDS > 0 else None
+    yield
+    stop_warm_up()
+    if stop_scheduler is not None:
+        stop_scheduler()
+    if stop_delta_sync is not None:
+        stop_delta_sync()
+    vector_store = qdrant_client.reset()
+    if vector_store is not None:
+        vector_store.close()
+    close_mongo_client()
+
+app = FastAPI(title="Backend that handles AI/ML part", lifespan=lifespan)
 
 app.include_router(bot_router.router)
 app.include_router(recommender_router.router)
@@ -11,3 +38,15 @@ app.include_router(recommender_router.router)
 def root():
     return {"message": "Welcome to the Recommendation System"}
 
+@app.get("/ready")
+def ready(response: Response):
+    report = readiness.report()
+    if not report["ready"]:
+        response.status_code = 503
+    return report
+
+@app.get("/metrics")
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
@@ -0,0 +1,202 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+from app.recommender.ids import IdIndex
+from app.recommender.snapshot import current_generation, read_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Implicit-feedback ALS (Hu, Koren & Volinsky 2008). A rating r (or 1 for a
+# registration) is an observed preference with confidence 1 + ALPHA * r.
+ALS_FACTORS = int(os.getenv("ALS_FACTORS", "32"))
+ALS_ITERATIONS = int(os.getenv("ALS_ITERATIONS", "15"))
+ALS_REGULARIZATION = float(os.getenv("ALS_REGULARIZATION", "0.1"))
+ALS_ALPHA = float(os.getenv("ALS_ALPHA", "10"))
+# Threads solving users (then events) in parallel; NumPy releases the GIL
+# in the batched solves. 0 uses every core.
+ALS_WORKERS = int(os.getenv("ALS_WORKERS", "0")) or os.cpu_count() or 1
+# Each training run publishes a snapshot generation here; every worker
+# memory-maps the current one read-only
+ALS_MODEL_PATH = os.getenv("ALS_MODEL_PATH", "./models/als")
+
+# Interactions per batched solve
+SOLVE_CHUNK_NNZ = 2048
+# y yT of every row of the other side is precomputed when it fits in this many
+# bytes; otherwise it is formed per batch for the interactions in it (slower)
+OUTER_TABLE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _chunks(indptr, chunk_nnz):
+    """Row ranges holding about chunk_nnz non-zeros each."""
+    n_rows = len(indptr) - 1
+    cuts = np.searchsorted(indptr, np.arange(chunk_nnz, indptr[-1], chunk_nnz))
+    bounds = np.unique(np.concatenate([[0], cuts, [n_rows]]))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _least_squares(interactions, other, regularization, alpha, pool):
+    """
+    One ALS half-step: the factors of every row of the CSR interactions
+    given the factors of the other side, solving
+    (YtY + Yt(Cu - I)Y + reg*I) x = Yt Cu p(u) for a batch of rows at a time.
+    Rows without interactions get zero factors.
+    """
+    from scipy import sparse
+
+    n_rows, factors = interactions.shape[0], other.shape[1]
+    gram = other.T @ other + regularization * np.eye(factors)
+    result = np.zeros((n_rows, factors))
+    indptr, indices, data = interactions.indptr, interactions.indices, interactions.data
+
+    table = None
+    if other.shape[0] * factors * factors * 8 <= OUTER_TABLE_MAX_BYTES:
+        table = (other[:, :, None] * other[:, None, :]).reshape(other.shape[0], factors * factors)
+
+    def solve(start, stop):
+        lo, hi = indptr[start], indptr[stop]
+        confidence = alpha * data[lo:hi]
+        local_indptr = indptr[start:stop + 1] - lo
+        # The per-interaction terms of each row are summed by sparse products
+        if table is not None:
+            weights = sparse.csr_matrix((confidence, indices[lo:hi], local_indptr), shape=(stop - start, other.shape[0]))
+            a = weights @ table
+        else:
+            vectors = other[indices[lo:hi]]
+            outer = (vectors[:, :, None] * vectors[:, None, :]).reshape(hi - lo, factors * factors)
+            a = sparse.csr_matrix((confidence, np.arange(hi - lo), local_indptr), shape=(stop - start, hi - lo)) @ outer
+        a = gram + a.reshape(-1, factors, factors)
+        weights = sparse.csr_matrix((1 + confidence, indices[lo:hi], local_indptr), shape=(stop - start, other.shape[0]))
+        b = weights @ other
+        result[start:stop] = np.linalg.solve(a, b[..., None])[..., 0]
+
+    list(pool.map(lambda bounds: solve(*bounds), _chunks(indptr, SOLVE_CHUNK_NNZ)))
+    return result
+
+
+def train_als(interactions, factors=ALS_FACTORS, iterations=ALS_ITERATIONS,
+              regularization=ALS_REGULARIZATION, alpha=ALS_ALPHA, workers=ALS_WORKERS, seed=0, progress=None):
+    """
+    Factorize a users x events scipy.sparse matrix. Returns float32
+    (user_factors, event_factors) whose dot products rank events per user.
+    progress(done, total) is called after each iteration.
+    """
+    interactions = interactions.tocsr().astype(np.float64)
+    by_event = interactions.T.tocsr()
+    rng = np.random.default_rng(seed)
+    user_factors = rng.normal(0, 0.01, (interactions.shape[0], factors))
+    event_factors = rng.normal(0, 0.01, (interactions.shape[1], factors))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for iteration in range(iterations):
+            user_factors = _least_squares(interactions, event_factors, regularization, alpha, pool)
+            event_factors = _least_squares(by_event, user_factors, regularization, alpha, pool)
+            if progress:
+                progress(iteration + 1, iterations)
+    return user_factors.astype(np.float32), event_factors.astype(np.float32)
+
+
+class AlsModel:
+    """
+    Trained factors plus the interactions they were trained on (CSR
+    indptr/indices) so already-seen events are left out. recommend() costs
+    one (events x factors) mat-vec and a partial sort, whatever the number
+    of users. Every array, including the IdIndex maps, can be a read-only
+    memory map shared by all workers.
+    """
+
+    def __init__(self, user_factors, event_factors, user_index, event_index, seen_indptr, seen_indices, trained_at):
+        self.user_factors = user_factors
+        self.event_factors = event_factors
+        self.user_index = user_index
+        self.event_index = event_index
+        self.seen_indptr = seen_indptr
+        self.seen_indices = seen_indices
+        self.trained_at = trained_at
+
+    @classmethod
+    def fit(cls, interactions, user_ids, event_ids, **params):
+        interactions = interactions.tocsr()
+        user_factors, event_factors = train_als(interactions, **params)
+        return cls(
+            user_factors, event_factors, IdIndex(user_ids), IdIndex(event_ids),
+            interactions.indptr.astype(np.int32), interactions.indices.astype(np.int32),
+            datetime.now(timezone.utc),
+        )
+
+    def recommend(self, profile_id, top_k=5):
+        """Event ids ranked for the user, or None if the user was not in the training data."""
+        row = self.user_index.get(profile_id)
+        if row is None:
+            return None
+        scores = self.event_factors @ self.user_factors[row]
+        scores[self.seen_indices[self.seen_indptr[row]:self.seen_indptr[row + 1]]] = -np.inf
+        k = min(top_k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.event_index.id_at(i) for i in top if np.isfinite(scores[i])]
+
+    def save(self, path):
+        """Publish as a new snapshot generation under path; returns the generation."""
+        arrays = {
+            "user_factors": self.user_factors, "event_factors": self.event_factors,
+            "seen_indptr": self.seen_indptr, "seen_indices": self.seen_indices,
+            **{f"users_{k}": v for k, v in self.user_index.arrays().items()},
+            **{f"events_{k}": v for k, v in self.event_index.arrays().items()},
+        }
+        return write_snapshot(path, arrays, {"trainedAt": self.trained_at.isoformat()})
+
+    @classmethod
+    def load(cls, path):
+        """The current generation under path, memory-mapped read-only, or None."""
+        snapshot = read_snapshot(path)
+        if snapshot is None:
+            return None
+        meta, arrays = snapshot
+        return cls(
+            arrays["user_factors"], arrays["event_factors"],
+            IdIndex.from_arrays({k[6:]: v for k, v in arrays.items() if k.startswith("users_")}),
+            IdIndex.from_arrays({k[7:]: v for k, v in arrays.items() if k.startswith("events_")}),
+            arrays["seen_indptr"], arrays["seen_indices"], datetime.fromisoformat(meta["trainedAt"]),
+        )
+
+
+_model = None
+_model_generation = None
+_model_lock = threading.Lock()
+
+
+def get_model(path=None):
+    """
+    The trained model, mapped from the current generation under path
+    (ALS_MODEL_PATH) on first use and swapped for the new one when a
+    training job, possibly in another worker, publishes it. None until a
+    model has been trained.
+    """
+    global _model, _model_generation
+    path = path or ALS_MODEL_PATH
+    generation = current_generation(path)
+    if generation is None:
+        return None
+    if generation != _model_generation:
+        with _model_lock:
+            if generation != _model_generation:
+                model = AlsModel.load(path)
+                if model is None:
+                    return _model
+                _model, _model_generation = model, generation
+                logger.info("Loaded ALS model generation %s trained at %s (%d users x %d events)",
+                            generation, _model.trained_at, len(_model.user_index), len(_model.event_index))
+    return _model
+
+
+def train_and_save(interactions, user_ids, event_ids, path=None, **params):
+    start = time.perf_counter()
+    model = AlsModel.fit(interactions, user_ids, event_ids, **params)
+    model.save(path or ALS_MODEL_PATH)
+    logger.info("Trained ALS model on %d interactions in %.1f s", interactions.nnz, time.perf_counter() - start)
+    return model
@@ -0,0 +1,287 @@
+import os
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from fastapi.encoders import jsonable_encoder
+from app.config.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Cached recommendation responses expire after this many seconds even
+# without an explicit invalidation.
+CACHE_TTL_SECONDS = int(os.getenv("RECOMMEND_CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("RECOMMEND_CACHE_MAX_ENTRIES", "1024"))
+
+# Optional shared backend (any Redis-protocol server). Falls back to the
+# in-process LRU when unset or when the redis package is not installed.
+REDIS_URL = os.getenv("REDIS_URL")
+
+KEY_PREFIX = "rec:"
+
+# Number of recent request latencies kept for percentile reporting
+LATENCY_SAMPLES = 2048
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with per-entry TTL."""
+
+    # Each worker has its own; invalidations are replayed to every worker
+    shared = False
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def delete_where(self, predicate):
+        """Drop every entry whose value matches predicate."""
+        with self._lock:
+            for key in [k for k, (_, value) in self._data.items() if predicate(value)]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache:
+    """Redis-backed cache shared by all workers. Values are stored as JSON."""
+
+    shared = True
+
+    def __init__(self, url, ttl=CACHE_TTL_SECONDS):
+        import redis
+
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._redis.get(key)
+        if raw is None:
+            return False, None
+        return True, json.loads(raw)
+
+    def set(self, key, value):
+        self._redis.set(key, json.dumps(value), ex=self.ttl)
+
+    def delete_prefix(self, prefix):
+        keys = list(self._redis.scan_iter(match=prefix + "*", count=500))
+        if keys:
+            self._redis.delete(*keys)
+
+    def delete_where(self, predicate):
+        keys = list(self._redis.scan_iter(match=KEY_PREFIX + "*", count=500))
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            matched = [k for k, raw in zip(batch, self._redis.mget(batch)) if raw is not None and predicate(json.loads(raw))]
+            if matched:
+                self._redis.delete(*matched)
+
+    def __len__(self):
+        return sum(1 for _ in self._redis.scan_iter(match=KEY_PREFIX + "*", count=500))
+
+
+def _mentions(value, ids):
+    """Whether any string inside a JSON value is one of ids."""
+    if isinstance(value, str):
+        return value in ids
+    if isinstance(value, dict):
+        return any(_mentions(v, ids) for v in value.values())
+    if isinstance(value, list):
+        return any(_mentions(v, ids) for v in value)
+    return False
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key: the first caller computes,
+    everyone else arriving before it finishes waits for and shares its result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Returns (result, shared) where shared is True for waiting callers."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._latencies = {"hit": deque(maxlen=LATENCY_SAMPLES), "miss": deque(maxlen=LATENCY_SAMPLES)}
+
+    def record(self, outcome, seconds):
+        with self._lock:
+            if outcome == "hit":
+                self.hits += 1
+            else:
+                self.misses += 1
+            if outcome == "coalesced":
+                self.coalesced += 1
+            self._latencies["hit" if outcome == "hit" else "miss"].append(seconds)
+
+    @staticmethod
+    def _percentiles(samples):
+        if not samples:
+            return {"p50": None, "p95": None, "p99": None}
+        ordered = sorted(samples)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+        return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+    def snapshot(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "latency_ms": {k: self._percentiles(v) for k, v in self._latencies.items()},
+            }
+
+
+class RecommendationCache:
+    """
+    Read-through cache for recommendation responses keyed on
+    (profile, namespace, top_k), with single-flight on misses.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.stats = CacheStats()
+        self._flight = SingleFlight()
+        # Bumped on every invalidation so a computation that started before
+        # it does not write its (now stale) result back into the cache.
+        self._generation = 0
+
+    @staticmethod
+    def key(namespace, profile_id, top_k, variant=""):
+        suffix = f":{variant}" if variant else ""
+        return f"{KEY_PREFIX}{profile_id}:{namespace}:{top_k}{suffix}"
+
+    def get_or_compute(self, namespace, profile_id, top_k, compute, variant=""):
+        """variant distinguishes otherwise identical requests, e.g. search filters."""
+        start = time.perf_counter()
+        key = self.key(namespace, profile_id, top_k, variant)
+
+        hit, value = self.backend.get(key)
+        if hit:
+            self.stats.record("hit", time.perf_counter() - start)
+            CACHE_REQUESTS.labels(namespace, "hit").inc()
+            return value
+
+        def load():
+            generation = self._generation
+            # Stored and returned in JSON form (datetimes as ISO strings,
+            # ObjectIds as str), so a miss, an LRU hit and a Redis hit all
+            # return the same value.
+            result = jsonable_encoder(compute())
+            if generation == self._generation:
+                self.backend.set(key, result)
+            return result
+
+        value, shared = self._flight.do(key, load)
+        outcome = "coalesced" if shared else "miss"
+        self.stats.record(outcome, time.perf_counter() - start)
+        CACHE_REQUESTS.labels(namespace, outcome).inc()
+        return value
+
+    def invalidate(self, profile_id=None):
+        """Drop cached entries for one profile, or all entries."""
+        self._generation += 1
+        prefix = KEY_PREFIX if profile_id is None else f"{KEY_PREFIX}{profile_id}:"
+        self.backend.delete_prefix(prefix)
+
+    def invalidate_events(self, event_ids):
+        """
+        Drop cached responses that list any of the events (changed or
+        removed ones). A newly added event is not in any response yet; it
+        shows up once entries expire.
+        """
+        ids = {str(eid) for eid in event_ids}
+        if ids:
+            self._generation += 1
+            self.backend.delete_where(lambda value: _mentions(value, ids))
+
+    @property
+    def shared(self):
+        """Whether every worker reads the same entries, so one invalidation reaches them all."""
+        return self.backend.shared
+
+    def report(self):
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            **self.stats.snapshot(),
+        }
+
+
+def _make_backend():
+    if REDIS_URL:
+        try:
+            return RedisCache(REDIS_URL)
+        except ImportError:
+            logger.warning("REDIS_URL is set but the redis package is not installed; using in-process LRU cache")
+    return LRUCache()
+
+
+recommendation_cache = RecommendationCache(_make_backend())
@@ -1,19 +1,89 @@
-import numpy as np
-from pymongo import MongoClient
-from sklearn.metrics.pairwise import cosine_similarity
 import os
+import logging
+import threading
+import time
+from functools import partial
+import numpy as np
+from app.config.metrics import observe_stage
+from app.config.mongo import lazy_db, RECOMMENDER_READ_PREFERENCE
+from app.recommender.ids import IdIndex
+from app.recommender.interactions import InteractionStore, STORE_FORMAT
+from app.recommender.lsh import MinHashLSH, LSH_BANDS, LSH_ROWS
+from app.recommender.snapshot import builder_lock, current_generation, read_snapshot, write_snapshot
+from app.recommender.deltas import delta_log
+from app.recommender import als
+
+logger = logging.getLogger(__name__)
+
+db = lazy_db(RECOMMENDER_READ_PREFERENCE)
+# For reads that follow a write by the Node backend (a registration it just
+# saved), which a lagging secondary may not have yet
+primary_db = lazy_db()
+
+# Serve the interaction matrix from memory, kept current by interaction
+# deltas, and reload it from Mongo after this many seconds.
+# 0 (default) rebuilds it on every request.
+INTERACTION_MATRIX_TTL_SECONDS = int(os.getenv("INTERACTION_MATRIX_TTL_SECONDS", "0"))
+
+# Neighbours aggregated per recommendation, and the cosine similarity a user
+# must exceed to count as one. Each neighbour's interactions are weighted by
+# their similarity.
+COLLAB_NEIGHBOURS = int(os.getenv("COLLAB_NEIGHBOURS", "5"))
+COLLAB_MIN_SIMILARITY = float(os.getenv("COLLAB_MIN_SIMILARITY", "0"))
+
+# Directory of snapshots of the interaction store (and the LSH index when
+# COLLAB_NEIGHBOUR_SEARCH=lsh) shared by the workers: one worker reloads from
+# Mongo when the TTL expires and publishes a new generation, which every
+# worker memory-maps instead of holding its own copy. Empty (default)
+# disables it.
+COLLAB_SNAPSHOT_PATH = os.getenv("COLLAB_SNAPSHOT_PATH", "")
+
+# How similar users are found: "exact" scores the user against everyone,
+# "lsh" only against the MinHash LSH candidates (recall vs speed is set by
+# LSH_BANDS / LSH_ROWS in lsh.py). The LSH index is built once per matrix,
+# so use it together with INTERACTION_MATRIX_TTL_SECONDS.
+NEIGHBOUR_SEARCH = os.getenv("COLLAB_NEIGHBOUR_SEARCH", "exact")
+
+# "neighbours" is the user-based filtering below; "als" serves the offline
+# trained factor model (als.py) and falls back to neighbours for users it
+# was not trained on.
+COLLAB_MODEL = os.getenv("COLLAB_MODEL", "neighbours")
+
+interaction_store = InteractionStore()
+_matrix_lock = threading.Lock()
+_lsh_index = (None, None)
+_lsh_lock = threading.Lock()
+# Snapshot generation interaction_store was restored from or published as
+_snapshot_generation = None
+
+
+def cosine_similarity(matrix, rows=None):
+    """
+    Cosine similarity of the given rows (all rows by default) with every row
+    of a dense matrix, matching sklearn.metrics.pairwise.cosine_similarity
+    (all-zero rows score 0) without importing scikit-learn.
+    """
+    norms = np.linalg.norm(matrix, axis=1)
+    norms = np.where(norms == 0, 1, norms)
+    selected = matrix if rows is None else matrix[rows]
+    return (selected @ matrix.T) / np.outer(norms if rows is None else norms[rows], norms)
+
 
-MONGO_URI = os.getenv("MONGO_URI")
-mongo_client = MongoClient(MONGO_URI)
-db = mongo_client["main"]
+def top_neighbours(similarities, k, min_similarity):
+    """Positions and similarities of the (up to) k highest similarities above min_similarity."""
+    candidates = np.flatnonzero(similarities > min_similarity)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-similarities[candidates], k - 1)[:k]]
+    return candidates, similarities[candidates]
 
 
-def get_user_ids_for_registration(reg):
+def get_user_ids_for_registration(reg, fresh=False):
     """
     Returns ALL user IDs involved in a registration.
     Handles:
     - Individual registration
     - Team registration with leader + members[]
+    fresh reads the team from the primary, for a registration just written.
     """
 
     users = set()
@@ -24,7 +94,7 @@ def get_user_ids_for_registration(reg):
 
     # If team registration
     if "teamName" in reg and reg["teamName"]:
-        team = db.studentteams.find_one({"_id": reg["teamName"]})
+        team = (primary_db if fresh else db).studentteams.find_one({"_id": reg["teamName"]})
 
         if team:
             # Add team leader
@@ -39,6 +109,28 @@ def get_user_ids_for_registration(reg):
 
 
 
+def iter_interactions(events):
+    """
+    (user_id, event_id, rating) for every rating of the given events, then
+    (user_id, event_id, None) for every user registered to them.
+    """
+    for event in events:
+        e_id = str(event["_id"])
+        full_event = db.events.find_one({"_id": event["_id"]})
+
+        # 1️⃣ Ratings First
+        for r in full_event.get("ratings", []):
+            yield str(r["by"]), e_id, r.get("rating", 0)
+
+        # 2️⃣ Then Registrations
+        regs = db.registrations.find({"eventId": event["_id"]})
+
+        for reg in regs:
+            for uid in get_user_ids_for_registration(reg):
+                yield uid, e_id, None
+
+
+@observe_stage("matrix_build")
 def get_user_event_matrix():
     """Builds user × event matrix using ratings + registrations."""
 
@@ -48,46 +140,264 @@ def get_user_event_matrix():
     if len(users) == 0 or len(events) == 0:
         return None, None, None, users, events
 
-    user_index = {str(u["_id"]): i for i, u in enumerate(users)}
-    event_index = {str(e["_id"]): j for j, e in enumerate(events)}
+    # Plain dicts while filling the matrix; the returned maps are compact
+    rows = {str(u["_id"]): i for i, u in enumerate(users)}
+    cols = {str(e["_id"]): j for j, e in enumerate(events)}
 
-    matrix = np.zeros((len(users), len(events)))
+    matrix = np.zeros((len(users), len(events)), dtype=np.float32)
 
-    for event in events:
-        e_id = str(event["_id"])
-        e_col = event_index[e_id]
+    for uid, e_id, rating in iter_interactions(events):
+        if uid not in rows:
+            continue
+        if rating is not None:
+            matrix[rows[uid], cols[e_id]] = rating  # rating 1–5
+        # Registered = 1, but don't overwrite a rating
+        elif matrix[rows[uid], cols[e_id]] == 0:
+            matrix[rows[uid], cols[e_id]] = 1
 
-        full_event = db.events.find_one({"_id": event["_id"]})
+    return matrix, IdIndex(rows), IdIndex(cols), users, events
 
-        # 1️⃣ Fill Ratings First
-        for r in full_event.get("ratings", []):
-            uid = str(r["by"])
-            rating_value = r.get("rating", 0)
 
-            if uid in user_index:
-                matrix[user_index[uid], e_col] = rating_value  # rating 1–5
+@observe_stage("matrix_build")
+def load_interaction_store(store=None):
+    """(Re)load a store (interaction_store by default) with the same queries as get_user_event_matrix()."""
+    store = store or interaction_store
+    # Read first: entries up to it were written to Mongo before the queries
+    delta_seq = delta_log.head()
+    users = list(db.users.find({}, {"_id": 1}))
+    events = list(db.events.find({"status": "published"}, {"_id": 1}))
+    store.load(
+        [str(u["_id"]) for u in users],
+        [str(e["_id"]) for e in events],
+        iter_interactions(events),
+        delta_seq=delta_seq,
+    )
 
-        # 2️⃣ Fill Registrations (only if user has no rating)
-        regs = db.registrations.find({"eventId": event["_id"]})
 
-        for reg in regs:
-            user_ids = get_user_ids_for_registration(reg)
+def load_interaction_matrix():
+    """
+    The user x event matrix. With INTERACTION_MATRIX_TTL_SECONDS set it comes
+    from interaction_store, reloaded once the TTL has passed (concurrent
+    callers wait for one load); otherwise it is rebuilt from Mongo.
+    """
+    if INTERACTION_MATRIX_TTL_SECONDS <= 0:
+        return get_user_event_matrix()
+    with _matrix_lock:
+        version = interaction_store.version
+        if COLLAB_SNAPSHOT_PATH:
+            _sync_with_snapshots()
+        elif _expired():
+            load_interaction_store()
+        if interaction_store.version != version:
+            # Catch up on the deltas the new contents miss
+            _replay_deltas(interaction_store)
+    return interaction_store.matrix()
+
+
+def _expired():
+    loaded_at = interaction_store.loaded_at
+    return loaded_at is None or time.monotonic() - loaded_at > INTERACTION_MATRIX_TTL_SECONDS
+
+
+def _sync_with_snapshots():
+    """
+    Attach interaction_store to the newest generation published under
+    COLLAB_SNAPSHOT_PATH. When that is missing or expired, one worker (the
+    holder of the builder lock) loads from Mongo and publishes the next
+    generation while the others wait, then attach to it.
+    """
+    if current_generation(COLLAB_SNAPSHOT_PATH) != _snapshot_generation:
+        restore_snapshot()
+    if not _expired():
+        return
+    try:
+        with builder_lock(COLLAB_SNAPSHOT_PATH):
+            if not restore_snapshot():
+                load_interaction_store()
+                save_snapshot()
+    except OSError:
+        logger.exception("Collaborative snapshots unavailable in %s", COLLAB_SNAPSHOT_PATH)
+        if _expired():
+            load_interaction_store()
+
+
+INTERACTION_KINDS = ("registration", "cancel", "rating")
+
+
+def _apply_delta(store, entry):
+    """Apply one interaction entry of the delta log to store; returns the affected users."""
+    users, event_id = set(entry["users"]), entry["event_id"]
+    if entry["kind"] == "registration":
+        return store.add_registration(users, event_id)
+    if entry["kind"] == "cancel":
+        return store.remove_registration(users, event_id)
+    return store.set_rating(entry["users"][0], event_id, entry["rating"])
+
+
+def record_interaction(kind, user_ids, event_id, rating=None):
+    """
+    Append an interaction delta (kind in INTERACTION_KINDS) to the shared
+    delta log, so every worker's store gets it, and apply it to this
+    worker's store right away. Returns the users whose collaborative
+    results it may change.
+    """
+    entry = {"kind": kind, "users": sorted(user_ids), "event_id": event_id}
+    if kind == "rating":
+        entry["rating"] = rating
+    seq = delta_log.append(entry)
+    affected = interaction_store.apply_logged(seq, partial(_apply_delta, interaction_store, entry), in_order=False)
+    return interaction_store.affected(user_ids) if affected is None else affected
 
-            for uid in user_ids:
-                if uid in user_index:
-                    # Don't overwrite rating
-                    if matrix[user_index[uid], e_col] == 0:
-                        matrix[user_index[uid], e_col] = 1  # registered = 1
 
-    return matrix, user_index, event_index, users, events
+def _replay_deltas(store):
+    """
+    Apply the interaction entries of the delta log after store's position
+    that it does not include yet. A delta that reached Mongo while a load
+    was reading it may be counted twice until the next reload.
+    """
+    if not store.loaded:
+        return 0
+    replayed = 0
+    try:
+        while True:
+            entries = delta_log.read(store.delta_seq)
+            if not entries:
+                return replayed
+            for entry in entries:
+                if entry["kind"] not in INTERACTION_KINDS:
+                    # Only moves the position
+                    store.apply_logged(entry["_id"], lambda: None)
+                elif store.apply_logged(entry["_id"], partial(_apply_delta, store, entry)) is not None:
+                    replayed += 1
+    except Exception:
+        logger.exception("Could not replay the interaction delta log")
+        return replayed
+
+
+def sync_deltas(store=None):
+    """
+    Apply the interaction deltas other workers appended to the shared log
+    since store (interaction_store by default) last caught up. Returns how
+    many were applied.
+    """
+    if store is not None:
+        return _replay_deltas(store)
+    # A load or restore moves the position back; keep them out meanwhile
+    with _matrix_lock:
+        return _replay_deltas(interaction_store)
+
+
+@observe_stage("snapshot_save")
+def save_snapshot(path=None):
+    """Publish interaction_store (plus the LSH index of its matrix) as a new generation under path (COLLAB_SNAPSHOT_PATH)."""
+    global _snapshot_generation
+    path = path or COLLAB_SNAPSHOT_PATH
+    try:
+        snapshot = interaction_store.snapshot_arrays()
+        if snapshot is None:
+            return False
+        arrays, meta = snapshot
+        if NEIGHBOUR_SEARCH == "lsh" and "matrix" in arrays:
+            index = get_lsh_index(arrays["matrix"])
+            arrays.update({f"lsh_{k}": v for k, v in index.arrays().items()})
+            meta["lsh"] = {"bands": index.bands, "rows": index.rows}
+        _snapshot_generation = write_snapshot(path, arrays, meta)
+        return True
+    except Exception:
+        logger.exception("Could not write the collaborative snapshot to %s", path)
+        return False
+
+
+@observe_stage("snapshot_load")
+def restore_snapshot(path=None):
+    """
+    Load interaction_store from the current generation under path
+    (COLLAB_SNAPSHOT_PATH) if it is younger than
+    INTERACTION_MATRIX_TTL_SECONDS. Returns whether it was used; otherwise
+    the caller loads from Mongo.
+    """
+    global _lsh_index, _snapshot_generation
+    path = path or COLLAB_SNAPSHOT_PATH
+    try:
+        snapshot = read_snapshot(path, mmap_modes={"matrix": "c"})
+        if snapshot is None:
+            return False
+        meta, arrays = snapshot
+        if meta.get("store") != STORE_FORMAT:
+            logger.info("Collaborative snapshot in %s has store format %s, loading from Mongo", path, meta.get("store"))
+            return False
+        age = time.time() - meta["loadedAt"]
+        if age > INTERACTION_MATRIX_TTL_SECONDS:
+            logger.info("Collaborative snapshot in %s is %.0f s old, loading from Mongo", path, age)
+            return False
+        interaction_store.restore(arrays, meta)
+        if meta.get("lsh") == {"bands": LSH_BANDS, "rows": LSH_ROWS}:
+            index = MinHashLSH.from_arrays({k[4:]: v for k, v in arrays.items() if k.startswith("lsh_")}, LSH_BANDS, LSH_ROWS)
+            with _lsh_lock:
+                _lsh_index = (interaction_store.matrix()[0], index)
+        _snapshot_generation = meta["generation"]
+        return True
+    except Exception:
+        logger.exception("Could not read the collaborative snapshot in %s", path)
+        return False
+
+
+def train_als_model(progress=None):
+    """
+    Offline job: train the ALS model on a fresh read of all interactions and
+    save it. progress(done, total) is called after each training iteration.
+    """
+    store = InteractionStore()
+    load_interaction_store(store)
+    interactions, user_ids, event_ids = store.to_csr()
+    als.train_and_save(interactions, user_ids, event_ids, progress=progress)
+    return {"users": len(user_ids), "events": len(event_ids), "interactions": int(interactions.nnz)}
 
 
+def get_lsh_index(matrix):
+    """
+    MinHashLSH for this matrix object, rebuilt when the matrix is replaced
+    (reload, new user or event). In-place deltas reach the index on the next
+    rebuild; candidates are always re-scored against the current rows.
+    """
+    global _lsh_index
+    with _lsh_lock:
+        built_for, index = _lsh_index
+        if built_for is not matrix:
+            with observe_stage("lsh_build"):
+                index = MinHashLSH(matrix)
+            _lsh_index = (matrix, index)
+        return index
+
+
+def lsh_neighbours(matrix, target_idx, k, min_similarity=0):
+    """(users, similarities) of the k most cosine-similar users among the LSH candidates."""
+    candidates = get_lsh_index(matrix).candidates(target_idx)
+    target = matrix[target_idx]
+    rows = matrix[candidates]
+    norms = np.linalg.norm(rows, axis=1) * np.linalg.norm(target)
+    sims = (rows @ target) / np.where(norms == 0, 1, norms)
+    top, weights = top_neighbours(sims, k, min_similarity)
+    return candidates[top], weights
+
+
+def exact_neighbours(matrix, target_idx, k, min_similarity=0):
+    """(users, similarities) of the k most cosine-similar users, comparing against everyone."""
+    sims = cosine_similarity(matrix, [target_idx])[0]
+    sims[target_idx] = -np.inf
+    return top_neighbours(sims, k, min_similarity)
 
 
 def recommend_collaborative(profile_id: str, top_k=5):
     """Returns recommended event IDs using collaborative filtering."""
-    
-    matrix, user_index, event_index, users, events = get_user_event_matrix()
+
+    if COLLAB_MODEL == "als":
+        model = als.get_model()
+        recommended = model.recommend(profile_id, top_k) if model is not None else None
+        if recommended is not None:
+            return recommended
+
+    matrix, user_index, event_index, users, events = load_interaction_matrix()
 
     if matrix is None:
         return []
@@ -98,24 +408,24 @@ def recommend_collaborative(profile_id: str, top_k=5):
     if matrix.shape[0] < 2:
         return []
 
-    # User similarity matrix
-    user_sim = cosine_similarity(matrix)
     target_idx = user_index[profile_id]
 
-    sim_scores = user_sim[target_idx]
+    find_neighbours = lsh_neighbours if NEIGHBOUR_SEARCH == "lsh" else exact_neighbours
+    with observe_stage("similarity"):
+        similar_users, weights = find_neighbours(matrix, target_idx, COLLAB_NEIGHBOURS, COLLAB_MIN_SIMILARITY)
 
-    if np.all(sim_scores == 0):
+    if len(similar_users) == 0:
         return []
 
-    similar_users = np.argsort(sim_scores)[::-1][1:6]  # Top 5 similar users
+    if INTERACTION_MATRIX_TTL_SECONDS > 0:
+        # Lets an interaction delta of a neighbour invalidate this user's results
+        interaction_store.remember_neighbours(profile_id, [str(users[i]["_id"]) for i in similar_users])
 
-    event_scores = np.zeros(matrix.shape[1])
-    for u_idx in similar_users:
-        event_scores += matrix[u_idx]
+    # Similarity-weighted sum of the neighbours' rows in one product
+    event_scores = weights @ matrix[similar_users]
 
     # Remove already attended events
-    user_events = matrix[target_idx]
-    event_scores = event_scores * (1 - user_events)
+    event_scores[matrix[target_idx] != 0] = 0
 
     top_indices = np.argsort(event_scores)[::-1][:top_k]
 
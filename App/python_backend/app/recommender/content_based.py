@@ -1,38 +1,62 @@
 import os
 import uuid
+import logging
+from datetime import datetime, timezone
 from bson import ObjectId
-from pymongo import MongoClient
 from qdrant_client.http import models as qmodels
-from app.config.qdrant import qdrant_client, COLLECTION_NAME, VECTOR_SIZE
-from google import genai
-from google.genai import types
+from app.config.qdrant import qdrant_client, COLLECTION_NAME, VECTOR_SIZE, collection_config, search_params
+from app.config.embedding import embedding_provider
+from app.config.metrics import observe_stage, EMBEDDING_FAILURES, ZERO_VECTOR_FALLBACKS
+from app.config.mongo import lazy_db, RECOMMENDER_READ_PREFERENCE
 
-MONGO_URI = os.getenv("MONGO_URI")
-mongo_client = MongoClient(MONGO_URI)
-db = mongo_client["main"]
+logger = logging.getLogger(__name__)
 
-client = genai.Client() 
+db = lazy_db(RECOMMENDER_READ_PREFERENCE)
+# Reads that follow a write by the Node backend (it calls in right after
+# saving) go to the primary, which a lagging secondary may not have caught
+# up with yet.
+primary_db = lazy_db()
 
-def get_embedding(text: str):
-    """Generate embedding via Google Gemini API with specified dimension."""
-    if not text or not text.strip():
-        return [0.0] * VECTOR_SIZE 
+# Events embedded and upserted per round trip during a full re-index
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "256"))
+
+def get_embeddings(texts):
+    """
+    Embed many texts with the configured provider (batched, threaded).
+    Empty texts, or every text when the provider fails, get a zero vector.
+    """
+    texts = list(texts)
+    vectors = [[0.0] * VECTOR_SIZE for _ in texts]
+    positions = [i for i, t in enumerate(texts) if t and t.strip()]
+    ZERO_VECTOR_FALLBACKS.inc(len(texts) - len(positions))
+    if not positions:
+        return vectors
 
     try:
-        response = client.models.embed_content(
-            model='gemini-embedding-001',
-            contents=[text],
-            config=types.EmbedContentConfig(
-                task_type='SEMANTIC_SIMILARITY',
-                # 👇 This is the crucial part that tells the API to truncate the vector
-                output_dimensionality=VECTOR_SIZE 
-            )
-        )
-        
-        return response.embeddings[0].values
+        embedded = embedding_provider.embed([texts[i] for i in positions])
     except Exception as e:
-        print(f"Error generating embedding via Gemini API: {e}")
-        return [0.0] * VECTOR_SIZE
+        EMBEDDING_FAILURES.inc()
+        ZERO_VECTOR_FALLBACKS.inc(len(positions))
+        logger.error("Error generating embeddings via %s provider: %s", embedding_provider.name, e)
+        return vectors
+
+    for i, vec in zip(positions, embedded):
+        vectors[i] = vec
+    return vectors
+
+def get_embedding(text: str):
+    """Generate a VECTOR_SIZE embedding for one text with the configured provider."""
+    return get_embeddings([text])[0]
+
+# Payload fields indexed in Qdrant so recommendations can be filtered server-side
+PAYLOAD_INDEXES = {
+    "event_id": qmodels.PayloadSchemaType.KEYWORD,
+    "status": qmodels.PayloadSchemaType.KEYWORD,
+    "college": qmodels.PayloadSchemaType.KEYWORD,
+    "categoryTags": qmodels.PayloadSchemaType.KEYWORD,
+    "isFree": qmodels.PayloadSchemaType.BOOL,
+    "ends_at": qmodels.PayloadSchemaType.FLOAT,
+}
 
 def setup_collection():
     collections = qdrant_client.get_collections().collections
@@ -40,15 +64,16 @@ def setup_collection():
     if COLLECTION_NAME not in existing:
         qdrant_client.create_collection(
             collection_name=COLLECTION_NAME,
-            vectors_config=qmodels.VectorParams(size=VECTOR_SIZE, distance="Cosine")
-        )
-        print(f"Created collection '{COLLECTION_NAME}'")
-        qdrant_client.create_payload_index(
-            collection_name=COLLECTION_NAME,
-            field_name="event_id",
-            field_schema=qmodels.PayloadSchemaType.KEYWORD,
+            **collection_config()
         )
-        print(f"Created payload index for 'event_id' in collection '{COLLECTION_NAME}'")
+        logger.info("Created collection '%s'", COLLECTION_NAME)
+        for field, schema in PAYLOAD_INDEXES.items():
+            qdrant_client.create_payload_index(
+                collection_name=COLLECTION_NAME,
+                field_name=field,
+                field_schema=schema,
+            )
+        logger.info("Created payload indexes in collection '%s'", COLLECTION_NAME)
 
 # Building event genome 
 def build_event_genome(event):
@@ -68,50 +93,185 @@ def build_event_genome(event):
 
     return genome
 
+def event_point_id(event_id):
+    """Deterministic Qdrant point id for an event, so re-adding overwrites."""
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, f"event:{event_id}"))
+
+def _timestamp(value):
+    """Mongo returns naive UTC datetimes; Qdrant range filters need numbers."""
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def build_event_payload(event):
+    dates = [t for t in (_timestamp(step.get("date")) for step in event.get("timeline", [])) if t is not None]
+    payload = {
+        "event_id": str(event["_id"]),
+        "status": event.get("status", "draft"),
+        "college": str(event.get("college", "")),
+        "categoryTags": list(event.get("categoryTags", [])),
+        "isFree": bool(event.get("config", {}).get("isFree", True)),
+    }
+    if dates:
+        payload["starts_at"] = min(dates)
+        payload["ends_at"] = max(dates)
+    return payload
+
+def build_event_point(event, embedding):
+    return qmodels.PointStruct(
+        id=event_point_id(event["_id"]),
+        vector=embedding,
+        payload=build_event_payload(event)
+    )
+
+def get_registered_event_ids(profile_id: str):
+    """
+    Event ids the user is registered for, individually or through an
+    approved membership (or leadership) of a student team.
+    """
+    user_id = ObjectId(profile_id)
+    team_ids = [t["_id"] for t in db.studentteams.find(
+        {"$or": [
+            {"leader": user_id},
+            {"members": {"$elemMatch": {"member": user_id, "status": "Approved"}}},
+        ]},
+        {"_id": 1}
+    )]
+
+    regs = db.registrations.find(
+        {
+            "$or": [{"userId": user_id}, {"teamName": {"$in": team_ids}}],
+            "status": {"$ne": "cancelled"},
+        },
+        {"eventId": 1}
+    )
+    return sorted({str(r["eventId"]) for r in regs})
+
+def build_event_filter(profile=None, upcoming=False, same_college=False, free_only=False, tags=None,
+                       exclude_event_ids=None):
+    """
+    Qdrant filter for recommendable events. Only published events are ever
+    returned; the remaining conditions are opt-in.
+    """
+    must = [qmodels.FieldCondition(key="status", match=qmodels.MatchValue(value="published"))]
+    must_not = []
+    if exclude_event_ids:
+        must_not.append(qmodels.FieldCondition(key="event_id", match=qmodels.MatchAny(any=list(exclude_event_ids))))
+    if upcoming:
+        # An event is upcoming while its last timeline date has not passed
+        now = datetime.now(timezone.utc).timestamp()
+        must.append(qmodels.FieldCondition(key="ends_at", range=qmodels.Range(gte=now)))
+    if same_college and profile and profile.get("college"):
+        must.append(qmodels.FieldCondition(key="college", match=qmodels.MatchValue(value=str(profile["college"]))))
+    if free_only:
+        must.append(qmodels.FieldCondition(key="isFree", match=qmodels.MatchValue(value=True)))
+    if tags:
+        must.append(qmodels.FieldCondition(key="categoryTags", match=qmodels.MatchAny(any=list(tags))))
+    return qmodels.Filter(must=must, must_not=must_not or None)
+
 # Index all events 
-def index_all_events():
+def index_all_events(progress=None, batch_size=INDEX_BATCH_SIZE):
+    """
+    Re-create the event collection from every published event. Events are
+    embedded and upserted batch_size at a time; progress(done, total) is
+    called after each batch. Returns the number of indexed events.
+    """
     try:
         qdrant_client.delete_collection(collection_name=COLLECTION_NAME)
-        print(f"Deleted existing collection '{COLLECTION_NAME}'")
+        logger.info("Deleted existing collection '%s'", COLLECTION_NAME)
     except Exception:
-        print("No previous collection found")
+        logger.info("No previous collection found")
 
     setup_collection()
     events = list( db.events.find({"status": "published"}))
-    points = []
-    for ev in events:
-        genome = build_event_genome(ev)
-        embedding = get_embedding(genome)
-        points.append(
-            qmodels.PointStruct(
-                id=str(uuid.uuid4()),
-                vector=embedding,
-                payload={"event_id": str(ev["_id"])}
-            )
-        )
-    if points:
+    if progress:
+        progress(0, len(events))
+    for start in range(0, len(events), batch_size):
+        batch = events[start:start + batch_size]
+        embeddings = get_embeddings([build_event_genome(ev) for ev in batch])
+        points = [build_event_point(ev, embedding) for ev, embedding in zip(batch, embeddings)]
         qdrant_client.upsert(collection_name=COLLECTION_NAME, points=points)
-    print(f"Indexed {len(points)} events into Qdrant")
+        if progress:
+            progress(start + len(batch), len(events))
+    logger.info("Indexed %d events into Qdrant", len(events))
+    return len(events)
 
 # Incremental Add / Delete
 def add_event(event_id: str):
-    event =  db.events.find_one({"_id": ObjectId(event_id)})
+    event = primary_db.events.find_one({"_id": ObjectId(event_id)})
     if not event:
-        print(f"No event found for ID {event_id}")
+        logger.warning("No event found for ID %s", event_id)
         return
     genome = build_event_genome(event)
     embedding = get_embedding(genome)
     qdrant_client.upsert(
         collection_name=COLLECTION_NAME,
-        points=[
-            qmodels.PointStruct(
-                id=str(uuid.uuid4()),  
-                vector=embedding,
-                payload={"event_id": str(event_id)}
-            )
-        ]
+        points=[build_event_point(event, embedding)]
+    )
+    logger.info("Added event %s", event_id)
+
+def add_events(event_ids):
+    """
+    Index many events with one Mongo query, batched embeddings and a single
+    Qdrant upsert. Returns {event_id: status} with status one of added,
+    not_found, invalid_id or embedding_failed.
+    """
+    event_ids = list(dict.fromkeys(event_ids))
+    results = {eid: "invalid_id" for eid in event_ids if not ObjectId.is_valid(eid)}
+    valid = [eid for eid in event_ids if eid not in results]
+
+    events = list(primary_db.events.find({"_id": {"$in": [ObjectId(eid) for eid in valid]}}))
+    embeddings = get_embeddings([build_event_genome(ev) for ev in events])
+
+    points = []
+    for ev, embedding in zip(events, embeddings):
+        if not any(embedding):
+            results[str(ev["_id"])] = "embedding_failed"
+            continue
+        points.append(build_event_point(ev, embedding))
+        results[str(ev["_id"])] = "added"
+    if points:
+        qdrant_client.upsert(collection_name=COLLECTION_NAME, points=points)
+
+    for eid in valid:
+        results.setdefault(eid, "not_found")
+    logger.info("Bulk added %d of %d events", len(points), len(event_ids))
+    return {eid: results[eid] for eid in event_ids}
+
+def delete_events(event_ids):
+    """
+    Remove many events with a single Qdrant delete. Returns {event_id: status}
+    with status deleted or not_indexed.
+    """
+    event_ids = list(dict.fromkeys(str(eid) for eid in event_ids))
+    if not event_ids:
+        return {}
+    selector = qmodels.Filter(
+        must=[qmodels.FieldCondition(key="event_id", match=qmodels.MatchAny(any=event_ids))]
     )
-    print(f"Added event {event_id}")
+
+    indexed, offset = set(), None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=COLLECTION_NAME,
+            scroll_filter=selector,
+            limit=max(len(event_ids), 100),
+            offset=offset,
+            with_payload=True,
+        )
+        indexed.update(p.payload["event_id"] for p in points)
+        if offset is None:
+            break
+
+    if indexed:
+        qdrant_client.delete(
+            collection_name=COLLECTION_NAME,
+            points_selector=qmodels.FilterSelector(filter=selector)
+        )
+    logger.info("Bulk deleted %d of %d events", len(indexed), len(event_ids))
+    return {eid: "deleted" if eid in indexed else "not_indexed" for eid in event_ids}
 
 def delete_event(event_id: str):
     """Delete event from Qdrant by matching payload event_id."""
@@ -128,7 +288,7 @@ def delete_event(event_id: str):
             )
         )
     )
-    print(f"Deleted event with event_id={event_id}")
+    logger.info("Deleted event with event_id=%s", event_id)
 
 # helper function
 def convert_object_ids(obj):
@@ -143,7 +303,8 @@ def convert_object_ids(obj):
         return obj
 
 # content based recommendation
-def recommend_events_for_user(profile_id: str, top_k=5):
+def recommend_events_for_user(profile_id: str, top_k=5, upcoming=False, same_college=False,
+                              free_only=False, tags=None, exclude_registered=True):
 
     profile = db.users.find_one({"_id": ObjectId(profile_id)})
     if not profile:
@@ -160,33 +321,43 @@ def recommend_events_for_user(profile_id: str, top_k=5):
     )
 
     user_genome = (interests + " ") * 3 + achievements
-    print("USER GENOME:", user_genome)
+    logger.debug("User genome for %s: %s", profile_id, user_genome)
 
     user_embedding = get_embedding(user_genome)
-    print("USER EMBEDDING:", user_embedding)
+
+    # Already-registered events are excluded inside the search, so every one
+    # of the top_k slots is a fresh event
+    registered = get_registered_event_ids(profile_id) if exclude_registered else None
+    query_filter = build_event_filter(profile, upcoming, same_college, free_only, tags, registered)
 
     # VECTOR SEARCH (not .query)
-    res = qdrant_client.search(
-        collection_name=COLLECTION_NAME,
-        query_vector=user_embedding,
-        limit=top_k,
-        with_payload=True
-    )
+    with observe_stage("qdrant_search"):
+        res = qdrant_client.search(
+            collection_name=COLLECTION_NAME,
+            query_vector=user_embedding,
+            query_filter=query_filter,
+            search_params=search_params(),
+            limit=top_k,
+            with_payload=True
+        )
 
     ranked_results = []
 
-    for hit in res:
-        event_id = ObjectId(hit.payload["event_id"])
-        event = db.events.find_one({"_id": event_id})
+    with observe_stage("mongo_hydration"):
+        event_ids = [ObjectId(hit.payload["event_id"]) for hit in res]
+        events = {e["_id"]: e for e in db.events.find({"_id": {"$in": event_ids}})}
 
-        if not event:
-            continue
+        for hit, event_id in zip(res, event_ids):
+            event = events.get(event_id)
+
+            if not event:
+                continue
 
 
-        ranked_results.append({
-            "event": convert_object_ids(event),
-            "score": float(hit.score)
-        })
+            ranked_results.append({
+                "event": convert_object_ids(event),
+                "score": float(hit.score)
+            })
 
     ranked_results.sort(key=lambda x: x["score"], reverse=True)
 
@@ -0,0 +1,116 @@
+import os
+import socket
+import logging
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from app.config.mongo import lazy_db
+
+logger = logging.getLogger(__name__)
+
+db = lazy_db()
+
+# Log entries are removed by a TTL index after this many hours. Keep it well
+# above INTERACTION_MATRIX_TTL_SECONDS: a worker restoring the oldest usable
+# snapshot replays every entry since that snapshot's load.
+DELTA_RETENTION_HOURS = float(os.getenv("DELTA_RETENTION_HOURS", "24"))
+
+# A sequence number taken by a writer that has not inserted its entry yet
+# holds back the entries after it; once the next entry is this old the
+# writer is taken for dead and its number skipped.
+DELTA_GAP_SECONDS = float(os.getenv("DELTA_GAP_SECONDS", "10"))
+
+COUNTER_ID = "deltas"
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value):
+    # pymongo returns naive datetimes in UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class DeltaLog:
+    """
+    Shared, ordered log of the changes every worker must see: interaction
+    deltas from the Node backend and recommendation cache invalidations.
+    The worker receiving a change appends it and applies it; the others
+    replay the entries after their own position (see
+    collaborative.sync_deltas() and utils.start_delta_sync()).
+
+    Entries are keyed by a sequence number from a counter document, so
+    their _id is their order. Collections default to db.recommender_deltas
+    and db.recommender_counters, looked up on every use like JobQueue's.
+    """
+
+    def __init__(self, collection=None, counters=None):
+        self._collection = collection
+        self._counters = counters
+        self._indexes_ready = False
+
+    @property
+    def collection(self):
+        return db.recommender_deltas if self._collection is None else self._collection
+
+    @property
+    def counters(self):
+        return db.recommender_counters if self._counters is None else self._counters
+
+    @property
+    def origin(self):
+        """Tags this process's entries, so it can skip its own when replaying."""
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _ensure_indexes(self):
+        if not self._indexes_ready:
+            self.collection.create_index("at", expireAfterSeconds=int(DELTA_RETENTION_HOURS * 3600))
+            self._indexes_ready = True
+
+    def head(self):
+        """Sequence number of the last entry appended, 0 for an empty log."""
+        doc = self.counters.find_one({"_id": COUNTER_ID})
+        return doc["seq"] if doc else 0
+
+    def append(self, entry):
+        """Append entry (a dict with a "kind") and return its sequence number."""
+        self._ensure_indexes()
+        seq = self.counters.find_one_and_update(
+            {"_id": COUNTER_ID}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER,
+        )["seq"]
+        self.collection.insert_one({**entry, "_id": seq, "origin": self.origin, "at": _utcnow()})
+        return seq
+
+    def read(self, after, limit=1000):
+        """
+        Entries after sequence number after, in order. Stops before a missing
+        number unless the entry following it is older than DELTA_GAP_SECONDS,
+        so a reader never moves past an entry that is still being written.
+        """
+        entries = []
+        expected = after + 1
+        cutoff = _utcnow() - timedelta(seconds=DELTA_GAP_SECONDS)
+        for entry in self.collection.find({"_id": {"$gt": after}}).sort("_id", 1).limit(limit):
+            if entry["_id"] != expected:
+                if _as_utc(entry["at"]) > cutoff:
+                    break
+                logger.warning("Skipping delta log entries %d-%d, never written or expired", expected, entry["_id"] - 1)
+            entries.append(entry)
+            expected = entry["_id"] + 1
+        return entries
+
+
+delta_log = DeltaLog()
+
+
+def publish_invalidation(profile_ids=None, event_ids=None):
+    """
+    Tell the other workers to drop their cached recommendations of these
+    users, or those listing these events, or every one when both are None.
+    """
+    entry = {"kind": "invalidate"}
+    if profile_ids is not None:
+        entry["users"] = sorted(profile_ids)
+    if event_ids is not None:
+        entry["event_ids"] = list(event_ids)
+    return delta_log.append(entry)
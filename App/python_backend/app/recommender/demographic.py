@@ -1,108 +1,268 @@
-import numpy as np
-from bson import ObjectId
-from pymongo import MongoClient
-from sklearn.metrics.pairwise import cosine_similarity
-from google import genai
-from google.genai import types
 import os
+import uuid
+import logging
+from bson import ObjectId
+from qdrant_client.http import models as qmodels
+from app.config.qdrant import qdrant_client, collection_config, USER_COLLECTION_NAME
+from app.config.embedding import embedding_provider
+from app.config.metrics import observe_stage, EMBEDDING_FAILURES
+from app.config.mongo import lazy_db, RECOMMENDER_READ_PREFERENCE
+from app.recommender.cache import LRUCache
 
-MONGO_URI = os.getenv("MONGO_URI")
-mongo_client = MongoClient(MONGO_URI)
-db = mongo_client["main"]
+logger = logging.getLogger(__name__)
 
-client = genai.Client()
+db = lazy_db(RECOMMENDER_READ_PREFERENCE)
+# Reads that follow a write by the Node backend (it calls in right after
+# saving) go to the primary, which a lagging secondary may not have caught
+# up with yet.
+primary_db = lazy_db()
 
+# Points per Qdrant upsert request when re-indexing every user
+UPSERT_BATCH_SIZE = 100
 
-def recommend_demographic(profile_id: str, top_k=5):
+# Number of similar users whose registrations are counted
+NEIGHBOURS = 5
 
-    # --- Fetch all users with profile + college info ---
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "colleges",
-                "localField": "college",
-                "foreignField": "_id",
-                "as": "college_obj"
-            }
-        },
-        {"$unwind": {"path": "$college_obj", "preserveNullAndEmptyArrays": True}},
-        {
-            "$project": {
-                "_id": 1,
-                "collegeName": "$college_obj.name",
-                "collegeCode": "$college_obj.code",
-                "areasOfInterest": "$profile.areasOfInterest",
-            }
+# Demographic vectors of this many recently active users are kept in process
+# (and preloaded at startup) instead of fetched from Qdrant per request.
+# Entries expire after RECOMMEND_CACHE_TTL_SECONDS. 0 disables the cache.
+USER_VECTOR_CACHE_SIZE = int(os.getenv("USER_VECTOR_CACHE_SIZE", "0"))
+user_vector_cache = LRUCache(max_entries=USER_VECTOR_CACHE_SIZE) if USER_VECTOR_CACHE_SIZE > 0 else None
+
+# --- Fetch users with profile + college info ---
+USER_PIPELINE = [
+    {
+        "$lookup": {
+            "from": "colleges",
+            "localField": "college",
+            "foreignField": "_id",
+            "as": "college_obj"
+        }
+    },
+    {"$unwind": {"path": "$college_obj", "preserveNullAndEmptyArrays": True}},
+    {
+        "$project": {
+            "_id": 1,
+            "role": 1,
+            "status": 1,
+            "collegeName": "$college_obj.name",
+            "collegeCode": "$college_obj.code",
+            "areasOfInterest": "$profile.areasOfInterest",
         }
-    ]
+    }
+]
 
-    users = list(db.users.aggregate(pipeline))
 
-    # Safety: must have at least 2 users
-    if len(users) < 2:
-        return []
+def build_user_genome(u):
+    """Vectorize demographic info (college + interests) into a single string."""
+    features = []
 
-    # Identify the target user
+    # College features
+    features.append(str(u.get("collegeName", "")))
+    features.append(str(u.get("collegeCode", "")))
+
+    # Interests
+    aois = u.get("areasOfInterest", [])
+    if aois:
+        features.extend([str(a) for a in aois])
+
+    return " ".join(features)
+
+
+def embed_user_genomes(user_strings):
+    """Embed a list of user genomes in batches. Returns None on embedding error."""
+    try:
+        return embedding_provider.embed(user_strings)
+    except Exception as e:
+        EMBEDDING_FAILURES.inc()
+        logger.error("Error generating user embeddings: %s", e)
+        return None
+
+
+def user_point_id(user_id):
+    """Deterministic Qdrant point id for a user, so re-indexing overwrites."""
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, str(user_id)))
+
+
+def build_user_point(u, embedding):
+    return qmodels.PointStruct(
+        id=user_point_id(u["_id"]),
+        vector=embedding,
+        payload={
+            "user_id": str(u["_id"]),
+            "role": u.get("role", ""),
+            # Users created before the status field existed are active by default
+            "status": u.get("status", "active"),
+        }
+    )
+
+
+def setup_user_collection():
+    """
+    Create the user collection and its payload indexes if missing. Run at
+    startup and by index_all_users(), not per upsert. Returns True when it
+    created the collection.
+    """
+    collections = qdrant_client.get_collections().collections
+    existing = [c.name for c in collections]
+    if USER_COLLECTION_NAME not in existing:
+        qdrant_client.create_collection(
+            collection_name=USER_COLLECTION_NAME,
+            **collection_config()
+        )
+        logger.info("Created collection '%s'", USER_COLLECTION_NAME)
+        for field in ("user_id", "role", "status"):
+            qdrant_client.create_payload_index(
+                collection_name=USER_COLLECTION_NAME,
+                field_name=field,
+                field_schema=qmodels.PayloadSchemaType.KEYWORD,
+            )
+        logger.info("Created payload indexes in collection '%s'", USER_COLLECTION_NAME)
+        return True
+    return False
+
+
+# Index all users
+def index_all_users(progress=None):
+    """
+    Re-create the user collection. Users are embedded and upserted
+    UPSERT_BATCH_SIZE at a time; progress(done, total) is called after each
+    batch. Returns the number of users indexed.
+    """
+    try:
+        qdrant_client.delete_collection(collection_name=USER_COLLECTION_NAME)
+        logger.info("Deleted existing collection '%s'", USER_COLLECTION_NAME)
+    except Exception:
+        logger.info("No previous user collection found")
+
+    setup_user_collection()
+    if user_vector_cache is not None:
+        user_vector_cache.delete_prefix("")
+    users = list(db.users.aggregate(USER_PIPELINE))
+    indexed = 0
+    for start in range(0, len(users), UPSERT_BATCH_SIZE):
+        batch = users[start:start + UPSERT_BATCH_SIZE]
+        embeddings = embed_user_genomes([build_user_genome(u) for u in batch])
+        if embeddings is None:
+            break
+        qdrant_client.upsert(
+            collection_name=USER_COLLECTION_NAME,
+            points=[build_user_point(u, emb) for u, emb in zip(batch, embeddings)]
+        )
+        indexed += len(batch)
+        if progress:
+            progress(indexed, len(users))
+    logger.info("Indexed %d users into Qdrant", indexed)
+    return indexed
+
+
+def upsert_user(profile_id: str):
+    """
+    (Re)index a single user into the user collection, which the startup
+    warm-up has created. Returns the stored vector, or None.
+    """
     if not ObjectId.is_valid(profile_id):
-        return []
+        return None
 
-    profile_id = ObjectId(profile_id)
-    if not any(u["_id"] == profile_id for u in users):
-        return []
+    users = list(primary_db.users.aggregate(
+        [{"$match": {"_id": ObjectId(profile_id)}}] + USER_PIPELINE
+    ))
+    if not users:
+        return None
+
+    embeddings = embed_user_genomes([build_user_genome(users[0])])
+    if not embeddings:
+        return None
+
+    qdrant_client.upsert(
+        collection_name=USER_COLLECTION_NAME,
+        points=[build_user_point(users[0], embeddings[0])]
+    )
+    if user_vector_cache is not None:
+        user_vector_cache.set(str(profile_id), embeddings[0])
+    return embeddings[0]
 
-    # ---- Vectorize demographic info ----
-    def vectorize(u):
-        features = []
 
-        # College features
-        features.append(str(u.get("collegeName", "")))
-        features.append(str(u.get("collegeCode", "")))
+def preload_user_vectors(profile_ids):
+    """Fill the user vector cache with one Qdrant retrieve. Returns the number loaded."""
+    if user_vector_cache is None or not profile_ids:
+        return 0
+    points = qdrant_client.retrieve(
+        collection_name=USER_COLLECTION_NAME,
+        ids=[user_point_id(pid) for pid in profile_ids],
+        with_payload=True,
+        with_vectors=True,
+    )
+    for point in points:
+        if point.vector:
+            user_vector_cache.set(point.payload["user_id"], point.vector)
+    return len(points)
 
-        # Interests
-        aois = u.get("areasOfInterest", [])
-        if aois:
-            features.extend([str(a) for a in aois])
 
-        return " ".join(features)
+def get_user_vector(profile_id: str):
+    """Fetch the stored demographic vector, indexing the user on a miss."""
+    if user_vector_cache is not None:
+        hit, vector = user_vector_cache.get(str(profile_id))
+        if hit:
+            return vector
+    vector = _fetch_user_vector(profile_id)
+    if vector is not None and user_vector_cache is not None:
+        user_vector_cache.set(str(profile_id), vector)
+    return vector
 
-    # Create embeddings
-    user_strings = [vectorize(u) for u in users]
+
+def _fetch_user_vector(profile_id):
     try:
-        response = client.models.embed_content(
-            model='gemini-embedding-001',
-            # Pass the list of all user strings
-            contents=user_strings,
-            config=types.EmbedContentConfig(
-                task_type='SEMANTIC_SIMILARITY',
-                # Truncate the output vector size for efficiency
-                output_dimensionality=768 
-            )
+        points = qdrant_client.retrieve(
+            collection_name=USER_COLLECTION_NAME,
+            ids=[user_point_id(profile_id)],
+            with_vectors=True,
         )
-        # Extract the list of embedding vectors from the response object
-        embeddings_list = [e.values for e in response.embeddings]
-        # Convert the list of embeddings to a numpy array
-        embeddings = np.array(embeddings_list)
-        
-    except Exception as e:
-        print(f"Error generating Gemini embeddings: {e}")
-        return [] # Return empty list on critical embedding error
+    except Exception:
+        points = []
 
-    # Target user index
-    target_index = next(i for i, u in enumerate(users) if u["_id"] == profile_id)
+    if points and points[0].vector:
+        return points[0].vector
+    return upsert_user(profile_id)
 
-    # Similarity scores
-    sims = cosine_similarity([embeddings[target_index]], embeddings)[0]
 
-    # Pick top similar users EXCEPT the user itself
-    similar_user_ids = [
-        users[i]["_id"]
-        for i in np.argsort(sims)[::-1][1:6]  # top 5 excluding self
-    ]
+def recommend_demographic(profile_id: str, top_k=5):
+
+    # Identify the target user
+    if not ObjectId.is_valid(profile_id):
+        return []
+
+    target_vector = get_user_vector(profile_id)
+    if target_vector is None:
+        return []
+
+    # Top similar active students EXCEPT the user itself
+    with observe_stage("qdrant_search"):
+        hits = qdrant_client.search(
+            collection_name=USER_COLLECTION_NAME,
+            query_vector=target_vector,
+            query_filter=qmodels.Filter(
+                must=[
+                    qmodels.FieldCondition(key="role", match=qmodels.MatchValue(value="student")),
+                    qmodels.FieldCondition(key="status", match=qmodels.MatchValue(value="active")),
+                ],
+                must_not=[
+                    qmodels.FieldCondition(key="user_id", match=qmodels.MatchValue(value=str(profile_id))),
+                ]
+            ),
+            limit=NEIGHBOURS,
+            with_payload=True
+        )
+
+    similar_user_ids = [ObjectId(hit.payload["user_id"]) for hit in hits]
+    if not similar_user_ids:
+        return []
 
     # --- Fetch registrations of similar users ---
-    interactions = db.registrations.find({
-        "userId": {"$in": similar_user_ids}
-    })
+    interactions = db.registrations.find(
+        {"userId": {"$in": similar_user_ids}},
+        {"eventId": 1}
+    )
 
     event_counts = {}
     for inter in interactions:
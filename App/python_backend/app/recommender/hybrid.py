@@ -3,12 +3,13 @@ from app.recommender.collaborative import recommend_collaborative
 from app.recommender.demographic import recommend_demographic
 from app.recommender.content_based import convert_object_ids  
 from bson import ObjectId
-from pymongo import MongoClient
-import os
+from app.config.metrics import observe_stage
+import logging
+from app.config.mongo import lazy_db, RECOMMENDER_READ_PREFERENCE
 
-MONGO_URI = os.getenv("MONGO_URI")
-mongo_client = MongoClient(MONGO_URI)
-db = mongo_client["main"]
+db = lazy_db(RECOMMENDER_READ_PREFERENCE)
+
+logger = logging.getLogger(__name__)
 
 def recommend_hybrid(profile_id: str, top_k=5):
     content_scores = recommend_events_for_user(profile_id, top_k * 2)
@@ -27,12 +28,11 @@ def recommend_hybrid(profile_id: str, top_k=5):
     for item in content_scores:
         final_scores[item["event"]["_id"]] = WEIGHTS["content"] * (item["score"]) 
 
-    print("Content Scores:", final_scores)
+    logger.debug("Content scores: %s", final_scores)
     for eid in collab_ids:
         final_scores[eid] = final_scores.get(eid, 0) + WEIGHTS["collab"]
 
-    print("After Collaborative Scores:", final_scores)
-    print("collaborative scores:", WEIGHTS["collab"])
+    logger.debug("Scores after collaborative boost (%s): %s", WEIGHTS["collab"], final_scores)
     # for eid in demo_ids:
     #     final_scores[eid] = final_scores.get(eid, 0) + WEIGHTS["demo"]
 
@@ -40,7 +40,8 @@ def recommend_hybrid(profile_id: str, top_k=5):
     sorted_eids = sorted(final_scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
     event_ids = [ObjectId(eid) for eid, _ in sorted_eids]
 
-    events = list(db.events.find({"_id": {"$in": event_ids}}))
+    with observe_stage("mongo_hydration"):
+        events = list(db.events.find({"_id": {"$in": event_ids}}))
 
     id_to_event = {str(e["_id"]): e for e in events}
     ranked = [{"event": id_to_event[str(eid)], "score": score} for eid, score in sorted_eids if str(eid) in id_to_event]
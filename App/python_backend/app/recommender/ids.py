@@ -0,0 +1,85 @@
+import re
+from collections.abc import Mapping
+import numpy as np
+
+_OBJECT_ID = re.compile(r"[0-9a-f]{24}\Z")
+
+
+class IdIndex(Mapping):
+    """
+    Read-only id -> row map for the rows (or columns) of the interaction
+    matrix, used where a {str(ObjectId): row} dict was. ObjectId hex strings
+    are packed into 12-byte array entries (other ids, e.g. in fixtures, keep
+    a fixed-width string array) kept in sorted order with their int32 rows;
+    a lookup is a binary search. That is about 20 bytes per id instead of the
+    ~180 of a dict entry with its 24-character key.
+
+    Iterates ids in row order, like the dict it replaces.
+    """
+
+    def __init__(self, ids):
+        ids = list(ids)
+        self.packed = bool(ids) and all(isinstance(i, str) and _OBJECT_ID.match(i) for i in ids)
+        if self.packed:
+            encoded = np.frombuffer(b"".join(bytes.fromhex(i) for i in ids), dtype="S12")
+        else:
+            encoded = np.array([str(i) for i in ids], dtype=str)
+        order = np.argsort(encoded, kind="stable")
+        self._sorted = encoded[order]
+        self._rows = order.astype(np.int32)
+        # Position in _sorted of every row, to map rows back to ids
+        self._rank = np.empty(len(ids), dtype=np.int32)
+        self._rank[order] = np.arange(len(ids), dtype=np.int32)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild from arrays() output (e.g. memory-mapped from a snapshot) without sorting again."""
+        index = cls.__new__(cls)
+        index._sorted, index._rows, index._rank = arrays["sorted"], arrays["rows"], arrays["rank"]
+        index.packed = index._sorted.dtype.kind == "S"
+        return index
+
+    def arrays(self):
+        return {"sorted": self._sorted, "rows": self._rows, "rank": self._rank}
+
+    @property
+    def nbytes(self):
+        return self._sorted.nbytes + self._rows.nbytes + self._rank.nbytes
+
+    def _find(self, key):
+        """Row of key, or -1."""
+        if not isinstance(key, str) or (self.packed and not _OBJECT_ID.match(key)):
+            return -1
+        probe = np.array(bytes.fromhex(key), dtype="S12") if self.packed else np.array(key)
+        pos = int(np.searchsorted(self._sorted, probe))
+        if pos < len(self._sorted) and self._sorted[pos] == probe:
+            return int(self._rows[pos])
+        return -1
+
+    def __getitem__(self, key):
+        row = self._find(key)
+        if row < 0:
+            raise KeyError(key)
+        return row
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self.ids())
+
+    def id_at(self, row):
+        value = self._sorted[self._rank[row]]
+        # numpy drops trailing NUL bytes of S12 items
+        return value.ljust(12, b"\0").hex() if self.packed else str(value)
+
+    def ids(self):
+        """Every id, in row order."""
+        ordered = self._sorted[self._rank]
+        if not self.packed:
+            return ordered.tolist()
+        raw = ordered.tobytes().hex()
+        return [raw[i:i + 24] for i in range(0, len(raw), 24)]
@@ -0,0 +1,421 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+import numpy as np
+from app.recommender.ids import IdIndex
+
+logger = logging.getLogger(__name__)
+
+_COLUMN_MASK = (1 << 32) - 1
+
+# Layout of snapshot_arrays(), saved in its meta; restore() needs the cell
+# arrays sorted, which snapshots before version 2 did not guarantee
+STORE_FORMAT = 2
+
+
+def _cell(row, col):
+    """Dict key of a matrix cell."""
+    return row << 32 | col
+
+
+def _lookup(base, cell):
+    """Value of cell in a (sorted cells, values) pair of arrays, or None."""
+    if base is None:
+        return None
+    cells, values = base
+    pos = int(np.searchsorted(cells, cell))
+    if pos < len(cells) and cells[pos] == cell:
+        return values[pos].item()
+    return None
+
+
+def _lookup_many(base, codes):
+    """Values of the cells in codes from a (sorted cells, values) pair, 0 where absent."""
+    cells, values = base
+    out = np.zeros(len(codes), dtype=values.dtype)
+    if len(cells):
+        pos = np.minimum(np.searchsorted(cells, codes), len(cells) - 1)
+        found = cells[pos] == codes
+        out[found] = values[pos[found]]
+    return out
+
+
+def _merged(base, overlay, dtype):
+    """(cells, values) sorted by cell: base entries replaced or extended by the overlay dict."""
+    cells = np.fromiter(overlay, dtype=np.int64, count=len(overlay))
+    values = np.fromiter(overlay.values(), dtype=dtype, count=len(overlay))
+    if base is not None:
+        keep = ~np.isin(base[0], cells)
+        cells = np.concatenate([base[0][keep], cells])
+        values = np.concatenate([base[1][keep], values])
+    order = np.argsort(cells, kind="stable")
+    return cells[order], values[order]
+
+
+class InteractionStore:
+    """
+    In-memory copy of the user x event interactions behind collaborative
+    filtering, kept current by deltas from the Node backend (registration
+    created/cancelled, rating submitted) between full reloads.
+
+    A cell holds the user's rating, or 1 if they are registered but have not
+    rated, or 0 - the same values get_user_event_matrix() produces. Cells are
+    keyed by an int packing their row and column rather than by the pair of
+    id strings. Deltas are O(1): dict updates plus one in-place write to the
+    dense float32 matrix when the user already has a row. A new user drops
+    the matrix and the next matrix() call rebuilds it from the dicts,
+    without touching Mongo. Deltas for events outside the loaded columns
+    (drafts, completed events, or ones published since the load) are
+    dropped, as the full build only has columns for published events; the
+    next reload picks up newly published ones.
+
+    After restore() the snapshot's sorted cell arrays (memory-mapped, shared
+    between workers) and IdIndex maps are the base, looked up by binary
+    search; the dicts then only hold the users and cells changed since, as
+    an overlay on top of it.
+
+    The store also remembers whose neighbourhood each user is part of, so a
+    delta can name every user whose collaborative results it may change.
+
+    delta_seq is the position in the shared delta log (deltas.py) the
+    contents include every entry up to; entries this worker applied as they
+    arrived, ahead of that position, are remembered separately so a replay
+    skips them. Both travel with snapshots, so a restore replays exactly the
+    entries the snapshot misses.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded_at = None
+        self.version = 0
+        self._user_index = {}
+        self._event_index = {}
+        self._ratings = {}
+        self._registrations = defaultdict(int)
+        # Set by restore(): IdIndex maps of the snapshot's rows / columns and
+        # its (sorted cells, values) arrays, under the dicts above
+        self._base_users = self._base_events = None
+        self._base_ratings = self._base_registrations = None
+        self._matrix = None
+        # matrix() result (IdIndex maps, users, events) for the current _matrix
+        self._published = None
+        # user -> neighbours used for their last recommendation, and the reverse
+        self._neighbours = {}
+        self._neighbour_of = defaultdict(set)
+        self.delta_seq = 0
+        self._deltas_ahead = set()
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def load(self, user_ids, event_ids, interactions, delta_seq=0):
+        """
+        Replace the contents. interactions yields (user_id, event_id, rating)
+        with rating None for a registration; pairs outside user_ids/event_ids
+        are ignored like in the full matrix build. delta_seq is the delta log
+        head read before the interactions were queried.
+        """
+        user_index = {uid: i for i, uid in enumerate(user_ids)}
+        event_index = {eid: j for j, eid in enumerate(event_ids)}
+        ratings = {}
+        registrations = defaultdict(int)
+        for uid, eid, rating in interactions:
+            row, col = user_index.get(uid), event_index.get(eid)
+            if row is None or col is None:
+                continue
+            if rating is None:
+                registrations[_cell(row, col)] += 1
+            else:
+                ratings[_cell(row, col)] = rating
+        with self._lock:
+            self._user_index, self._event_index = user_index, event_index
+            self._ratings, self._registrations = ratings, registrations
+            self._base_users = self._base_events = None
+            self._base_ratings = self._base_registrations = None
+            self._matrix = self._published = None
+            self.delta_seq, self._deltas_ahead = delta_seq, set()
+            self.loaded_at = time.monotonic()
+            self.version += 1
+        logger.info("Loaded %d ratings and %d registrations for %d users x %d events",
+                    len(ratings), len(registrations), len(user_index), len(event_index))
+
+    def clear(self):
+        with self._lock:
+            self.loaded_at = None
+            self._user_index, self._event_index = {}, {}
+            self._ratings, self._registrations = {}, defaultdict(int)
+            self._base_users = self._base_events = None
+            self._base_ratings = self._base_registrations = None
+            self._matrix = self._published = None
+            self._neighbours, self._neighbour_of = {}, defaultdict(set)
+            self.delta_seq, self._deltas_ahead = 0, set()
+            self.version += 1
+
+    def _row(self, user_id):
+        row = self._user_index.get(user_id)
+        if row is None and self._base_users is not None:
+            row = self._base_users.get(user_id)
+        return row
+
+    def _col(self, event_id):
+        col = self._event_index.get(event_id)
+        if col is None and self._base_events is not None:
+            col = self._base_events.get(event_id)
+        return col
+
+    def _user_count(self):
+        return len(self._user_index) + (len(self._base_users) if self._base_users is not None else 0)
+
+    def user_ids(self):
+        """Every user id, in row order."""
+        base = self._base_users.ids() if self._base_users is not None else []
+        return base + list(self._user_index)
+
+    def event_ids(self):
+        """Every event id, in column order."""
+        base = self._base_events.ids() if self._base_events is not None else []
+        return base + list(self._event_index)
+
+    def _rating(self, cell):
+        rating = self._ratings.get(cell)
+        return _lookup(self._base_ratings, cell) if rating is None else rating
+
+    def _registration_count(self, cell):
+        if cell in self._registrations:
+            return self._registrations[cell]
+        return _lookup(self._base_registrations, cell) or 0
+
+    def _value(self, cell):
+        rating = self._rating(cell)
+        if rating:
+            return rating
+        return 1 if self._registration_count(cell) else 0
+
+    def value(self, user_id, event_id):
+        """Current cell value for the pair, 0 if either is unknown."""
+        with self._lock:
+            row, col = self._row(user_id), self._col(event_id)
+            return 0 if row is None or col is None else self._value(_cell(row, col))
+
+    def _cell(self, user_id, event_id):
+        """
+        Cell key of the pair, giving an unseen user the next row, or None
+        for an event without a column.
+        """
+        col = self._col(event_id)
+        if col is None:
+            return None
+        row = self._row(user_id)
+        if row is None:
+            row = self._user_index[user_id] = self._user_count()
+            self._matrix = self._published = None
+        return _cell(row, col)
+
+    def _write(self, cell):
+        """Refresh one cell after its ratings/registrations changed."""
+        if self._matrix is not None:
+            # Written in place: a request already holding the matrix sees at
+            # most this one cell change under it
+            self._matrix[cell >> 32, cell & _COLUMN_MASK] = self._value(cell)
+        self.version += 1
+
+    def _affected(self, user_ids):
+        affected = set(user_ids)
+        for uid in user_ids:
+            affected |= self._neighbour_of.get(uid, set())
+        return affected
+
+    def affected(self, user_ids):
+        """The users a delta for user_ids may affect, without applying one."""
+        with self._lock:
+            return self._affected(user_ids)
+
+    def apply_logged(self, seq, delta, in_order=True):
+        """
+        Call delta() (one of the delta methods below) for delta log entry seq
+        unless the contents already include it, and return its result, or
+        None when skipped. in_order is for replays reading the log after
+        delta_seq; otherwise the entry is applied ahead of the position.
+        """
+        with self._lock:
+            result = None
+            if seq > self.delta_seq and seq not in self._deltas_ahead:
+                result = delta()
+            if in_order:
+                self.delta_seq = max(self.delta_seq, seq)
+                self._deltas_ahead = {s for s in self._deltas_ahead if s > self.delta_seq}
+            else:
+                self._deltas_ahead.add(seq)
+            while self.delta_seq + 1 in self._deltas_ahead:
+                self.delta_seq += 1
+                self._deltas_ahead.discard(self.delta_seq)
+            return result
+
+    # The delta methods return the users whose collaborative results the
+    # change may affect: the users themselves plus everyone whose last
+    # recommendation used one of them as a neighbour. Before load() the
+    # delta is not stored (the load reads it from Mongo anyway).
+
+    def add_registration(self, user_ids, event_id):
+        with self._lock:
+            if self.loaded:
+                for uid in user_ids:
+                    cell = self._cell(uid, event_id)
+                    if cell is None:
+                        break
+                    self._registrations[cell] = self._registration_count(cell) + 1
+                    self._write(cell)
+            return self._affected(user_ids)
+
+    def remove_registration(self, user_ids, event_id):
+        with self._lock:
+            if self.loaded:
+                for uid in user_ids:
+                    row, col = self._row(uid), self._col(event_id)
+                    if row is None or col is None:
+                        continue
+                    cell = _cell(row, col)
+                    count = self._registration_count(cell)
+                    if count > 1:
+                        self._registrations[cell] = count - 1
+                    elif count:
+                        if _lookup(self._base_registrations, cell):
+                            # Shadows the snapshot's registration
+                            self._registrations[cell] = 0
+                        else:
+                            self._registrations.pop(cell, None)
+                        self._write(cell)
+            return self._affected(user_ids)
+
+    def set_rating(self, user_id, event_id, rating):
+        with self._lock:
+            if self.loaded:
+                cell = self._cell(user_id, event_id)
+                if cell is not None:
+                    self._ratings[cell] = rating
+                    self._write(cell)
+            return self._affected([user_id])
+
+    def remember_neighbours(self, user_id, neighbour_ids):
+        """Record the users a recommendation for user_id was built from."""
+        with self._lock:
+            for old in self._neighbours.get(user_id, ()):
+                self._neighbour_of[old].discard(user_id)
+            self._neighbours[user_id] = set(neighbour_ids)
+            for uid in neighbour_ids:
+                self._neighbour_of[uid].add(user_id)
+
+    def _cells(self):
+        """(rows, cols, values) of the non-zero cells as int32 / float32 arrays."""
+        cells = set(self._ratings) | set(self._registrations)
+        codes = np.fromiter(cells, dtype=np.int64, count=len(cells))
+        values = np.fromiter((self._value(c) for c in cells), dtype=np.float32, count=len(cells))
+        if self._base_ratings is not None:
+            base = np.union1d(self._base_ratings[0], self._base_registrations[0])
+            base = base[~np.isin(base, codes)]
+            ratings = _lookup_many(self._base_ratings, base).astype(np.float32)
+            registered = _lookup_many(self._base_registrations, base) > 0
+            codes = np.concatenate([codes, base])
+            values = np.concatenate([values, np.where(ratings != 0, ratings, registered.astype(np.float32))])
+        keep = values != 0
+        codes, values = codes[keep], values[keep]
+        return (codes >> 32).astype(np.int32), (codes & _COLUMN_MASK).astype(np.int32), values
+
+    def to_csr(self):
+        """(scipy.sparse CSR matrix, user_ids, event_ids) holding the same values as matrix()."""
+        from scipy import sparse
+        with self._lock:
+            rows, cols, values = self._cells()
+            user_ids, event_ids = self.user_ids(), self.event_ids()
+        matrix = sparse.csr_matrix((values, (rows, cols)), shape=(len(user_ids), len(event_ids)), dtype=np.float32)
+        return matrix, user_ids, event_ids
+
+    def snapshot_arrays(self):
+        """
+        (arrays, meta) for snapshot.write_snapshot(): the matrix, the id maps
+        and the ratings and registrations behind it as cell-sorted arrays, so
+        restore() can keep applying deltas. None before load().
+        """
+        with self._lock:
+            if not self.loaded:
+                return None
+            matrix, user_index, event_index, _, _ = self.matrix()
+            rating_cells, ratings = _merged(self._base_ratings, self._ratings, np.float32)
+            registration_cells, registrations = _merged(self._base_registrations, self._registrations, np.int32)
+            registered = registrations > 0
+            arrays = {
+                "rating_cells": rating_cells,
+                "ratings": ratings,
+                "registration_cells": registration_cells[registered],
+                "registrations": registrations[registered],
+            }
+            if matrix is not None:
+                arrays["matrix"] = matrix
+                arrays.update({f"users_{k}": v for k, v in user_index.arrays().items()})
+                arrays.update({f"events_{k}": v for k, v in event_index.arrays().items()})
+            meta = {
+                "store": STORE_FORMAT,
+                "users": self._user_count(),
+                "events": len(self.event_ids()),
+                # Wall-clock time of the load the contents come from
+                "loadedAt": time.time() - (time.monotonic() - self.loaded_at),
+                "deltaSeq": self.delta_seq,
+                "deltasAhead": sorted(self._deltas_ahead),
+            }
+            return arrays, meta
+
+    def restore(self, arrays, meta):
+        """
+        Replace the contents with a snapshot_arrays() result, typically
+        memory-mapped from disk (the matrix copy-on-write, as deltas write to
+        it). The arrays become the base as they are, without copying them
+        into dicts. The store counts as loaded at the snapshot's load time
+        and is at the snapshot's delta log position.
+        """
+        users = events = None
+        if "matrix" in arrays:
+            users = IdIndex.from_arrays({k[6:]: v for k, v in arrays.items() if k.startswith("users_")})
+            events = IdIndex.from_arrays({k[7:]: v for k, v in arrays.items() if k.startswith("events_")})
+        with self._lock:
+            self._user_index, self._event_index = {}, {}
+            self._ratings, self._registrations = {}, defaultdict(int)
+            self._base_users, self._base_events = users, events
+            self._base_ratings = (arrays["rating_cells"], arrays["ratings"])
+            self._base_registrations = (arrays["registration_cells"], arrays["registrations"])
+            self._matrix = self._published = None
+            if "matrix" in arrays:
+                self._matrix = arrays["matrix"]
+                self._published = (
+                    users, events, [{"_id": uid} for uid in users.ids()], [{"_id": eid} for eid in events.ids()],
+                )
+            self.delta_seq = meta.get("deltaSeq", 0)
+            self._deltas_ahead = set(meta.get("deltasAhead", ()))
+            self.loaded_at = time.monotonic() - (time.time() - meta["loadedAt"])
+            self.version += 1
+        logger.info("Restored %d ratings and %d registrations for %d users x %d events",
+                    len(arrays["ratings"]), len(arrays["registrations"]), meta["users"], meta["events"])
+
+    def matrix(self):
+        """
+        (matrix, user_index, event_index, users, events) shaped like
+        get_user_event_matrix(). The result is shared between callers until
+        a new user or event or a reload replaces it; treat it as read-only.
+        """
+        with self._lock:
+            if self._matrix is None or self._published is None:
+                user_ids, event_ids = self.user_ids(), self.event_ids()
+                if not user_ids or not event_ids:
+                    return None, None, None, [{"_id": uid} for uid in user_ids], [{"_id": eid} for eid in event_ids]
+                if self._matrix is None:
+                    matrix = np.zeros((len(user_ids), len(event_ids)), dtype=np.float32)
+                    rows, cols, values = self._cells()
+                    matrix[rows, cols] = values
+                    self._matrix = matrix
+                if self._published is None:
+                    self._published = (
+                        IdIndex(user_ids), IdIndex(event_ids),
+                        [{"_id": uid} for uid in user_ids], [{"_id": eid} for eid in event_ids],
+                    )
+            return (self._matrix, *self._published)
@@ -0,0 +1,199 @@
+import os
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import DuplicateKeyError
+from app.config.mongo import lazy_db
+
+logger = logging.getLogger(__name__)
+
+db = lazy_db()
+
+# Background worker threads per process. 0 runs every job inline in the
+# submitting thread (tests, one-off scripts).
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+
+# A queued/running job whose progress has not moved for this long is
+# considered abandoned (e.g. its worker was killed) and no longer blocks
+# a new job of the same type.
+JOB_STALE_MINUTES = int(os.getenv("JOB_STALE_MINUTES", "30"))
+
+# Finished jobs are removed by a TTL index after this many days
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value):
+    # pymongo returns naive datetimes in UTC
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def public_job(doc):
+    """JSON-friendly view of a job document."""
+    job = {k: v for k, v in doc.items() if k not in ("_id", "lock")}
+    job["job_id"] = doc["_id"]
+    for key, value in job.items():
+        if isinstance(value, datetime):
+            job[key] = _as_utc(value).isoformat()
+    return job
+
+
+class JobQueue:
+    """
+    In-process runner for long indexing jobs with a Mongo-persisted job table,
+    so any worker can report status and progress for any job.
+
+    Handlers are registered per job type and called as handler(params, progress)
+    where progress(done, total) records progress. Job types registered with
+    dedupe=True have at most one queued/running job at a time across all
+    processes: the active job holds a unique "lock" field, so a concurrent
+    submit gets the existing job back instead of starting another. Passing a
+    lock name as dedupe makes several job types share one lock.
+
+    collection defaults to db.recommender_jobs, looked up on every use so
+    the queue neither connects at import nor keeps a client closed by
+    close_mongo_client().
+    """
+
+    def __init__(self, collection=None, workers=JOB_WORKERS):
+        self._collection = collection
+        self._handlers = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recommender-job") if workers > 0 else None
+        self._indexes_ready = False
+        self._lock = threading.Lock()
+
+    @property
+    def collection(self):
+        return db.recommender_jobs if self._collection is None else self._collection
+
+    def register(self, job_type, handler, dedupe=False):
+        lock = job_type if dedupe is True else dedupe or None
+        self._handlers[job_type] = (handler, lock)
+
+    def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        try:
+            self.collection.create_index("lock", unique=True, sparse=True)
+            self.collection.create_index("finishedAt", expireAfterSeconds=JOB_RETENTION_DAYS * 86400)
+            self.collection.create_index([("type", 1), ("createdAt", -1)])
+        except Exception as e:
+            logger.warning("Could not create job indexes: %s", e)
+        self._indexes_ready = True
+
+    def _new_job(self, job_type, params, lock):
+        now = _utcnow()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "type": job_type,
+            "params": params,
+            "status": "queued",
+            "progress": {"done": 0, "total": None},
+            "result": None,
+            "error": None,
+            "createdAt": now,
+            "updatedAt": now,
+            "startedAt": None,
+            "finishedAt": None,
+        }
+        if lock:
+            job["lock"] = lock
+        return job
+
+    def _claim(self, job):
+        """Insert a deduplicated job, or return the active job holding its lock."""
+        for _ in range(2):
+            try:
+                self.collection.insert_one(job)
+                return job, True
+            except DuplicateKeyError:
+                active = self.collection.find_one({"lock": job["lock"]})
+                if not isinstance(active, dict):
+                    continue  # finished between the insert and the lookup
+                stale_before = _utcnow() - timedelta(minutes=JOB_STALE_MINUTES)
+                if _as_utc(active["updatedAt"]) >= stale_before:
+                    return active, False
+                logger.warning("Releasing stale %s job %s", active["type"], active["_id"])
+                self.collection.update_one(
+                    {"_id": active["_id"], "lock": job["lock"]},
+                    {"$set": {"status": "failed", "error": "abandoned", "finishedAt": _utcnow()},
+                     "$unset": {"lock": ""}},
+                )
+        raise RuntimeError(f"Could not acquire the {job['lock']} job lock")
+
+    def submit(self, job_type, params=None):
+        """
+        Queue a job and return (job, created). created is False when an
+        active job of a deduplicated type was returned instead.
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type '{job_type}'")
+        handler, lock = self._handlers[job_type]
+        self._ensure_indexes()
+
+        job = self._new_job(job_type, params or {}, lock)
+        with self._lock:
+            if lock:
+                job, created = self._claim(job)
+                if not created:
+                    return job, False
+            else:
+                self.collection.insert_one(job)
+
+        if self._pool is None:
+            self._run(job, handler)
+        else:
+            self._pool.submit(self._run, job, handler)
+        return job, True
+
+    def _update(self, job, fields, unset=None):
+        fields["updatedAt"] = _utcnow()
+        job.update(fields)
+        update = {"$set": fields}
+        if unset:
+            update["$unset"] = {key: "" for key in unset}
+            for key in unset:
+                job.pop(key, None)
+        self.collection.update_one({"_id": job["_id"]}, update)
+
+    def _run(self, job, handler):
+        def progress(done, total=None):
+            self._update(job, {"progress": {"done": done, "total": total}})
+
+        self._update(job, {"status": "running", "startedAt": _utcnow()})
+        try:
+            result = handler(job["params"], progress)
+        except Exception as e:
+            logger.exception("%s job %s failed", job["type"], job["_id"])
+            self._update(job, {"status": "failed", "error": str(e), "finishedAt": _utcnow()}, unset=["lock"])
+        else:
+            self._update(job, {"status": "succeeded", "result": result, "finishedAt": _utcnow()}, unset=["lock"])
+            logger.info("%s job %s finished", job["type"], job["_id"])
+
+    def get(self, job_id):
+        doc = self.collection.find_one({"_id": job_id})
+        return doc if isinstance(doc, dict) else None
+
+    def last_finished(self, job_types):
+        """Most recently finished (succeeded or failed) job of the given types, or None."""
+        doc = self.collection.find_one(
+            {"type": {"$in": list(job_types)}, "status": {"$in": ["succeeded", "failed"]}},
+            sort=[("finishedAt", -1)],
+        )
+        return doc if isinstance(doc, dict) else None
+
+    def recent(self, job_type=None, limit=20):
+        query = {"type": job_type} if job_type else {}
+        return list(self.collection.find(query).sort("createdAt", -1).limit(limit))
+
+
+job_queue = JobQueue()
@@ -0,0 +1,90 @@
+import os
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Signature length is LSH_BANDS * LSH_ROWS. Two users become candidates when
+# all rows of at least one band agree, which happens with probability
+# 1 - (1 - J^rows)^bands for Jaccard similarity J. More bands or fewer rows
+# raise recall and the number of candidates scored; the opposite is faster.
+LSH_BANDS = int(os.getenv("LSH_BANDS", "32"))
+LSH_ROWS = int(os.getenv("LSH_ROWS", "2"))
+LSH_SEED = 1
+
+# Mersenne prime for the universal hashes h(x) = (a*x + b) mod p
+_PRIME = (1 << 31) - 1
+
+
+class MinHashLSH:
+    """
+    MinHash LSH over the sets of events each user interacted with (the
+    non-zero columns of the user x event matrix). candidates(i) returns the
+    users sharing at least one band bucket with user i: the likely nearest
+    neighbours, found without comparing against every user. Users with no
+    interactions are never candidates.
+    """
+
+    def __init__(self, matrix, bands=LSH_BANDS, rows=LSH_ROWS, seed=LSH_SEED):
+        self.bands = bands
+        self.rows = rows
+        n_users, n_events = matrix.shape
+        n_hashes = bands * rows
+
+        rng = np.random.default_rng(seed)
+        a = rng.integers(1, _PRIME, n_hashes, dtype=np.int64)
+        b = rng.integers(0, _PRIME, n_hashes, dtype=np.int64)
+        # Hash of every event column under every hash function: (n_events, n_hashes)
+        column_hashes = (np.arange(n_events, dtype=np.int64)[:, None] * a + b) % _PRIME
+
+        signatures = np.full((n_users, n_hashes), _PRIME, dtype=np.int64)
+        by_event = np.ascontiguousarray((matrix != 0).T)
+        for j in range(n_events):
+            users = np.flatnonzero(by_event[j])
+            if len(users):
+                signatures[users] = np.minimum(signatures[users], column_hashes[j])
+        self.active = by_event.any(axis=0)
+
+        # Per band: the bucket of every user, and users sorted by bucket so a
+        # bucket's members are the slice order[start[bucket]:start[bucket + 1]]
+        self._bucket_of = np.empty((bands, n_users), dtype=np.int64)
+        self._order = np.empty((bands, n_users), dtype=np.int64)
+        self._start = []
+        for band in range(bands):
+            _, bucket_of = np.unique(signatures[:, band * rows:(band + 1) * rows], axis=0, return_inverse=True)
+            bucket_of = bucket_of.reshape(-1)
+            self._bucket_of[band] = bucket_of
+            self._order[band] = np.argsort(bucket_of, kind="stable")
+            self._start.append(np.searchsorted(bucket_of[self._order[band]], np.arange(bucket_of.max() + 2)))
+
+    def arrays(self):
+        """The index as flat arrays, for a snapshot; from_arrays() rebuilds it."""
+        return {
+            "active": self.active,
+            "bucket_of": self._bucket_of,
+            "order": self._order,
+            "start": np.concatenate(self._start),
+            "start_offsets": np.cumsum([0] + [len(s) for s in self._start]),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, bands, rows):
+        index = cls.__new__(cls)
+        index.bands, index.rows = bands, rows
+        index.active = arrays["active"]
+        index._bucket_of, index._order = arrays["bucket_of"], arrays["order"]
+        offsets = arrays["start_offsets"]
+        index._start = [arrays["start"][offsets[b]:offsets[b + 1]] for b in range(bands)]
+        return index
+
+    def candidates(self, user_idx):
+        """Row numbers of users that collide with user_idx in any band, excluding itself."""
+        if not self.active[user_idx]:
+            return np.empty(0, dtype=np.int64)
+        slices = []
+        for band in range(self.bands):
+            bucket = self._bucket_of[band, user_idx]
+            slices.append(self._order[band, self._start[band][bucket]:self._start[band][bucket + 1]])
+        found = np.unique(np.concatenate(slices))
+        found = found[self.active[found]]
+        return found[found != user_idx]
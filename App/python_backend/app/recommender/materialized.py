@@ -0,0 +1,172 @@
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pymongo import ReplaceOne
+from app.recommender.hybrid import recommend_hybrid
+from app.recommender import collaborative
+from app.config.mongo import lazy_db, RECOMMENDER_READ_PREFERENCE
+
+logger = logging.getLogger(__name__)
+
+# The recommendations collection is read right after it is invalidated or
+# written, so it stays on the primary; only the offline scan of every
+# student in precompute_all() may read from a secondary.
+db = lazy_db()
+scan_db = lazy_db(RECOMMENDER_READ_PREFERENCE)
+
+# How many hybrid recommendations are stored per user; requests for
+# top_k <= MATERIALIZE_TOP_N are served straight from the stored list.
+MATERIALIZE_TOP_N = int(os.getenv("MATERIALIZE_TOP_N", "20"))
+
+# Stored recommendations older than this are recomputed on read.
+RECOMMENDATION_TTL_MINUTES = int(os.getenv("RECOMMENDATION_TTL_MINUTES", "60"))
+
+# Worker processes for the batch precompute (defaults to cpu count)
+MATERIALIZE_WORKERS = int(os.getenv("MATERIALIZE_WORKERS", "0")) or None
+
+_event_index_ready = False
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _computed_at(doc):
+    computed_at = doc.get("computedAt")
+    # pymongo returns naive datetimes in UTC
+    if computed_at is not None and computed_at.tzinfo is None:
+        computed_at = computed_at.replace(tzinfo=timezone.utc)
+    return computed_at
+
+
+def _is_fresh(doc, top_k):
+    if not isinstance(doc, dict) or doc.get("topN", 0) < top_k:
+        return False
+    computed_at = _computed_at(doc)
+    if computed_at is None:
+        return False
+    return _utcnow() - computed_at < timedelta(minutes=RECOMMENDATION_TTL_MINUTES)
+
+
+def _materialized_doc(profile_id, recommendations, top_n):
+    return {
+        "_id": str(profile_id),
+        "recommendations": recommendations,
+        "topN": top_n,
+        "computedAt": _utcnow(),
+    }
+
+
+def _init_worker():
+    """
+    Process-pool initializer. With INTERACTION_MATRIX_TTL_SECONDS=0 every
+    recommend_hybrid() call would rebuild the interaction matrix from Mongo;
+    a precompute worker instead loads it once into its interaction store and
+    keeps it for every user it is given. The pool lives for one run, so the
+    matrix is never older than the run.
+    """
+    if collaborative.INTERACTION_MATRIX_TTL_SECONDS <= 0:
+        collaborative.INTERACTION_MATRIX_TTL_SECONDS = float("inf")
+        # Snapshots are only shared under a real TTL
+        collaborative.COLLAB_SNAPSHOT_PATH = ""
+
+
+def _compute_for_user(args):
+    """Process-pool worker: compute hybrid recommendations for one user."""
+    profile_id, top_n = args
+    try:
+        return profile_id, recommend_hybrid(profile_id, top_n)
+    except Exception as e:
+        logger.error("Failed to precompute recommendations for %s: %s", profile_id, e)
+        return profile_id, None
+
+
+def get_materialized(profile_id: str, top_k=5):
+    """
+    Return (recommendations, computedAt) from the materialized collection,
+    or None on a miss / when the stored list is stale or too short.
+    computedAt is timezone-aware (UTC), like materialize()'s.
+    """
+    doc = db.recommendations.find_one({"_id": str(profile_id)})
+    if not _is_fresh(doc, top_k):
+        return None
+    return doc["recommendations"][:top_k], _computed_at(doc)
+
+
+def materialize(profile_id: str, recommendations, top_n):
+    """Store a freshly computed top-N list. Returns its computedAt timestamp."""
+    doc = _materialized_doc(profile_id, recommendations, top_n)
+    db.recommendations.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+    return doc["computedAt"]
+
+
+def recently_materialized(limit):
+    """Profile ids with the most recently computed recommendations (the active users)."""
+    docs = db.recommendations.find({}, {"_id": 1}).sort("computedAt", -1).limit(limit)
+    return [doc["_id"] for doc in docs]
+
+
+def invalidate_recommendations(profile_id: str = None):
+    """Drop stored recommendations for one user, or for everyone."""
+    if profile_id is None:
+        db.recommendations.delete_many({})
+    else:
+        db.recommendations.delete_one({"_id": str(profile_id)})
+
+
+def invalidate_recommendations_with_events(event_ids):
+    """
+    Drop stored recommendations listing any of the events, after they were
+    re-indexed or removed. Lists without them stay until their TTL or the
+    next precompute, which is also when newly added events enter them.
+    """
+    global _event_index_ready
+    if not event_ids:
+        return
+    if not _event_index_ready:
+        db.recommendations.create_index("recommendations.event._id")
+        _event_index_ready = True
+    db.recommendations.delete_many({"recommendations.event._id": {"$in": [str(eid) for eid in event_ids]}})
+
+
+def invalidate_recommendations_for(profile_ids):
+    """Drop stored recommendations for several users in one round trip."""
+    if profile_ids:
+        db.recommendations.delete_many({"_id": {"$in": [str(pid) for pid in profile_ids]}})
+
+
+def precompute_all(top_n=MATERIALIZE_TOP_N, workers=MATERIALIZE_WORKERS, progress=None):
+    """
+    Batch job: precompute top-N hybrid recommendations for all active
+    students. progress(done, total) is called as each chunk of users
+    comes back from the pool.
+    """
+    profile_ids = [
+        str(u["_id"])
+        for u in scan_db.users.find({"role": "student", "status": {"$ne": "suspended"}}, {"_id": 1})
+    ]
+    if not profile_ids:
+        return 0
+
+    # spawn, not fork: MongoClient is not fork-safe
+    ctx = multiprocessing.get_context("spawn")
+    chunksize = max(1, len(profile_ids) // 64)
+    ops = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker) as pool:
+        results = pool.map(_compute_for_user, [(pid, top_n) for pid in profile_ids], chunksize=chunksize)
+        for done, (pid, recs) in enumerate(results, 1):
+            if recs is not None:
+                ops.append(ReplaceOne({"_id": pid}, _materialized_doc(pid, recs, top_n), upsert=True))
+            if progress and (done % chunksize == 0 or done == len(profile_ids)):
+                progress(done, len(profile_ids))
+
+    if ops:
+        db.recommendations.bulk_write(ops, ordered=False)
+    logger.info("Materialized recommendations for %d users", len(ops))
+    return len(ops)
+
+
+if __name__ == "__main__":
+    precompute_all()
@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import shutil
+import logging
+import numpy as np
+from app.config.locks import file_lock
+
+logger = logging.getLogger(__name__)
+
+# Bump when the saved arrays or their meaning change; snapshots in another
+# format are ignored (and replaced by the next save)
+SNAPSHOT_FORMAT = 1
+META_FILE = "meta.json"
+# Names the current generation; replaced atomically to publish a new one
+CURRENT_FILE = "CURRENT"
+# Older generations kept besides the current one, so a worker that read
+# CURRENT just before a swap still finds the files it is about to map
+KEEP_GENERATIONS = 1
+
+
+def current_generation(root):
+    """Name of the generation published under root, or None."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _prune(root, current):
+    generations = sorted(
+        name for name in os.listdir(root)
+        if name != current and not name.endswith(".tmp") and os.path.isfile(os.path.join(root, name, META_FILE))
+    )
+    for name in generations[:max(len(generations) - KEEP_GENERATIONS, 0)]:
+        # Workers still mapping these files keep them until they unmap
+        # (on Windows the removal fails and is retried after the next publish)
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def write_snapshot(root, arrays, meta):
+    """
+    Publish arrays (name -> ndarray) as a new generation under root: a
+    directory of uncompressed .npy files, which np.load can memory-map, plus
+    META_FILE. CURRENT is switched to it in one rename, so readers see
+    either the previous generation or the complete new one. Returns the
+    generation name.
+    """
+    os.makedirs(root, exist_ok=True)
+    generation = f"{time.time_ns():020d}"
+    tmp = os.path.join(root, f"{generation}.tmp")
+    os.makedirs(tmp)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), np.asarray(array), allow_pickle=False)
+    with open(os.path.join(tmp, META_FILE), "w") as f:
+        json.dump({**meta, "format": SNAPSHOT_FORMAT, "createdAt": time.time(), "arrays": sorted(arrays)}, f)
+    os.replace(tmp, os.path.join(root, generation))
+
+    pointer = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(pointer, "w") as f:
+        f.write(generation)
+    os.replace(pointer, os.path.join(root, CURRENT_FILE))
+    _prune(root, generation)
+    return generation
+
+
+def read_snapshot(root, mmap_modes=None):
+    """
+    (meta, arrays) of the current generation under root, or None if there
+    is none or it has another format. meta["generation"] names it. Arrays
+    are memory-mapped read-only, or with the mode given for their name in
+    mmap_modes ("c" maps copy-on-write for arrays the caller updates in
+    place), so every process reading a generation shares its pages.
+    """
+    generation = current_generation(root)
+    if generation is None:
+        return None
+    directory = os.path.join(root, generation)
+    with open(os.path.join(directory, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        logger.warning("Ignoring snapshot %s in format %s (expected %s)", directory, meta.get("format"), SNAPSHOT_FORMAT)
+        return None
+    mmap_modes = mmap_modes or {}
+    arrays = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_modes.get(name, "r"), allow_pickle=False)
+        for name in meta["arrays"]
+    }
+    return {**meta, "generation": generation}, arrays
+
+
+def builder_lock(root, blocking=True):
+    """
+    Inter-process lock on root, held by the one worker building the next
+    generation. Yields whether it was acquired (always True when blocking;
+    a waiting worker should re-read the snapshot its builder published).
+    """
+    return file_lock(root, blocking)
@@ -1,10 +1,252 @@
-import threading, time
+import os
+import socket
+import threading
+import uuid
+import logging
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import DuplicateKeyError
 from app.recommender.content_based import index_all_events
+from app.recommender.demographic import index_all_users
+from app.config.qdrant import qdrant_client, USER_COLLECTION_NAME
+from app.recommender.materialized import precompute_all
+from app.recommender import collaborative
+from app.recommender.jobs import job_queue
+from app.recommender.cache import recommendation_cache
+from app.recommender.deltas import delta_log, publish_invalidation
+from app.config.mongo import lazy_db
+
+logger = logging.getLogger(__name__)
+
+db = lazy_db()
+
+# Hours between scheduled rebuilds; 0 disables the scheduler
+REBUILD_INTERVAL_HOURS = float(os.getenv("REBUILD_INTERVAL_HOURS", "12"))
+
+# The scheduler lease expires this long after the leader's last renewal,
+# so a dead leader is replaced within about one lease period.
+REBUILD_LEASE_SECONDS = int(os.getenv("REBUILD_LEASE_SECONDS", "60"))
+
+# A failed scheduled rebuild is retried after this long instead of a full interval
+REBUILD_RETRY_MINUTES = int(os.getenv("REBUILD_RETRY_MINUTES", "15"))
+
+# Seconds between each worker's replays of the shared delta log (other
+# workers' interaction deltas and cache invalidations); 0 disables them
+DELTA_SYNC_SECONDS = float(os.getenv("DELTA_SYNC_SECONDS", "1"))
+
+LEASE_NAME = "periodic_rebuild"
+
+_lease_index_ready = False
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _ensure_lease_index():
+    global _lease_index_ready
+    if not _lease_index_ready:
+        # Mongo removes lease documents once expiresAt has passed
+        db.recommender_leases.create_index("expiresAt", expireAfterSeconds=0)
+        _lease_index_ready = True
+
+
+def acquire_lease(name, owner, seconds=REBUILD_LEASE_SECONDS):
+    """
+    Take or renew the named lease for owner. Returns False while another
+    owner holds an unexpired lease.
+    """
+    _ensure_lease_index()
+    now = _utcnow()
+    try:
+        db.recommender_leases.update_one(
+            {"_id": name, "$or": [{"owner": owner}, {"expiresAt": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expiresAt": now + timedelta(seconds=seconds)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # The lease exists and matched neither condition: someone else holds it
+        return False
+    return True
+
+
+def release_lease(name, owner):
+    db.recommender_leases.delete_one({"_id": name, "owner": owner})
+
+
+def rebuild_due(interval_hours):
+    """
+    True when the last scheduled rebuild finished more than interval_hours
+    ago, or failed more than REBUILD_RETRY_MINUTES ago.
+    """
+    last = job_queue.last_finished(["scheduled_rebuild"])
+    if last is None or last.get("finishedAt") is None:
+        return True
+    finished_at = last["finishedAt"]
+    # pymongo returns naive datetimes in UTC
+    if finished_at.tzinfo is None:
+        finished_at = finished_at.replace(tzinfo=timezone.utc)
+    if last["status"] == "failed":
+        wait = timedelta(minutes=REBUILD_RETRY_MINUTES)
+    else:
+        wait = timedelta(hours=interval_hours)
+    return _utcnow() - finished_at >= wait
+
+
+def _heartbeat(progress, done, total):
+    """
+    Progress callback for the batches inside one step of a rebuild. It
+    re-records the steps done so far, which moves the job's updatedAt, so a
+    step running longer than JOB_STALE_MINUTES is not taken for abandoned
+    and released to another worker.
+    """
+    return lambda *_: progress(done, total)
+
+
+def _scheduled_rebuild(params, progress):
+    train = collaborative.COLLAB_MODEL == "als"
+    steps = 4 if train else 3
+    logger.info("Rebuilding event embeddings...")
+    events = index_all_events(progress=_heartbeat(progress, 0, steps))
+    progress(1, steps)
+    logger.info("Rebuilding user demographic embeddings...")
+    index_all_users(progress=_heartbeat(progress, 1, steps))
+    progress(2, steps)
+    result = {"events": events}
+    if train:
+        # Before precompute, so the stored recommendations use the new model
+        logger.info("Training the ALS collaborative model...")
+        result["als"] = collaborative.train_als_model(progress=_heartbeat(progress, 2, steps))
+        progress(3, steps)
+    logger.info("Precomputing hybrid recommendations...")
+    result["materialized"] = precompute_all(progress=_heartbeat(progress, steps - 1, steps))
+    # Cached responses were computed from the old embeddings and model
+    recommendation_cache.invalidate()
+    publish_invalidation()
+    progress(steps, steps)
+    return result
+
+
+# Shares the manual rebuild's lock so the two never run at the same time
+job_queue.register("scheduled_rebuild", _scheduled_rebuild, dedupe="rebuild")
+
+
+def _index_users_job(params, progress):
+    return {"users": index_all_users(progress=progress)}
+
+
+# Under the rebuild lock too: a scheduled rebuild re-creates the user
+# collection, so the two must not run at once (and either fills it)
+job_queue.register("index_users", _index_users_job, dedupe="rebuild")
+
+
+def backfill_users():
+    """
+    Queue indexing every user when the user collection is empty, as on a
+    fresh deploy, so demographic recommendations work before the first
+    scheduled rebuild. Every worker calls this at startup; the job is
+    deduplicated, so one of them indexes. Returns (job, created), where job
+    may be an active rebuild instead, or None when the collection already
+    has users.
+    """
+    if qdrant_client.count(collection_name=USER_COLLECTION_NAME).count:
+        return None
+    return job_queue.submit("index_users")
+
+
+def start_periodic_rebuild(interval_hours=REBUILD_INTERVAL_HOURS):
+    """
+    Start the rebuild scheduler in this process. Every worker runs one, but
+    only the holder of the Mongo lease queues rebuilds; the others just keep
+    trying to take over in case the leader dies. Returns a stop() function
+    that ends the scheduler and waits for it to release the lease.
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    stopping = threading.Event()
+
+    def job():
+        leader = False
+        while not stopping.is_set():
+            try:
+                acquired = acquire_lease(LEASE_NAME, owner)
+                if acquired != leader:
+                    logger.info("%s rebuild scheduler leadership", "Acquired" if acquired else "Lost")
+                leader = acquired
+                if leader and rebuild_due(interval_hours):
+                    job_queue.submit("scheduled_rebuild")
+            except Exception as e:
+                logger.error("Periodic rebuild check failed: %s", e)
+            # Renew well before the lease runs out
+            stopping.wait(REBUILD_LEASE_SECONDS / 3)
+        if leader:
+            release_lease(LEASE_NAME, owner)
+
+    thread = threading.Thread(target=job, daemon=True, name="periodic-rebuild")
+    thread.start()
+
+    def stop(timeout=5):
+        stopping.set()
+        thread.join(timeout)
+
+    return stop
+
+
+def replay_invalidations(after):
+    """
+    Drop this worker's cached recommendations for the delta log entries
+    other workers appended after sequence number after: the users an
+    interaction delta affects, or those named by an invalidation. Returns
+    the position reached.
+    """
+    entries = delta_log.read(after)
+    origin = delta_log.origin
+    for entry in entries:
+        after = entry["_id"]
+        if entry.get("origin") == origin:
+            continue
+        if entry["kind"] != "invalidate":
+            profile_ids = collaborative.interaction_store.affected(entry["users"])
+        elif "users" in entry:
+            profile_ids = entry["users"]
+        elif "event_ids" in entry:
+            recommendation_cache.invalidate_events(entry["event_ids"])
+            continue
+        else:
+            recommendation_cache.invalidate()
+            continue
+        for profile_id in profile_ids:
+            recommendation_cache.invalidate(profile_id)
+    return after
+
+
+def start_delta_sync(interval_seconds=DELTA_SYNC_SECONDS):
+    """
+    Start replaying the shared delta log in this process: the interaction
+    deltas into the collaborative store, then the cache invalidations.
+    Every worker runs one, so a change posted to any worker reaches all of
+    them within about interval_seconds. Returns a stop() function.
+    """
+    stopping = threading.Event()
 
-def start_periodic_rebuild(interval_hours=12):
     def job():
-        while True:
-            print("Rebuilding event embeddings...")
-            index_all_events()
-            time.sleep(interval_hours * 3600)
-    threading.Thread(target=job, daemon=True).start()
+        # The cache starts empty, so only later entries can make it stale
+        position = None
+        while not stopping.is_set():
+            try:
+                if position is None:
+                    position = delta_log.head()
+                collaborative.sync_deltas()
+                # A shared (Redis) cache was cleared by the worker appending the entry
+                if not recommendation_cache.shared:
+                    position = replay_invalidations(position)
+            except Exception as e:
+                logger.error("Delta log replay failed: %s", e)
+            stopping.wait(interval_seconds)
+
+    thread = threading.Thread(target=job, daemon=True, name="delta-sync")
+    thread.start()
+
+    def stop(timeout=5):
+        stopping.set()
+        thread.join(timeout)
+
+    return stop
@@ -1,8 +1,13 @@
 from fastapi import APIRouter, HTTPException, Request
-from app.agent.graph import chat_agent
 
 router = APIRouter(prefix="/bot", tags=["bot"])
 
+async def chat_agent(question: str, user_role: str, user_id: str) -> str:
+    # langgraph, langchain and the LLM client are only loaded for the first question
+    from app.agent.graph import chat_agent as run_agent
+
+    return await run_agent(question, user_role, user_id)
+
 @router.get("/")
 async def check():
     return {"message": "CEMS Mongo Chat Bot is alive"}
@@ -10,11 +15,18 @@ async def check():
 @router.post("/query")
 async def query_bot(request: Request):
     payload = await request.json()
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=422, detail="Request body must be a JSON object.")
     question = payload.get("question")
     user_role = payload.get("user_role")
     user_id = payload.get("user_id")
     if not question:
         raise HTTPException(status_code=400, detail="Missing 'question' in request body.")
+    if not isinstance(question, str):
+        raise HTTPException(status_code=422, detail="'question' must be a string.")
+    for name, value in (("user_role", user_role), ("user_id", user_id)):
+        if value is not None and not isinstance(value, str):
+            raise HTTPException(status_code=422, detail=f"'{name}' must be a string.")
     try:
         answer = await chat_agent(question, user_role, user_id)
         return {"answer": answer}
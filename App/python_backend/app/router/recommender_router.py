@@ -1,33 +1,203 @@
-from fastapi import APIRouter
+from typing import List, Optional
+from bson import ObjectId
+from fastapi import APIRouter, Body, HTTPException, Query
 from app.recommender.content_based import (
-    index_all_events, add_event, delete_event, recommend_events_for_user
+    index_all_events, add_event, delete_event, add_events, delete_events, recommend_events_for_user
 )
 from app.recommender.hybrid import recommend_hybrid
+from app.recommender.demographic import upsert_user
+from app.recommender.collaborative import record_interaction, get_user_ids_for_registration, train_als_model
+from app.recommender.materialized import (
+    get_materialized, materialize, invalidate_recommendations, invalidate_recommendations_for,
+    invalidate_recommendations_with_events, MATERIALIZE_TOP_N,
+)
+from app.recommender.cache import recommendation_cache
+from app.recommender.deltas import publish_invalidation
 from app.recommender.content_based import convert_object_ids
+from app.recommender.jobs import job_queue, public_job
+
+# Event ids per add/delete call inside an indexing job, so progress moves
+JOB_BATCH_SIZE = 100
 
 router = APIRouter(prefix="/recommend", tags=["Recommendation"])
 
+def _catalogue_changed(event_ids=None):
+    """
+    Drop the cached and stored recommendation lists that include the
+    (re)indexed or removed events, or every list after a full re-index.
+    The other workers drop their cached ones when they replay the log.
+    """
+    if event_ids is None:
+        recommendation_cache.invalidate()
+        invalidate_recommendations()
+    else:
+        recommendation_cache.invalidate_events(event_ids)
+        invalidate_recommendations_with_events(event_ids)
+    publish_invalidation(event_ids=event_ids)
+
+def _rebuild_job(params, progress):
+    indexed = index_all_events(progress=progress)
+    _catalogue_changed()
+    return {"indexed": indexed}
+
+def _batched_job(index_fn):
+    def run(params, progress):
+        event_ids = list(dict.fromkeys(params["event_ids"]))
+        results = {}
+        progress(0, len(event_ids))
+        for start in range(0, len(event_ids), JOB_BATCH_SIZE):
+            results.update(index_fn(event_ids[start:start + JOB_BATCH_SIZE]))
+            progress(min(start + JOB_BATCH_SIZE, len(event_ids)), len(event_ids))
+        _catalogue_changed(event_ids)
+        return {"results": results}
+    return run
+
+def _train_als_job(params, progress):
+    return train_als_model(progress=progress)
+
+job_queue.register("rebuild", _rebuild_job, dedupe=True)
+job_queue.register("add", _batched_job(add_events))
+job_queue.register("delete", _batched_job(delete_events))
+job_queue.register("train_als", _train_als_job, dedupe=True)
+
+def _submitted(job, created):
+    return {"job_id": job["_id"], "type": job["type"], "status": job["status"], "deduplicated": not created}
+
 @router.post("/rebuild")
 def rebuild_index():
-    index_all_events()
-    return {"status": "ok"}
+    """Queue a full re-index. Returns the running rebuild if one is already active."""
+    return _submitted(*job_queue.submit("rebuild"))
+
+@router.post("/jobs/add")
+def submit_add_job(event_ids: List[str] = Body(..., embed=True)):
+    return _submitted(*job_queue.submit("add", {"event_ids": event_ids}))
+
+@router.post("/jobs/delete")
+def submit_delete_job(event_ids: List[str] = Body(..., embed=True)):
+    return _submitted(*job_queue.submit("delete", {"event_ids": event_ids}))
+
+@router.post("/models/als/train")
+def train_als():
+    """Queue offline training of the ALS collaborative model."""
+    return _submitted(*job_queue.submit("train_als"))
+
+@router.get("/jobs")
+def list_jobs(job_type: Optional[str] = Query(None, alias="type"), limit: int = Query(20, ge=1, le=100)):
+    return {"jobs": [public_job(job) for job in job_queue.recent(job_type, limit)]}
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return public_job(job)
 
 @router.post("/add/{event_id}")
 def add(event_id: str):
     add_event(event_id)
+    _catalogue_changed([event_id])
     return {"added": event_id}
 
 @router.delete("/delete/{event_id}")
 def delete(event_id: str):
     delete_event(event_id)
+    _catalogue_changed([event_id])
     return {"deleted": event_id}
 
+@router.post("/bulk/add")
+def add_bulk(event_ids: List[str] = Body(..., embed=True)):
+    """Index many events at once, e.g. a batch of newly published sub-events."""
+    results = add_events(event_ids)
+    _catalogue_changed(event_ids)
+    return {"results": results}
+
+@router.post("/bulk/delete")
+def delete_bulk(event_ids: List[str] = Body(..., embed=True)):
+    results = delete_events(event_ids)
+    _catalogue_changed(event_ids)
+    return {"results": results}
+
+@router.post("/invalidate/{profile_id}")
+def invalidate_profile(profile_id: str):
+    """Called by the Node backend whenever a user's profile changes."""
+    recommendation_cache.invalidate(profile_id)
+    publish_invalidation([profile_id])
+    invalidate_recommendations(profile_id)
+    upsert_user(profile_id)
+    return {"invalidated": profile_id}
+
+def _registered_users(user_id, team_id):
+    """The registering user, plus the team leader and approved members for a team registration."""
+    if team_id is None:
+        return {user_id}
+    if not ObjectId.is_valid(team_id):
+        raise HTTPException(status_code=400, detail="Invalid team_id")
+    return get_user_ids_for_registration({"userId": user_id, "teamName": ObjectId(team_id)}, fresh=True)
+
+def _interaction_applied(affected):
+    """
+    Drop cached and stored recommendations of every user whose neighbourhood
+    changed. The other workers drop their cached ones when they replay the
+    delta from the log.
+    """
+    for profile_id in affected:
+        recommendation_cache.invalidate(profile_id)
+    invalidate_recommendations_for(affected)
+    return {"affected": sorted(affected)}
+
+@router.post("/interactions/registration")
+def registration_created(
+    event_id: str = Body(...), user_id: str = Body(...), team_id: Optional[str] = Body(None),
+):
+    """Called by the Node backend after a registration is created."""
+    users = _registered_users(user_id, team_id)
+    return _interaction_applied(record_interaction("registration", users, event_id))
+
+@router.post("/interactions/registration/cancel")
+def registration_cancelled(
+    event_id: str = Body(...), user_id: str = Body(...), team_id: Optional[str] = Body(None),
+):
+    users = _registered_users(user_id, team_id)
+    return _interaction_applied(record_interaction("cancel", users, event_id))
+
+@router.post("/interactions/rating")
+def rating_submitted(event_id: str = Body(...), user_id: str = Body(...), rating: float = Body(..., ge=0, le=5)):
+    return _interaction_applied(record_interaction("rating", {user_id}, event_id, rating))
+
+@router.get("/cache/stats")
+def cache_stats():
+    return recommendation_cache.report()
+
 @router.get("/content-based/{profile_id}")
-def content_based_recommend(profile_id: str, top_k: int = 5):
-    events = recommend_events_for_user(profile_id, top_k)
-    return {"recommendations": events}
+def content_based_recommend(
+    profile_id: str,
+    top_k: int = 5,
+    upcoming: bool = False,
+    my_college: bool = False,
+    free_only: bool = False,
+    tags: Optional[List[str]] = Query(None),
+):
+    filters = {"upcoming": upcoming, "same_college": my_college, "free_only": free_only, "tags": tags}
+    active = {k: v for k, v in filters.items() if v}
+
+    def compute():
+        events = recommend_events_for_user(profile_id, top_k, **active)
+        return {"recommendations": events}
+
+    variant = ",".join(f"{k}={sorted(v) if k == 'tags' else v}" for k, v in sorted(active.items()))
+    return recommendation_cache.get_or_compute("content", profile_id, top_k, compute, variant=variant)
 
 @router.get("/hybrid/{profile_id}")
 def hybrid_recommend(profile_id: str, top_k: int = 5):
-    results = recommend_hybrid(profile_id, top_k)
-    return {"recommendations": convert_object_ids(results)}
\ No newline at end of file
+    def compute():
+        cached = get_materialized(profile_id, top_k)
+        if cached is None:
+            # Miss or stale: compute the full top-N so later requests are served from it
+            top_n = max(top_k, MATERIALIZE_TOP_N)
+            results = recommend_hybrid(profile_id, top_n)
+            computed_at = materialize(profile_id, results, top_n)
+            results = results[:top_k]
+        else:
+            results, computed_at = cached
+        return {"recommendations": convert_object_ids(results), "computedAt": computed_at.isoformat()}
+    return recommendation_cache.get_or_compute("hybrid", profile_id, top_k, compute)
\ No newline at end of file
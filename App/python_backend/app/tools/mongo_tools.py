@@ -5,7 +5,10 @@ from app.agent.types import State, QueryOutput
 from app.agent.prompts import query_prompt_template
 from app.config.mongo import db
 from app.config.llm import llm 
-import traceback
+from app.config.metrics import observe_stage
+import logging
+
+logger = logging.getLogger(__name__)
 
 def _convert_object_ids(obj):
     """Recursively convert ObjectIds to str for JSON-safe output."""
@@ -49,11 +52,12 @@ async def generate_mongo_query(state: State) -> State:
     try:
         prompt = query_prompt_template.format_messages(input=state["question"], user_role=state["user_role"], user_id=state["user_id"])
         
-        response = llm.invoke(prompt)        
+        with observe_stage("llm_query_generation"):
+            response = llm.invoke(prompt)        
         mongo_query = response.content.strip()
         return {**state, "mongo_query": mongo_query}
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Failed to generate mongo query")
         return {**state, "mongo_query": f"# ERROR_GENERATING_QUERY: {str(e)}"}
 
 async def run_mongo_query(state: State) -> State:
@@ -72,8 +76,7 @@ async def run_mongo_query(state: State) -> State:
 
         collection_name = list(parsed.keys())[0]
         query_data = parsed[collection_name]
-        print(f"Mongo Collection: {collection_name}")
-        print(f"Mongo Query: {query_data}")
+        logger.debug("Mongo collection=%s query=%s", collection_name, query_data)
 
 
 
@@ -83,7 +86,7 @@ async def run_mongo_query(state: State) -> State:
             filter_query = query_data
             
             _make_search_flexible(filter_query)
-            print(f"Flexible Find Query: {filter_query}")
+            logger.debug("Flexible find query: %s", filter_query)
             
             _fix_ids(filter_query)
 
@@ -91,29 +94,31 @@ async def run_mongo_query(state: State) -> State:
             if isinstance(filter_query, dict) and "_limit" in filter_query:
                 limit = int(filter_query.pop("_limit"))
 
-            cursor = db[collection_name].find(filter_query)
-            if limit:
-                cursor = cursor.limit(limit)
-            docs = list(cursor)
+            with observe_stage("mongo_execution"):
+                cursor = db[collection_name].find(filter_query)
+                if limit:
+                    cursor = cursor.limit(limit)
+                docs = list(cursor)
 
         elif isinstance(query_data, list):
             pipeline = query_data
             
             _fix_ids(pipeline)
-            print(f"Aggregate Pipeline: {pipeline}")
+            logger.debug("Aggregate pipeline: %s", pipeline)
 
-            cursor = db[collection_name].aggregate(pipeline)
-            docs = list(cursor)
+            with observe_stage("mongo_execution"):
+                cursor = db[collection_name].aggregate(pipeline)
+                docs = list(cursor)
 
         else:
             return {**state, "result": "Invalid query data. Expected a dict or list."}
         
         docs_safe = _convert_object_ids(docs)
-        print(f"Mongo Docs Retrieved: {docs_safe[:2]}... (total {len(docs_safe)})")
+        logger.debug("Mongo docs retrieved: total=%d", len(docs_safe))
         return {**state, "result": docs_safe}
         
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Mongo execution failed")
         return {**state, "result": f"Mongo execution error: {str(e)}"}
 
 async def generate_answer(state: State) -> State:
@@ -142,11 +147,11 @@ async def generate_answer(state: State) -> State:
             "3. Summarize key details relevant to the question.\n"
             "4. If the retrieved data does not answer the specific question, state 'No relevant data found'."
         )
-        response = llm.invoke(prompt_text)
+        with observe_stage("llm_answer"):
+            response = llm.invoke(prompt_text)
         answer = getattr(response, "content", None) or str(response)
-        print(f"Final Answer: {answer}")
+        logger.debug("Final answer: %s", answer)
         return {**state, "answer": answer.strip()}
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Failed to generate answer")
         return {**state, "answer": f"Failed to generate answer: {str(e)}"}
\ No newline at end of file
@@ -0,0 +1,191 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Load the chatbot stack (langgraph, LLM client) before taking traffic
+WARMUP_AGENT = os.getenv("WARMUP_AGENT", "true").lower() in ("1", "true", "yes")
+# Index every user in the background when the user collection is empty
+# (a fresh deploy), instead of waiting for the first scheduled rebuild
+WARMUP_BACKFILL_USERS = os.getenv("WARMUP_BACKFILL_USERS", "true").lower() in ("1", "true", "yes")
+# How often failed required checks are retried until the worker becomes ready
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "10"))
+
+
+class Readiness:
+    """
+    Outcome of the startup warm-up, served by /ready. The worker is ready once
+    every step has run and all required ones succeeded; optional steps (agent,
+    preloads) only make the first requests faster, so their failure is logged
+    and reported but does not hold traffic back.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checks = {}
+        self._finished = False
+
+    def record(self, name, status, required, elapsed_ms, detail=None):
+        with self._lock:
+            self._checks[name] = {
+                "status": status,
+                "required": required,
+                "elapsedMs": round(elapsed_ms, 1),
+                "detail": detail,
+            }
+
+    def finish(self):
+        with self._lock:
+            self._finished = True
+
+    def failed_required(self):
+        with self._lock:
+            return [n for n, c in self._checks.items() if c["required"] and c["status"] == "failed"]
+
+    @property
+    def ready(self):
+        with self._lock:
+            return self._finished and not any(
+                c["required"] and c["status"] == "failed" for c in self._checks.values()
+            )
+
+    def report(self):
+        ready = self.ready
+        with self._lock:
+            return {"ready": ready, "checks": {n: dict(c) for n, c in self._checks.items()}}
+
+
+def check_mongo():
+    from app.config.mongo import db
+    db.command("ping")
+
+
+def open_vector_store():
+    # Creates the collections and payload indexes if missing, which also
+    # opens the Qdrant client (and loads a local on-disk store)
+    from app.recommender.content_based import setup_collection
+    from app.recommender.demographic import setup_user_collection
+    setup_collection()
+    setup_user_collection()
+
+
+def backfill_user_collection():
+    if not WARMUP_BACKFILL_USERS:
+        return False
+    from app.recommender.utils import backfill_users
+    submitted = backfill_users()
+    if submitted is None:
+        return "already indexed"
+    job, created = submitted
+    return f"{'queued' if created else 'joined'} job {job['_id']}"
+
+
+def load_embedding_provider():
+    from app.config.embedding import embedding_provider
+    return type(embedding_provider.resolve()).__name__
+
+
+def compile_agent():
+    if not WARMUP_AGENT:
+        return False
+    from app.agent.graph import get_graph
+    from app.config.llm import llm
+    llm.resolve()
+    get_graph()
+
+
+def preload_interaction_matrix():
+    from app.recommender import collaborative
+    if collaborative.INTERACTION_MATRIX_TTL_SECONDS <= 0:
+        return False
+    _, user_index, event_index, _, _ = collaborative.load_interaction_matrix()
+    return f"{len(user_index)} users x {len(event_index)} events"
+
+
+def preload_user_vectors():
+    from app.recommender import demographic
+    from app.recommender.materialized import recently_materialized
+    if demographic.user_vector_cache is None:
+        return False
+    loaded = demographic.preload_user_vectors(recently_materialized(demographic.USER_VECTOR_CACHE_SIZE))
+    return f"{loaded} users"
+
+
+def load_als_model():
+    from app.recommender import als, collaborative
+    if collaborative.COLLAB_MODEL != "als":
+        return False
+    model = als.get_model()
+    return f"{len(model.user_index)} users x {len(model.event_index)} events" if model else "not trained yet"
+
+
+# (name, step, required). A step returning False was skipped by configuration;
+# any other return value is shown as the check's detail.
+WARMUP_STEPS = [
+    ("mongo", check_mongo, True),
+    ("vector_store", open_vector_store, True),
+    ("embedding_provider", load_embedding_provider, True),
+    ("user_backfill", backfill_user_collection, False),
+    ("agent", compile_agent, False),
+    ("interaction_matrix", preload_interaction_matrix, False),
+    ("user_vectors", preload_user_vectors, False),
+    ("als_model", load_als_model, False),
+]
+
+readiness = Readiness()
+
+
+def _run_step(state, name, step, required):
+    start = time.perf_counter()
+    try:
+        detail = step()
+        status = "skipped" if detail is False else "ok"
+    except Exception as e:
+        logger.exception("Warm-up step %s failed", name)
+        status, detail = "failed", str(e)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    state.record(name, status, required, elapsed_ms, None if detail is False else detail)
+    logger.info("Warm-up %s: %s in %.0f ms", name, status, elapsed_ms)
+
+
+def warm_up(state=None, steps=None, stop_event=None, retry_seconds=WARMUP_RETRY_SECONDS):
+    """
+    Run every warm-up step once, then retry failed required steps (e.g. Mongo
+    not reachable yet) every retry_seconds until they pass or stop_event is set.
+    """
+    state = state or readiness
+    steps = steps if steps is not None else WARMUP_STEPS
+    stop_event = stop_event or threading.Event()
+    start = time.perf_counter()
+
+    for name, step, required in steps:
+        _run_step(state, name, step, required)
+    state.finish()
+
+    while state.failed_required() and retry_seconds > 0 and not stop_event.wait(retry_seconds):
+        failed = set(state.failed_required())
+        for name, step, required in steps:
+            if name in failed:
+                _run_step(state, name, step, required)
+
+    if state.ready:
+        logger.info("Warm-up finished in %.0f ms, worker is ready", (time.perf_counter() - start) * 1000)
+    return state
+
+
+def start_warm_up():
+    """
+    Warm up in a background thread so the server starts answering /ready
+    (with 503) straight away. Returns stop() for the shutdown path.
+    """
+    stop_event = threading.Event()
+    thread = threading.Thread(target=warm_up, kwargs={"stop_event": stop_event}, name="warm-up", daemon=True)
+    thread.start()
+
+    def stop(timeout=5):
+        stop_event.set()
+        thread.join(timeout)
+
+    return stop
@@ -1,5 +1,5 @@
 import { jest } from '@jest/globals';
-import { getRecommendations, queryChatBot, rebuildSearchIndex } from '../../controllers/ai.controller.js';
+import { getRecommendations, queryChatBot, rebuildSearchIndex, getIndexJobStatus } from '../../controllers/ai.controller.js';
 import { pythonClient } from '../../services/ai.service.js';
 
 // --- MOCKS ---
@@ -510,4 +510,39 @@ describe('AI Controller', () => {
       expect(result).toBe('rebuild_error_return');
     });
   });
+
+  // --- getIndexJobStatus ---
+  describe('getIndexJobStatus', () => {
+    it('should return job status and progress', async () => {
+      const mockJob = { job_id: 'job1', status: 'running', progress: { done: 3, total: 10 } };
+      req.params = { jobId: 'job1' };
+      pythonClient.get.mockResolvedValue({ data: mockJob });
+
+      await getIndexJobStatus(req, res);
+
+      expect(pythonClient.get).toHaveBeenCalledWith('/recommend/jobs/job1');
+      expect(res.json).toHaveBeenCalledWith(mockJob);
+    });
+
+    it('should return 404 for unknown jobs', async () => {
+      req.params = { jobId: 'missing' };
+      pythonClient.get.mockRejectedValue({ response: { status: 404 } });
+
+      await getIndexJobStatus(req, res);
+
+      expect(res.status).toHaveBeenCalledWith(404);
+      expect(res.json).toHaveBeenCalledWith({ error: 'Index job not found' });
+    });
+
+    it('should handle service errors', async () => {
+      const mockError = new Error('Service unavailable');
+      req.params = { jobId: 'job1' };
+      pythonClient.get.mockRejectedValue(mockError);
+
+      await getIndexJobStatus(req, res);
+
+      expect(console.error).toHaveBeenCalledWith('Index Job Status Error:', mockError);
+      expect(res.status).toHaveBeenCalledWith(500);
+    });
+  });
 });
@@ -1,12 +1,16 @@
 import { jest } from '@jest/globals';
 import { addRatingReviewByEID } from '../../controllers/event_controllers/event.general.controller.js';
 import Event from "../../models/event.model.js";
+import { pythonClient } from "../../services/ai.service.js";
 
 // Mock the Event model methods
 Event.findById = jest.fn();
 Event.find = jest.fn();
 Event.prototype.save = jest.fn();
 
+// Mock the AI service client
+pythonClient.post = jest.fn().mockResolvedValue({ data: {} });
+
 describe('addRatingReviewByEID', () => {
   let req, res;
 
@@ -59,6 +63,11 @@ describe('addRatingReviewByEID', () => {
     expect(mockEvent.ratings[1]).toMatchObject({ by: 'user123', rating: 5, review: 'Great!' });
     expect(mockEvent.ratings[1].createdAt).toBeInstanceOf(Date);
     expect(mockEvent.save).toHaveBeenCalled();
+    expect(pythonClient.post).toHaveBeenCalledWith('/recommend/interactions/rating', {
+      event_id: 'evt1',
+      user_id: 'user123',
+      rating: 5
+    });
     expect(res.status).toHaveBeenCalledWith(201);
     const response = res.json.mock.calls[0][0];
     expect(response.success).toBe(true);
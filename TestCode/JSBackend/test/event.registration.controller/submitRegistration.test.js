@@ -6,6 +6,7 @@ import Registration from "../../models/registration.model.js";
 import OrganizerTeam from "../../models/organizerTeam.model.js"; 
 import InboxEntity from "../../models/inbox.model.js";
 import crypto from "crypto";
+import { pythonClient } from "../../services/ai.service.js";
 
 // Mock the Event model methods
 Event.findById = jest.fn();
@@ -34,6 +35,9 @@ InboxEntity.prototype.save = jest.fn();
 // Mock crypto
 crypto.randomBytes = jest.fn();
 
+// Mock the AI service client
+pythonClient.post = jest.fn().mockResolvedValue({ data: {} });
+
 describe('submitRegistration Controller', () => {
     let req, res;
 
@@ -185,10 +189,37 @@ describe('submitRegistration Controller', () => {
             to: ['user1'],
             title: expect.stringContaining('Registration Successful')
         }));
+        expect(pythonClient.post).toHaveBeenCalledWith('/recommend/interactions/registration', {
+            event_id: 'evt1',
+            user_id: 'user1',
+            team_id: null
+        });
 
         expect(res.status).toHaveBeenCalledWith(201);
     });
 
+    test('should still succeed if the AI service is unreachable', async () => {
+        Event.findById.mockResolvedValue({
+            _id: 'evt1',
+            title: 'Free Event',
+            config: { registrationType: 'Individual', fees: 0 },
+            timeline: [],
+            registrations: [],
+            save: jest.fn()
+        });
+        Registration.findOne.mockResolvedValue(null);
+        Registration.create.mockResolvedValue({ _id: 'reg1' });
+        pythonClient.post.mockRejectedValueOnce(new Error('ECONNREFUSED'));
+        const consoleSpy = jest.spyOn(console, 'error').mockImplementation(() => {});
+
+        await submitRegistration(req, res);
+        await new Promise(setImmediate);
+
+        expect(res.status).toHaveBeenCalledWith(201);
+        expect(consoleSpy).toHaveBeenCalledWith(expect.stringContaining('AI Service'), 'ECONNREFUSED');
+        consoleSpy.mockRestore();
+    });
+
     test('should catch error in notify function silently', async () => {
         const mockSave = jest.fn();
         Event.findById.mockResolvedValue({
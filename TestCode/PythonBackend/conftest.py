@@ -11,6 +11,9 @@ import importlib
 if "MONGO_URI" not in os.environ:
     os.environ["MONGO_URI"] = "mongodb://localhost:27017/test_db"
 
+# Run recommender jobs inline so endpoint tests see their effects
+os.environ.setdefault("JOB_WORKERS", "0")
+
 # Create comprehensive mock module system
 def mock_all_missing_modules():
     """Mock all missing external dependencies"""
@@ -18,8 +21,8 @@ def mock_all_missing_modules():
         'sentence_transformers',
         'sklearn', 'sklearn.metrics', 'sklearn.metrics.pairwise',
         'qdrant_client', 'qdrant_client.http', 'qdrant_client.http.models',
-        'pymongo',
-        'google', 'google.generativeai',
+        'pymongo', 'pymongo.errors',
+        'google', 'google.generativeai', 'google.genai',
         'dotenv',
         'numpy', 'pandas', 'scipy', 'requests',
         'langchain', 'langchain_core', 'langchain_core.prompts', 'langchain_community',
@@ -51,6 +54,30 @@ def client():
     return TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def clear_recommendation_cache():
+    """Cached recommendation responses must not leak between tests"""
+    try:
+        from app.recommender.cache import recommendation_cache
+    except Exception:
+        recommendation_cache = None
+    if recommendation_cache is not None:
+        recommendation_cache.invalidate()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def clear_agent_graph():
+    """Each test compiles the agent graph from its own (mocked) StateGraph"""
+    try:
+        from app.agent.graph import get_graph
+    except Exception:
+        get_graph = None
+    if get_graph is not None:
+        get_graph.cache_clear()
+    yield
+
+
 @pytest.fixture
 def mock_db():
     """Fixture to provide mock database connection"""
@@ -199,3 +199,20 @@ async def test_chat_agent_default_answer_exact(mock_graph_class):
     result = await chat_agent("test", "student", "123")
     
     assert result == "No answer generated."
+
+
+@pytest.mark.asyncio
+@patch('app.agent.graph.build_graph')
+async def test_graph_compiled_once_and_primed_by_warmup(mock_build):
+    """Test warm-up compiles the graph and later questions reuse it"""
+    from app.agent.graph import chat_agent
+    from app.warmup import compile_agent
+
+    mock_build.return_value.ainvoke = AsyncMock(return_value={"answer": "ok"})
+
+    with patch('app.config.llm.llm'), patch('app.warmup.WARMUP_AGENT', True):
+        compile_agent()
+    await chat_agent("first", "student", "123")
+    await chat_agent("second", "student", "123")
+
+    mock_build.assert_called_once()
@@ -0,0 +1,94 @@
+"""
+Tests for single-flight deduplication of identical concurrent bot queries
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+
+
+def _slow_agent(calls):
+    async def run(question, user_role, user_id):
+        calls.append((question, user_role, user_id))
+        await asyncio.sleep(0.05)
+        return f"answer to {question}"
+    return run
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_questions_share_one_run():
+    """Test concurrent identical questions execute the pipeline once"""
+    from app.agent import graph
+
+    calls = []
+    with patch('app.agent.graph._run_agent', _slow_agent(calls)):
+        answers = await asyncio.gather(*[
+            graph.chat_agent("When is the AI Summit?", "student", "u1") for _ in range(5)
+        ])
+
+    assert len(calls) == 1
+    assert answers == ["answer to When is the AI Summit?"] * 5
+    assert graph._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_normalized_questions_are_coalesced():
+    """Test case, whitespace and trailing punctuation do not split the flight"""
+    from app.agent import graph
+
+    calls = []
+    with patch('app.agent.graph._run_agent', _slow_agent(calls)):
+        await asyncio.gather(
+            graph.chat_agent("When is the AI Summit?", "student", None),
+            graph.chat_agent("  when is the   ai summit ", "student", ""),
+        )
+
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_different_scope_is_not_coalesced():
+    """Test different users or roles never share an answer"""
+    from app.agent import graph
+
+    calls = []
+    with patch('app.agent.graph._run_agent', _slow_agent(calls)):
+        await asyncio.gather(
+            graph.chat_agent("my registrations", "student", "u1"),
+            graph.chat_agent("my registrations", "student", "u2"),
+            graph.chat_agent("my registrations", "organizer", "u1"),
+        )
+
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_sequential_questions_run_again():
+    """Test a finished flight is not reused as a cache"""
+    from app.agent import graph
+
+    calls = []
+    with patch('app.agent.graph._run_agent', _slow_agent(calls)):
+        await graph.chat_agent("events today", "student", "u1")
+        await graph.chat_agent("events today", "student", "u1")
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_all_waiters():
+    """Test a failing run raises for every coalesced caller"""
+    from app.agent import graph
+
+    async def boom(question, user_role, user_id):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("llm down")
+
+    with patch('app.agent.graph._run_agent', boom):
+        results = await asyncio.gather(
+            graph.chat_agent("q", "student", "u1"),
+            graph.chat_agent("q", "student", "u1"),
+            return_exceptions=True,
+        )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert graph._inflight == {}
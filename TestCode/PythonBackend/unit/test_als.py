@@ -0,0 +1,61 @@
+"""
+Tests for serving and training the ALS collaborative model
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.COLLAB_MODEL', "als")
+@patch('app.recommender.collaborative.load_interaction_matrix')
+@patch('app.recommender.als.get_model')
+def test_als_model_serves_known_users(mock_get_model, mock_load):
+    """Test a trained model answers without building the interaction matrix"""
+    from app.recommender.collaborative import recommend_collaborative
+
+    mock_get_model.return_value.recommend.return_value = ["e1", "e2"]
+
+    assert recommend_collaborative("u1", top_k=2) == ["e1", "e2"]
+    mock_get_model.return_value.recommend.assert_called_once_with("u1", 2)
+    mock_load.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.COLLAB_MODEL', "als")
+@patch('app.recommender.collaborative.load_interaction_matrix')
+@patch('app.recommender.als.get_model')
+def test_unknown_user_falls_back_to_neighbours(mock_get_model, mock_load):
+    """Test users missing from the model (or no model yet) use neighbour filtering"""
+    from app.recommender.collaborative import recommend_collaborative
+
+    mock_load.return_value = (None, None, None, [], [])
+
+    mock_get_model.return_value.recommend.return_value = None
+    assert recommend_collaborative("new-user") == []
+
+    mock_get_model.return_value = None
+    assert recommend_collaborative("new-user") == []
+    assert mock_load.call_count == 2
+
+
+@pytest.mark.unit
+@patch('app.recommender.als.current_generation', return_value=None)
+def test_no_model_before_training(mock_generation):
+    """Test get_model returns None until a model generation is published"""
+    from app.recommender.als import get_model
+
+    assert get_model("/nonexistent/als") is None
+    mock_generation.assert_called_once_with("/nonexistent/als")
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.job_queue')
+def test_train_endpoint_queues_job(mock_queue, client):
+    """Test training runs as a deduplicated background job"""
+    mock_queue.submit.return_value = ({"_id": "j1", "type": "train_als", "status": "queued"}, True)
+
+    response = client.post("/recommend/models/als/train")
+
+    assert response.status_code == 200
+    assert response.json() == {"job_id": "j1", "type": "train_als", "status": "queued", "deduplicated": False}
+    mock_queue.submit.assert_called_once_with("train_als")
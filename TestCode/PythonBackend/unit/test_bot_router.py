@@ -2,6 +2,7 @@
 Unit tests for bot router
 """
 import pytest
+from unittest.mock import patch, AsyncMock
 from fastapi import status
 
 
@@ -38,6 +39,22 @@ def test_query_bot_missing_question(client):
     assert response.status_code in [400, 404]
 
 
+@pytest.mark.unit
+@pytest.mark.parametrize("body", [
+    {"question": 42, "user_role": "student"},
+    {"question": ["what", "events"]},
+    {"question": "What events?", "user_id": {"id": 1}},
+    ["What events?"],
+])
+@patch('app.router.bot_router.chat_agent', new_callable=AsyncMock)
+def test_query_bot_rejects_wrong_types(mock_agent, body, client):
+    """Test a body of the wrong shape is a client error and never reaches the agent"""
+    response = client.post("/bot/query", json=body)
+
+    assert response.status_code == 422
+    mock_agent.assert_not_called()
+
+
 @pytest.mark.unit
 def test_query_bot_with_all_fields(client):
     """Test bot query with all required fields"""
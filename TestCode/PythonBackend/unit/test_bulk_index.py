@@ -0,0 +1,107 @@
+"""
+Tests for bulk add / delete of events in the content index
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+from bson import ObjectId
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.build_event_point')
+@patch('app.recommender.content_based.get_embeddings')
+@patch('app.recommender.content_based.qdrant_client')
+@patch('app.recommender.content_based.primary_db')
+def test_add_events_single_upsert(mock_db, mock_qdrant, mock_embeddings, mock_point):
+    """Test one Mongo query, one embedding call and one upsert for the batch"""
+    from app.recommender.content_based import add_events
+
+    e1, e2, missing = ObjectId(), ObjectId(), ObjectId()
+    mock_db.events.find.return_value = [{"_id": e1, "title": "A"}, {"_id": e2, "title": "B"}]
+    mock_embeddings.return_value = [[0.1, 0.2], [0.3, 0.4]]
+
+    results = add_events([str(e1), "bad-id", str(e2), str(missing), str(e1)])
+
+    assert results == {
+        str(e1): "added",
+        "bad-id": "invalid_id",
+        str(e2): "added",
+        str(missing): "not_found",
+    }
+    mock_db.events.find.assert_called_once()
+    mock_embeddings.assert_called_once()
+    mock_qdrant.upsert.assert_called_once()
+    assert len(mock_qdrant.upsert.call_args.kwargs["points"]) == 2
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.get_embeddings')
+@patch('app.recommender.content_based.qdrant_client')
+@patch('app.recommender.content_based.primary_db')
+def test_add_events_skips_failed_embeddings(mock_db, mock_qdrant, mock_embeddings):
+    """Test zero-vector fallbacks are reported instead of indexed"""
+    from app.recommender.content_based import add_events
+
+    e1 = ObjectId()
+    mock_db.events.find.return_value = [{"_id": e1, "title": "A"}]
+    mock_embeddings.return_value = [[0.0, 0.0]]
+
+    assert add_events([str(e1)]) == {str(e1): "embedding_failed"}
+    mock_qdrant.upsert.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.qdrant_client')
+def test_delete_events_single_delete(mock_qdrant):
+    """Test one delete call and per-id results"""
+    from app.recommender.content_based import delete_events
+
+    point = MagicMock()
+    point.payload = {"event_id": "e1"}
+    mock_qdrant.scroll.return_value = ([point], None)
+
+    assert delete_events(["e1", "e2"]) == {"e1": "deleted", "e2": "not_indexed"}
+    mock_qdrant.delete.assert_called_once()
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.qdrant_client')
+def test_delete_events_nothing_indexed(mock_qdrant):
+    """Test no delete request is sent when none of the events are indexed"""
+    from app.recommender.content_based import delete_events
+
+    mock_qdrant.scroll.return_value = ([], None)
+
+    assert delete_events(["e1"]) == {"e1": "not_indexed"}
+    mock_qdrant.delete.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.add_events')
+def test_bulk_add_endpoint(mock_add, client):
+    """Test the bulk add endpoint returns per-id results"""
+    mock_add.return_value = {"e1": "added", "e2": "not_found"}
+
+    response = client.post("/recommend/bulk/add", json={"event_ids": ["e1", "e2"]})
+
+    assert response.status_code == 200
+    assert response.json() == {"results": {"e1": "added", "e2": "not_found"}}
+    mock_add.assert_called_once_with(["e1", "e2"])
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.delete_events')
+def test_bulk_delete_endpoint(mock_delete, client):
+    """Test the bulk delete endpoint returns per-id results"""
+    mock_delete.return_value = {"e1": "deleted"}
+
+    response = client.post("/recommend/bulk/delete", json={"event_ids": ["e1"]})
+
+    assert response.status_code == 200
+    assert response.json() == {"results": {"e1": "deleted"}}
+
+
+@pytest.mark.unit
+def test_bulk_endpoint_requires_ids(client):
+    """Test a body without event_ids is rejected"""
+    response = client.post("/recommend/bulk/add", json={})
+    assert response.status_code == 422
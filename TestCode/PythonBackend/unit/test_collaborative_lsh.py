@@ -0,0 +1,62 @@
+"""
+Tests for the approximate (MinHash LSH) neighbour search option
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+def _world():
+    matrix = MagicMock()
+    matrix.shape = (3, 2)
+    return matrix, {"u0": 0, "u1": 1, "u2": 2}, {"e0": 0, "e1": 1}, [{"_id": "u0"}, {"_id": "u1"}, {"_id": "u2"}], \
+        [{"_id": "e0"}, {"_id": "e1"}]
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.NEIGHBOUR_SEARCH', "lsh")
+@patch('app.recommender.collaborative.cosine_similarity')
+@patch('app.recommender.collaborative.lsh_neighbours')
+@patch('app.recommender.collaborative.load_interaction_matrix')
+def test_lsh_search_skips_full_similarity(mock_load, mock_neighbours, mock_sim):
+    """Test the LSH option never builds the all-pairs similarity matrix"""
+    from app.recommender.collaborative import recommend_collaborative
+
+    mock_load.return_value = _world()
+    mock_neighbours.return_value = ([], [])
+
+    assert recommend_collaborative("u1", top_k=5) == []
+    assert mock_neighbours.call_args[0][1:] == (1, 5, 0)
+    mock_sim.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.COLLAB_MIN_SIMILARITY', 0.3)
+@patch('app.recommender.collaborative.COLLAB_NEIGHBOURS', 20)
+@patch('app.recommender.collaborative.exact_neighbours')
+@patch('app.recommender.collaborative.load_interaction_matrix')
+def test_neighbour_count_and_threshold_configurable(mock_load, mock_neighbours):
+    """Test the configured neighbour count and similarity threshold reach the search"""
+    from app.recommender.collaborative import recommend_collaborative
+
+    mock_load.return_value = _world()
+    mock_neighbours.return_value = ([], [])
+
+    assert recommend_collaborative("u2") == []
+    assert mock_neighbours.call_args[0][1:] == (2, 20, 0.3)
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.MinHashLSH')
+def test_lsh_index_reused_per_matrix(mock_lsh):
+    """Test the index is built once per matrix object and rebuilt when it is replaced"""
+    from app.recommender import collaborative
+
+    first, second = MagicMock(), MagicMock()
+    with patch.object(collaborative, "_lsh_index", (None, None)):
+        collaborative.get_lsh_index(first)
+        collaborative.get_lsh_index(first)
+        assert mock_lsh.call_count == 1
+
+        collaborative.get_lsh_index(second)
+        assert mock_lsh.call_count == 2
+        assert mock_lsh.call_args[0][0] is second
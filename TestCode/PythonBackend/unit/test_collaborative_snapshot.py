@@ -0,0 +1,95 @@
+"""
+Tests for sharing the collaborative interaction store through snapshot generations
+"""
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.COLLAB_SNAPSHOT_PATH', "snapshots/collab")
+@patch('app.recommender.collaborative.INTERACTION_MATRIX_TTL_SECONDS', 300)
+@patch('app.recommender.collaborative._snapshot_generation', None)
+@patch('app.recommender.collaborative.builder_lock')
+@patch('app.recommender.collaborative.current_generation', return_value="g1")
+@patch('app.recommender.collaborative.save_snapshot')
+@patch('app.recommender.collaborative.load_interaction_store')
+@patch('app.recommender.collaborative.restore_snapshot')
+@patch('app.recommender.collaborative.interaction_store')
+def test_fresh_snapshot_skips_mongo(mock_store, mock_restore, mock_load, mock_save, mock_generation, mock_lock):
+    """Test a published generation replaces the first load from Mongo"""
+    from app.recommender import collaborative
+
+    def restore():
+        mock_store.loaded_at = time.monotonic()
+        collaborative._snapshot_generation = "g1"
+        return True
+
+    mock_store.loaded_at = None
+    mock_restore.side_effect = restore
+
+    collaborative.load_interaction_matrix()
+    collaborative.load_interaction_matrix()
+
+    mock_restore.assert_called_once()
+    mock_lock.assert_not_called()
+    mock_load.assert_not_called()
+    mock_save.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.COLLAB_SNAPSHOT_PATH', "snapshots/collab")
+@patch('app.recommender.collaborative.INTERACTION_MATRIX_TTL_SECONDS', 300)
+@patch('app.recommender.collaborative._snapshot_generation', None)
+@patch('app.recommender.collaborative.builder_lock')
+@patch('app.recommender.collaborative.current_generation', return_value="g2")
+@patch('app.recommender.collaborative.load_interaction_store')
+@patch('app.recommender.collaborative.restore_snapshot')
+@patch('app.recommender.collaborative.interaction_store')
+def test_new_generation_attached_before_ttl(mock_store, mock_restore, mock_load, mock_generation, mock_lock):
+    """Test a generation published by another worker is picked up without waiting for the TTL"""
+    from app.recommender import collaborative
+
+    mock_store.loaded_at = time.monotonic()
+    collaborative._snapshot_generation = "g1"
+
+    collaborative.load_interaction_matrix()
+
+    mock_restore.assert_called_once()
+    mock_lock.assert_not_called()
+    mock_load.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.COLLAB_SNAPSHOT_PATH', "snapshots/collab")
+@patch('app.recommender.collaborative.INTERACTION_MATRIX_TTL_SECONDS', 300)
+@patch('app.recommender.collaborative._snapshot_generation', None)
+@patch('app.recommender.collaborative.builder_lock')
+@patch('app.recommender.collaborative.current_generation', return_value=None)
+@patch('app.recommender.collaborative.save_snapshot')
+@patch('app.recommender.collaborative.load_interaction_store')
+@patch('app.recommender.collaborative.restore_snapshot')
+@patch('app.recommender.collaborative.interaction_store')
+def test_missing_snapshot_built_under_lock(mock_store, mock_restore, mock_load, mock_save, mock_generation, mock_lock):
+    """Test without a usable generation one worker loads from Mongo and publishes one"""
+    from app.recommender.collaborative import load_interaction_matrix
+
+    mock_store.loaded_at = None
+    mock_restore.return_value = False
+
+    load_interaction_matrix()
+
+    mock_lock.assert_called_once_with("snapshots/collab")
+    mock_load.assert_called_once()
+    mock_save.assert_called_once()
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.read_snapshot')
+def test_unreadable_snapshot_falls_back(mock_read):
+    """Test a corrupt snapshot is reported as unusable instead of failing the request"""
+    from app.recommender.collaborative import restore_snapshot
+
+    mock_read.side_effect = ValueError("truncated")
+
+    assert restore_snapshot("snapshots/collab") is False
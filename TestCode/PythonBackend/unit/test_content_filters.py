@@ -0,0 +1,202 @@
+"""
+Tests for payload-indexed, filtered content-based search
+"""
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+from bson import ObjectId
+
+
+def _event(**overrides):
+    event = {
+        "_id": ObjectId(),
+        "title": "Robotics Meetup",
+        "status": "published",
+        "college": ObjectId(),
+        "categoryTags": ["robotics", "ai"],
+        "config": {"isFree": False},
+        "timeline": [
+            {"date": datetime(2030, 1, 5)},
+            {"date": datetime(2030, 1, 2)},
+        ],
+    }
+    event.update(overrides)
+    return event
+
+
+@pytest.mark.unit
+def test_event_payload_fields():
+    """Test filterable fields are copied into the payload"""
+    from app.recommender.content_based import build_event_payload
+
+    event = _event()
+    payload = build_event_payload(event)
+
+    assert payload["event_id"] == str(event["_id"])
+    assert payload["status"] == "published"
+    assert payload["college"] == str(event["college"])
+    assert payload["categoryTags"] == ["robotics", "ai"]
+    assert payload["isFree"] is False
+    assert payload["starts_at"] == datetime(2030, 1, 2, tzinfo=timezone.utc).timestamp()
+    assert payload["ends_at"] == datetime(2030, 1, 5, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.mark.unit
+def test_event_payload_defaults():
+    """Test missing config and timeline fall back to schema defaults"""
+    from app.recommender.content_based import build_event_payload
+
+    payload = build_event_payload({"_id": ObjectId()})
+
+    assert payload["status"] == "draft"
+    assert payload["isFree"] is True
+    assert payload["categoryTags"] == []
+    assert "ends_at" not in payload
+
+
+@pytest.mark.unit
+def test_event_point_id_is_deterministic():
+    """Test re-adding an event overwrites its point instead of duplicating it"""
+    from app.recommender.content_based import event_point_id
+
+    event_id = str(ObjectId())
+    assert event_point_id(event_id) == event_point_id(event_id)
+    assert event_point_id(event_id) != event_point_id(str(ObjectId()))
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.qmodels')
+def test_default_filter_is_published_only(mock_qmodels):
+    """Test unfiltered requests still exclude unpublished events"""
+    from app.recommender.content_based import build_event_filter
+
+    build_event_filter({"college": ObjectId()})
+
+    keys = [c.kwargs["key"] for c in mock_qmodels.FieldCondition.call_args_list]
+    assert keys == ["status"]
+    mock_qmodels.MatchValue.assert_called_once_with(value="published")
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.qmodels')
+def test_all_filters(mock_qmodels):
+    """Test every opt-in filter adds its payload condition"""
+    from app.recommender.content_based import build_event_filter
+
+    college = ObjectId()
+    build_event_filter({"college": college}, upcoming=True, same_college=True, free_only=True, tags=["ai"])
+
+    keys = [c.kwargs["key"] for c in mock_qmodels.FieldCondition.call_args_list]
+    assert keys == ["status", "ends_at", "college", "isFree", "categoryTags"]
+    mock_qmodels.MatchValue.assert_any_call(value=str(college))
+    mock_qmodels.MatchValue.assert_any_call(value=True)
+    mock_qmodels.MatchAny.assert_called_once_with(any=["ai"])
+    assert mock_qmodels.Range.call_args.kwargs["gte"] <= datetime.now(timezone.utc).timestamp()
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.qmodels')
+def test_same_college_without_college_is_ignored(mock_qmodels):
+    """Test my_college is a no-op for users without a college"""
+    from app.recommender.content_based import build_event_filter
+
+    build_event_filter({}, same_college=True)
+
+    keys = [c.kwargs["key"] for c in mock_qmodels.FieldCondition.call_args_list]
+    assert keys == ["status"]
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.recommend_events_for_user')
+def test_content_endpoint_passes_filters(mock_recommend, client):
+    """Test query params reach the recommender as filter kwargs"""
+    mock_recommend.return_value = []
+
+    response = client.get(
+        "/recommend/content-based/u1?top_k=3&upcoming=true&my_college=true&free_only=true&tags=ai&tags=web"
+    )
+
+    assert response.status_code == 200
+    mock_recommend.assert_called_once_with(
+        "u1", 3, upcoming=True, same_college=True, free_only=True, tags=["ai", "web"]
+    )
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.recommend_events_for_user')
+def test_content_endpoint_caches_per_filter(mock_recommend, client):
+    """Test filtered and unfiltered responses are cached separately"""
+    mock_recommend.side_effect = lambda *args, **kwargs: [kwargs]
+
+    plain = client.get("/recommend/content-based/u1").json()
+    free = client.get("/recommend/content-based/u1?free_only=true").json()
+    client.get("/recommend/content-based/u1?free_only=true")
+
+    assert plain == {"recommendations": [{}]}
+    assert free == {"recommendations": [{"free_only": True}]}
+    assert mock_recommend.call_count == 2
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.db')
+def test_registered_event_ids_include_team_registrations(mock_db):
+    """Test individual and team registrations are both looked up"""
+    from app.recommender.content_based import get_registered_event_ids
+
+    user, team = ObjectId(), ObjectId()
+    e1, e2 = ObjectId(), ObjectId()
+    mock_db.studentteams.find.return_value = [{"_id": team}]
+    mock_db.registrations.find.return_value = [{"eventId": e2}, {"eventId": e1}, {"eventId": e2}]
+
+    assert get_registered_event_ids(str(user)) == sorted([str(e1), str(e2)])
+
+    team_query = mock_db.studentteams.find.call_args[0][0]
+    assert {"leader": user} in team_query["$or"]
+    reg_query = mock_db.registrations.find.call_args[0][0]
+    assert reg_query["$or"] == [{"userId": user}, {"teamName": {"$in": [team]}}]
+    assert reg_query["status"] == {"$ne": "cancelled"}
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.qmodels')
+def test_excluded_events_become_must_not(mock_qmodels):
+    """Test registered events are excluded inside the vector search"""
+    from app.recommender.content_based import build_event_filter
+
+    build_event_filter({}, exclude_event_ids=["e1", "e2"])
+
+    mock_qmodels.MatchAny.assert_called_once_with(any=["e1", "e2"])
+    kwargs = mock_qmodels.Filter.call_args.kwargs
+    assert len(kwargs["must_not"]) == 1
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.get_registered_event_ids')
+@patch('app.recommender.content_based.build_event_filter')
+@patch('app.recommender.content_based.get_embedding')
+@patch('app.recommender.content_based.qdrant_client')
+@patch('app.recommender.content_based.db')
+def test_recommend_excludes_registered_and_hydrates_once(mock_db, mock_qdrant, mock_embed, mock_filter, mock_registered):
+    """Test the search excludes registrations and hydration is one query"""
+    from app.recommender.content_based import recommend_events_for_user
+
+    user = ObjectId()
+    e1, e2 = ObjectId(), ObjectId()
+    mock_db.users.find_one.return_value = {"_id": user, "profile": {"areasOfInterest": ["ai"]}}
+    mock_registered.return_value = ["r1"]
+    hits = []
+    for eid, score in ((e1, 0.9), (e2, 0.8)):
+        hit = MagicMock()
+        hit.payload = {"event_id": str(eid)}
+        hit.score = score
+        hits.append(hit)
+    mock_qdrant.search.return_value = hits
+    mock_db.events.find.return_value = [{"_id": e2}, {"_id": e1}]
+
+    result = recommend_events_for_user(str(user), top_k=2)
+
+    assert [r["event"]["_id"] for r in result] == [str(e1), str(e2)]
+    assert mock_filter.call_args[0][-1] == ["r1"]
+    assert mock_qdrant.search.call_args.kwargs["limit"] == 2
+    mock_db.events.find.assert_called_once_with({"_id": {"$in": [e1, e2]}})
+    mock_db.events.find_one.assert_not_called()
@@ -0,0 +1,127 @@
+"""
+Tests for the Qdrant-backed demographic recommender
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+from bson import ObjectId
+
+
+def _hit(user_id):
+    hit = MagicMock()
+    hit.payload = {"user_id": str(user_id)}
+    return hit
+
+
+@pytest.mark.unit
+def test_recommend_demographic_invalid_id():
+    """Test invalid ObjectId short-circuits before any lookup"""
+    from app.recommender.demographic import recommend_demographic
+
+    with patch('app.recommender.demographic.qdrant_client') as mock_qdrant:
+        assert recommend_demographic("not-an-id") == []
+        mock_qdrant.search.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.recommender.demographic.qdrant_client')
+@patch('app.recommender.demographic.db')
+def test_recommend_demographic_ranks_neighbour_registrations(mock_db, mock_qdrant):
+    """Test events registered by similar users are ranked by count"""
+    from app.recommender.demographic import recommend_demographic, NEIGHBOURS
+
+    target = ObjectId()
+    u1, u2 = ObjectId(), ObjectId()
+    e1, e2 = ObjectId(), ObjectId()
+
+    point = MagicMock()
+    point.vector = [0.1, 0.2]
+    mock_qdrant.retrieve.return_value = [point]
+    mock_qdrant.search.return_value = [_hit(u1), _hit(u2)]
+    mock_db.registrations.find.return_value = [
+        {"eventId": e1}, {"eventId": e2}, {"eventId": e2},
+    ]
+
+    result = recommend_demographic(str(target), top_k=5)
+
+    assert result == [str(e2), str(e1)]
+    kwargs = mock_qdrant.search.call_args.kwargs
+    assert kwargs["query_vector"] == [0.1, 0.2]
+    assert kwargs["limit"] == NEIGHBOURS
+    query = mock_db.registrations.find.call_args[0][0]
+    assert query["userId"]["$in"] == [u1, u2]
+
+
+@pytest.mark.unit
+@patch('app.recommender.demographic.qdrant_client')
+@patch('app.recommender.demographic.db')
+def test_recommend_demographic_no_neighbours(mock_db, mock_qdrant):
+    """Test no similar users means no Mongo registration lookup"""
+    from app.recommender.demographic import recommend_demographic
+
+    point = MagicMock()
+    point.vector = [0.1]
+    mock_qdrant.retrieve.return_value = [point]
+    mock_qdrant.search.return_value = []
+
+    assert recommend_demographic(str(ObjectId())) == []
+    mock_db.registrations.find.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.recommender.demographic.embed_user_genomes')
+@patch('app.recommender.demographic.qdrant_client')
+@patch('app.recommender.demographic.primary_db')
+def test_get_user_vector_indexes_on_miss(mock_db, mock_qdrant, mock_embed):
+    """Test a user missing from the collection is embedded and upserted"""
+    from app.recommender.demographic import get_user_vector
+
+    user_id = ObjectId()
+    mock_qdrant.retrieve.return_value = []
+    mock_db.users.aggregate.return_value = [
+        {"_id": user_id, "role": "student", "collegeName": "X", "areasOfInterest": ["AI"]}
+    ]
+    mock_embed.return_value = [[0.5, 0.5]]
+
+    assert get_user_vector(str(user_id)) == [0.5, 0.5]
+    mock_qdrant.upsert.assert_called_once()
+    # The collection is ensured at startup, not on every upsert
+    mock_qdrant.get_collections.assert_not_called()
+    mock_qdrant.create_collection.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.recommender.demographic.collection_config', return_value={"vectors_config": "cfg", "hnsw_config": None})
+@patch('app.recommender.demographic.qdrant_client')
+def test_setup_user_collection_uses_shared_config(mock_qdrant, mock_config):
+    """Test a missing user collection is created with the shared collection settings"""
+    from app.recommender.demographic import setup_user_collection, USER_COLLECTION_NAME
+
+    mock_qdrant.get_collections.return_value.collections = []
+    assert setup_user_collection() is True
+    mock_qdrant.create_collection.assert_called_once_with(
+        collection_name=USER_COLLECTION_NAME, vectors_config="cfg", hnsw_config=None
+    )
+
+    existing = MagicMock()
+    existing.name = USER_COLLECTION_NAME
+    mock_qdrant.get_collections.return_value.collections = [existing]
+    assert setup_user_collection() is False
+
+
+@pytest.mark.unit
+def test_user_point_id_is_deterministic():
+    """Test re-indexing a user maps to the same point id"""
+    from app.recommender.demographic import user_point_id
+
+    user_id = ObjectId()
+    assert user_point_id(user_id) == user_point_id(str(user_id))
+    assert user_point_id(user_id) != user_point_id(ObjectId())
+
+
+@pytest.mark.unit
+def test_build_user_genome():
+    """Test genome includes college and interests"""
+    from app.recommender.demographic import build_user_genome
+
+    genome = build_user_genome({"collegeName": "IIIT", "collegeCode": "IV", "areasOfInterest": ["AI", "ML"]})
+    assert genome == "IIIT IV AI ML"
@@ -0,0 +1,107 @@
+"""
+Tests for the pluggable embedding provider abstraction
+"""
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+def _recording_provider(batch_size, workers):
+    from app.config.embedding import EmbeddingProvider
+
+    class Recording(EmbeddingProvider):
+        name = "recording"
+
+        def __init__(self):
+            super().__init__(workers)
+            self.batch_size = batch_size
+            self.batches = []
+            self.threads = set()
+
+        def embed_batch(self, texts):
+            self.batches.append(list(texts))
+            self.threads.add(threading.get_ident())
+            return [[float(len(t))] for t in texts]
+
+    return Recording()
+
+
+@pytest.mark.unit
+def test_embed_splits_into_batches_and_keeps_order():
+    """Test inputs are batched and results come back in input order"""
+    provider = _recording_provider(batch_size=3, workers=4)
+    texts = ["a" * i for i in range(1, 9)]
+
+    vectors = provider.embed(texts)
+
+    assert vectors == [[float(i)] for i in range(1, 9)]
+    assert sorted(len(b) for b in provider.batches) == [2, 3, 3]
+
+
+@pytest.mark.unit
+def test_embed_single_batch_runs_inline():
+    """Test a single batch does not hop to the thread pool"""
+    provider = _recording_provider(batch_size=10, workers=4)
+    provider.embed(["x", "y"])
+
+    assert provider.threads == {threading.get_ident()}
+    assert provider._pool is None
+
+
+@pytest.mark.unit
+def test_embed_empty_input():
+    """Test no texts means no provider calls"""
+    provider = _recording_provider(batch_size=10, workers=4)
+    assert provider.embed([]) == []
+    assert provider.batches == []
+
+
+@pytest.mark.unit
+def test_unknown_provider_rejected():
+    """Test misconfigured EMBEDDING_PROVIDER fails loudly"""
+    from app.config.embedding import get_embedding_provider
+
+    with pytest.raises(RuntimeError, match="Unknown EMBEDDING_PROVIDER"):
+        get_embedding_provider("word2vec")
+
+
+@pytest.mark.unit
+def test_gemini_provider_requests_vector_size():
+    """Test Gemini calls ask for VECTOR_SIZE-dimensional output"""
+    from app.config.embedding import GeminiEmbeddingProvider
+
+    provider = GeminiEmbeddingProvider(workers=1)
+    embedding = MagicMock()
+    embedding.values = [0.1, 0.2]
+    provider.client = MagicMock()
+    provider.client.models.embed_content.return_value.embeddings = [embedding]
+
+    assert provider.embed(["hello"]) == [[0.1, 0.2]]
+    kwargs = provider.client.models.embed_content.call_args.kwargs
+    assert kwargs["contents"] == ["hello"]
+    assert kwargs["model"] == "gemini-embedding-001"
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.embedding_provider')
+def test_get_embeddings_skips_empty_texts(mock_provider):
+    """Test empty texts get zero vectors without a provider call"""
+    from app.recommender.content_based import get_embeddings, VECTOR_SIZE
+
+    mock_provider.embed.return_value = [[1.0] * VECTOR_SIZE]
+    vectors = get_embeddings(["", "robotics", "   "])
+
+    mock_provider.embed.assert_called_once_with(["robotics"])
+    assert vectors[0] == [0.0] * VECTOR_SIZE
+    assert vectors[1] == [1.0] * VECTOR_SIZE
+    assert vectors[2] == [0.0] * VECTOR_SIZE
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.embedding_provider')
+def test_get_embeddings_provider_failure_falls_back(mock_provider):
+    """Test a provider error yields zero vectors instead of raising"""
+    from app.recommender.content_based import get_embeddings, VECTOR_SIZE
+
+    mock_provider.embed.side_effect = RuntimeError("offline")
+    assert get_embeddings(["a", "b"]) == [[0.0] * VECTOR_SIZE] * 2
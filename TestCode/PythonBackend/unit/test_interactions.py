@@ -0,0 +1,272 @@
+"""
+Tests for interaction deltas (registrations, ratings) from the Node backend
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+def _store():
+    from app.recommender.interactions import InteractionStore
+
+    store = InteractionStore()
+    store.load(["u1", "u2", "u3"], ["e1", "e2"], [("u1", "e1", 4), ("u2", "e1", None)])
+    return store
+
+
+@pytest.mark.unit
+def test_deltas_ignored_before_load():
+    """Test deltas are not kept when the store is not in use"""
+    from app.recommender.interactions import InteractionStore
+
+    store = InteractionStore()
+
+    assert store.add_registration({"u1"}, "e1") == {"u1"}
+    assert store.version == 0
+
+
+@pytest.mark.unit
+def test_cell_values_follow_deltas():
+    """Test ratings win over registrations and cancelling clears the cell"""
+    store = _store()
+
+    store.add_registration({"u3"}, "e2")
+    assert store.value("u3", "e2") == 1
+
+    store.set_rating("u3", "e2", 5)
+    store.remove_registration({"u3"}, "e2")
+    assert store.value("u3", "e2") == 5
+
+    store.remove_registration({"u2"}, "e1")
+    assert store.value("u2", "e1") == 0
+
+
+@pytest.mark.unit
+def test_cancel_keeps_other_registrations():
+    """Test a user registered twice (own + team) stays registered after one cancellation"""
+    store = _store()
+
+    store.add_registration({"u2"}, "e1")
+    store.remove_registration({"u2"}, "e1")
+
+    assert store.value("u2", "e1") == 1
+
+
+@pytest.mark.unit
+@patch('app.recommender.interactions.IdIndex', lambda ids: {uid: row for row, uid in enumerate(ids)})
+def test_new_user_gets_a_row():
+    """Test an unseen user is appended to the index"""
+    store = _store()
+
+    store.add_registration({"u9"}, "e2")
+
+    _, user_index, event_index, users, events = store.matrix()
+    assert user_index["u9"] == 3
+    assert store.value("u9", "e2") == 1
+    assert len(users) == 4 and len(events) == 2
+
+
+@pytest.mark.unit
+def test_delta_for_unknown_event_ignored():
+    """Test deltas for an event outside the loaded (published) columns leave the store unchanged"""
+    store = _store()
+    version = store.version
+
+    assert store.set_rating("u9", "draft", 5) == {"u9"}
+    store.add_registration({"u1", "u9"}, "draft")
+
+    assert store.version == version
+    assert store.value("u9", "draft") == 0
+    assert list(store._user_index) == ["u1", "u2", "u3"]
+    assert list(store._event_index) == ["e1", "e2"]
+
+
+@pytest.mark.unit
+def test_affected_includes_neighbourhood():
+    """Test a delta marks users who used the changed user as a neighbour"""
+    store = _store()
+    store.remember_neighbours("u1", ["u2", "u3"])
+    store.remember_neighbours("u3", ["u2"])
+
+    assert store.set_rating("u2", "e2", 3) == {"u1", "u2", "u3"}
+
+    store.remember_neighbours("u1", ["u3"])
+    assert store.set_rating("u2", "e2", 4) == {"u2", "u3"}
+
+
+@pytest.mark.unit
+def test_logged_deltas_apply_once():
+    """Test a replay skips log entries the store applied as they arrived and keeps its position contiguous"""
+    store = _store()
+    calls = []
+
+    assert store.apply_logged(2, lambda: calls.append(2) or {"u1"}, in_order=False) == {"u1"}
+    assert store.delta_seq == 0
+    assert store.apply_logged(1, lambda: calls.append(1) or {"u2"}) == {"u2"}
+    assert store.apply_logged(2, lambda: calls.append("again")) is None
+    assert store.apply_logged(3, lambda: calls.append(3), in_order=False) is None
+
+    assert calls == [2, 1, 3]
+    assert store.delta_seq == 3 and not store._deltas_ahead
+
+
+@pytest.mark.unit
+def test_load_takes_delta_position():
+    """Test a load starts at the log position read before its queries"""
+    store = _store()
+    store.apply_logged(7, lambda: None, in_order=False)
+
+    store.load(["u1"], ["e1"], [], delta_seq=5)
+
+    assert store.delta_seq == 5 and not store._deltas_ahead
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.delta_log')
+def test_record_interaction_logs_and_applies(mock_log):
+    """Test an interaction delta is appended to the shared log and applied to this worker's store"""
+    from app.recommender import collaborative
+
+    store = _store()
+    mock_log.append.return_value = 1
+    with patch.object(collaborative, "interaction_store", store):
+        assert collaborative.record_interaction("registration", {"u3"}, "e2") == {"u3"}
+        mock_log.append.return_value = 2
+        assert collaborative.record_interaction("rating", {"u1"}, "e2", 2) == {"u1"}
+
+    assert mock_log.append.call_args_list[0].args == ({"kind": "registration", "users": ["u3"], "event_id": "e2"},)
+    assert mock_log.append.call_args.args == ({"kind": "rating", "users": ["u1"], "event_id": "e2", "rating": 2},)
+    assert store.value("u3", "e2") == 1 and store.value("u1", "e2") == 2
+    assert store.delta_seq == 2
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.delta_log')
+def test_sync_deltas_replays_other_workers_entries(mock_log):
+    """Test a replay applies the interaction entries after the store's position and moves past the rest"""
+    from app.recommender import collaborative
+
+    store = _store()
+    store.apply_logged(2, lambda: None, in_order=False)
+    batches = [[
+        {"_id": 1, "kind": "rating", "users": ["u3"], "event_id": "e1", "rating": 5},
+        {"_id": 2, "kind": "registration", "users": ["u3"], "event_id": "e2"},
+        {"_id": 3, "kind": "invalidate", "event_ids": ["e1"]},
+        {"_id": 4, "kind": "cancel", "users": ["u2"], "event_id": "e1"},
+    ], []]
+    mock_log.read.side_effect = lambda after: batches.pop(0)
+
+    assert collaborative.sync_deltas(store) == 2
+
+    assert store.value("u3", "e1") == 5
+    assert store.value("u3", "e2") == 0
+    assert store.value("u2", "e1") == 0
+    assert store.delta_seq == 4
+    assert [c.args for c in mock_log.read.call_args_list] == [(0,), (4,)]
+
+
+@pytest.mark.unit
+def test_sync_deltas_skips_unloaded_store():
+    """Test nothing is read for a store that is not in use"""
+    from app.recommender import collaborative
+    from app.recommender.interactions import InteractionStore
+
+    with patch.object(collaborative, "delta_log") as mock_log:
+        assert collaborative.sync_deltas(InteractionStore()) == 0
+    mock_log.read.assert_not_called()
+
+
+@pytest.mark.unit
+def test_delta_log_read_waits_for_a_missing_entry():
+    """Test a reader stops at a sequence number still being written and skips it once it is overdue"""
+    from datetime import datetime, timedelta, timezone
+    from app.recommender.deltas import DeltaLog
+
+    now = datetime.now(timezone.utc)
+    collection = MagicMock()
+    log = DeltaLog(collection=collection, counters=MagicMock())
+
+    def entries(*docs):
+        collection.find.return_value.sort.return_value.limit.return_value = list(docs)
+
+    entries({"_id": 1, "at": now}, {"_id": 3, "at": now})
+    assert [e["_id"] for e in log.read(0)] == [1]
+
+    entries({"_id": 3, "at": (now - timedelta(minutes=5)).replace(tzinfo=None)}, {"_id": 4, "at": now})
+    assert [e["_id"] for e in log.read(1)] == [3, 4]
+    collection.find.assert_called_with({"_id": {"$gt": 1}})
+
+
+@pytest.mark.unit
+def test_delta_log_append_numbers_entries():
+    """Test appended entries are keyed by the counter's next value and tagged with their writer"""
+    from app.recommender.deltas import DeltaLog
+
+    collection, counters = MagicMock(), MagicMock()
+    counters.find_one_and_update.return_value = {"_id": "deltas", "seq": 7}
+    log = DeltaLog(collection=collection, counters=counters)
+
+    assert log.append({"kind": "invalidate"}) == 7
+
+    doc = collection.insert_one.call_args.args[0]
+    assert doc["_id"] == 7 and doc["kind"] == "invalidate" and doc["origin"] == log.origin
+    collection.create_index.assert_called_once()
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.invalidate_recommendations_for')
+@patch('app.router.recommender_router.recommendation_cache')
+@patch('app.router.recommender_router.record_interaction')
+def test_registration_endpoint_invalidates_affected(mock_record, mock_cache, mock_invalidate, client):
+    """Test a registration delta is logged and drops cached recommendations of affected users"""
+    mock_record.return_value = {"u1", "u2"}
+
+    response = client.post("/recommend/interactions/registration", json={"event_id": "e1", "user_id": "u1"})
+
+    assert response.status_code == 200
+    assert response.json() == {"affected": ["u1", "u2"]}
+    mock_record.assert_called_once_with("registration", {"u1"}, "e1")
+    assert mock_cache.invalidate.call_count == 2
+    mock_invalidate.assert_called_once_with({"u1", "u2"})
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.invalidate_recommendations_for')
+@patch('app.router.recommender_router.get_user_ids_for_registration')
+@patch('app.router.recommender_router.record_interaction')
+def test_team_registration_expands_members(mock_record, mock_team_users, mock_invalidate, client):
+    """Test a team registration or cancellation applies to the whole team"""
+    team_id = "507f1f77bcf86cd799439011"
+    mock_team_users.return_value = {"leader", "member"}
+    mock_record.return_value = {"leader", "member"}
+
+    response = client.post(
+        "/recommend/interactions/registration/cancel",
+        json={"event_id": "e1", "user_id": "leader", "team_id": team_id},
+    )
+
+    assert response.status_code == 200
+    assert str(mock_team_users.call_args[0][0]["teamName"]) == team_id
+    assert mock_team_users.call_args.kwargs == {"fresh": True}
+    mock_record.assert_called_once_with("cancel", {"leader", "member"}, "e1")
+
+
+@pytest.mark.unit
+def test_invalid_team_id_rejected(client):
+    """Test a malformed team id is a client error"""
+    response = client.post(
+        "/recommend/interactions/registration", json={"event_id": "e1", "user_id": "u1", "team_id": "nope"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.invalidate_recommendations_for')
+@patch('app.router.recommender_router.record_interaction')
+def test_rating_endpoint(mock_record, mock_invalidate, client):
+    """Test a submitted rating is applied and out-of-range ratings are rejected"""
+    mock_record.return_value = {"u1"}
+
+    assert client.post("/recommend/interactions/rating", json={"event_id": "e1", "user_id": "u1", "rating": 4}).status_code == 200
+    mock_record.assert_called_once_with("rating", {"u1"}, "e1", 4)
+
+    assert client.post("/recommend/interactions/rating", json={"event_id": "e1", "user_id": "u1", "rating": 9}).status_code == 422
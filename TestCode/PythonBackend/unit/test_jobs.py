@@ -0,0 +1,186 @@
+"""
+Tests for the background indexing job queue
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+
+
+class DuplicateKey(Exception):
+    pass
+
+
+def _queue(collection=None):
+    from app.recommender.jobs import JobQueue
+    return JobQueue(collection or MagicMock(), workers=0)
+
+
+@pytest.mark.unit
+def test_job_records_progress_and_result():
+    """Test a successful job persists progress and its result"""
+    queue = _queue()
+
+    def handler(params, progress):
+        progress(1, 2)
+        progress(2, 2)
+        return {"indexed": params["n"]}
+
+    queue.register("rebuild", handler)
+    job, created = queue.submit("rebuild", {"n": 2})
+
+    assert created
+    assert job["status"] == "succeeded"
+    assert job["progress"] == {"done": 2, "total": 2}
+    assert job["result"] == {"indexed": 2}
+    queue.collection.insert_one.assert_called_once()
+    statuses = [c[0][1]["$set"].get("status") for c in queue.collection.update_one.call_args_list]
+    assert statuses == ["running", None, None, "succeeded"]
+
+
+@pytest.mark.unit
+def test_failed_job_records_error_and_releases_lock():
+    """Test handler exceptions mark the job failed instead of escaping"""
+    queue = _queue()
+    queue.register("rebuild", MagicMock(side_effect=RuntimeError("qdrant down")), dedupe=True)
+
+    job, _ = queue.submit("rebuild")
+
+    assert job["status"] == "failed"
+    assert job["error"] == "qdrant down"
+    assert "lock" not in job
+    assert queue.collection.update_one.call_args[0][1]["$unset"] == {"lock": ""}
+
+
+@pytest.mark.unit
+def test_unknown_job_type_rejected():
+    """Test only registered job types can be submitted"""
+    with pytest.raises(ValueError):
+        _queue().submit("reindex_everything")
+
+
+@pytest.mark.unit
+@patch('app.recommender.jobs.DuplicateKeyError', DuplicateKey)
+def test_concurrent_rebuild_is_deduplicated():
+    """Test a rebuild submitted while one is active returns the active job"""
+    collection = MagicMock()
+    collection.insert_one.side_effect = DuplicateKey()
+    active = {"_id": "abc", "type": "rebuild", "status": "running", "lock": "rebuild",
+              "updatedAt": datetime.now(timezone.utc)}
+    collection.find_one.return_value = active
+    handler = MagicMock()
+    queue = _queue(collection)
+    queue.register("rebuild", handler, dedupe=True)
+
+    job, created = queue.submit("rebuild")
+
+    assert not created
+    assert job["_id"] == "abc"
+    handler.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.recommender.jobs.DuplicateKeyError', DuplicateKey)
+def test_stale_rebuild_lock_is_released():
+    """Test an abandoned rebuild does not block new ones forever"""
+    collection = MagicMock()
+    collection.insert_one.side_effect = [DuplicateKey(), None]
+    collection.find_one.return_value = {
+        "_id": "old", "type": "rebuild", "status": "running", "lock": "rebuild",
+        "updatedAt": datetime.utcnow() - timedelta(days=1),
+    }
+    handler = MagicMock(return_value=None)
+    queue = _queue(collection)
+    queue.register("rebuild", handler, dedupe=True)
+
+    job, created = queue.submit("rebuild")
+
+    assert created
+    handler.assert_called_once()
+    release = collection.update_one.call_args_list[0][0]
+    assert release[0] == {"_id": "old", "lock": "rebuild"}
+    assert release[1]["$set"]["error"] == "abandoned"
+
+
+@pytest.mark.unit
+@patch('app.recommender.jobs.db')
+def test_default_collection_looked_up_on_each_use(mock_db):
+    """Test the shared queue resolves its collection per use, so it follows a reconnected client"""
+    from app.recommender.jobs import JobQueue
+
+    queue = JobQueue(workers=0)
+    mock_db.recommender_jobs = first = MagicMock()
+    assert queue.collection is first
+    mock_db.recommender_jobs = second = MagicMock()
+    assert queue.collection is second
+
+
+@pytest.mark.unit
+def test_public_job_serializes_dates():
+    """Test job documents are returned with job_id and ISO timestamps"""
+    from app.recommender.jobs import public_job
+
+    job = public_job({"_id": "abc", "lock": "rebuild", "createdAt": datetime(2030, 1, 1)})
+
+    assert job == {"job_id": "abc", "createdAt": "2030-01-01T00:00:00+00:00"}
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.job_queue')
+def test_rebuild_endpoint_returns_job_id(mock_queue, client):
+    """Test rebuild is queued and answered with a job id"""
+    mock_queue.submit.return_value = ({"_id": "abc", "type": "rebuild", "status": "running"}, False)
+
+    response = client.post("/recommend/rebuild")
+
+    assert response.status_code == 200
+    assert response.json() == {"job_id": "abc", "type": "rebuild", "status": "running", "deduplicated": True}
+    mock_queue.submit.assert_called_once_with("rebuild")
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.job_queue')
+def test_add_job_endpoint(mock_queue, client):
+    """Test add jobs receive the posted event ids"""
+    mock_queue.submit.return_value = ({"_id": "abc", "type": "add", "status": "queued"}, True)
+
+    response = client.post("/recommend/jobs/add", json={"event_ids": ["e1", "e2"]})
+
+    assert response.status_code == 200
+    mock_queue.submit.assert_called_once_with("add", {"event_ids": ["e1", "e2"]})
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.job_queue')
+def test_job_status_endpoint(mock_queue, client):
+    """Test job status and progress are served, and unknown ids 404"""
+    mock_queue.get.side_effect = lambda job_id: {
+        "_id": job_id, "status": "running", "progress": {"done": 3, "total": 10}
+    } if job_id == "abc" else None
+
+    response = client.get("/recommend/jobs/abc")
+    assert response.status_code == 200
+    assert response.json()["progress"] == {"done": 3, "total": 10}
+
+    assert client.get("/recommend/jobs/missing").status_code == 404
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.invalidate_recommendations_with_events')
+@patch('app.router.recommender_router.recommendation_cache')
+@patch('app.router.recommender_router.add_events')
+def test_add_job_batches_event_ids(mock_add, mock_cache, mock_with_events):
+    """Test add jobs index in batches and report progress per batch"""
+    from app.router import recommender_router
+
+    mock_add.side_effect = lambda ids: {eid: "added" for eid in ids}
+    progress = MagicMock()
+    ids = [f"e{i}" for i in range(101)]
+
+    with patch.object(recommender_router, "JOB_BATCH_SIZE", 100):
+        result = recommender_router._batched_job(mock_add)({"event_ids": ids}, progress)
+
+    assert mock_add.call_count == 2
+    assert len(result["results"]) == len(ids)
+    assert progress.call_args[0] == (len(ids), len(ids))
+    mock_cache.invalidate_events.assert_called_once_with(ids)
+    mock_with_events.assert_called_once_with(ids)
@@ -0,0 +1,63 @@
+"""
+Tests for lazily created module-level clients
+"""
+import pytest
+from unittest.mock import MagicMock
+
+
+@pytest.mark.unit
+def test_factory_runs_on_first_use_only():
+    """Test the client is built on first attribute access and then reused"""
+    from app.config.lazy import LazyClient
+
+    factory = MagicMock()
+    client = LazyClient(factory, "test")
+
+    assert not client.initialized
+    factory.assert_not_called()
+
+    client.search("events")
+    client.count("events")
+
+    factory.assert_called_once()
+    assert client.initialized
+    assert factory.return_value.search.call_args[0] == ("events",)
+
+
+@pytest.mark.unit
+def test_item_access_is_forwarded():
+    """Test database-style handles support db["collection"]"""
+    from app.config.lazy import LazyClient
+
+    client = LazyClient(lambda: {"events": 1}, "test")
+
+    assert client["events"] == 1
+
+
+@pytest.mark.unit
+def test_reset_returns_instance_and_rebuilds():
+    """Test reset hands back the old instance and the next use builds a new one"""
+    from app.config.lazy import LazyClient
+
+    factory = MagicMock(side_effect=[MagicMock(), MagicMock()])
+    client = LazyClient(factory, "test")
+    first = client.resolve()
+
+    assert client.reset() is first
+    assert client.reset() is None
+    assert client.resolve() is not first
+    assert factory.call_count == 2
+
+
+@pytest.mark.unit
+def test_close_mongo_client_resets_handles():
+    """Test module db handles do not keep using a closed MongoClient"""
+    from app.config import mongo
+
+    handle = mongo.lazy_db()
+    handle.resolve()
+    assert handle.initialized
+
+    mongo.close_mongo_client()
+
+    assert not handle.initialized
@@ -0,0 +1,150 @@
+"""
+Tests for materialized (precomputed) hybrid recommendations
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+from datetime import datetime, timedelta, timezone
+
+
+def _doc(age_minutes=0, top_n=20, recs=None):
+    return {
+        "_id": "u1",
+        "recommendations": recs if recs is not None else [{"event": {"_id": str(i)}, "score": 1.0} for i in range(top_n)],
+        "topN": top_n,
+        # pymongo hands back naive UTC datetimes
+        "computedAt": (datetime.now(timezone.utc) - timedelta(minutes=age_minutes)).replace(tzinfo=None),
+    }
+
+
+@pytest.mark.unit
+@patch('app.recommender.materialized.db')
+def test_get_materialized_fresh_hit(mock_db):
+    """Test a fresh stored list is served and sliced to top_k"""
+    from app.recommender.materialized import get_materialized
+
+    mock_db.recommendations.find_one.return_value = _doc()
+    recs, computed_at = get_materialized("u1", top_k=5)
+
+    assert len(recs) == 5
+    assert computed_at == mock_db.recommendations.find_one.return_value["computedAt"].replace(tzinfo=timezone.utc)
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.recommend_hybrid')
+@patch('app.recommender.materialized.db')
+def test_hybrid_endpoint_hit_and_miss_report_utc(mock_db, mock_hybrid, client):
+    """Test computedAt carries the UTC offset whether served from the stored list or recomputed"""
+    mock_db.recommendations.find_one.return_value = _doc()
+    hit = client.get("/recommend/hybrid/u1").json()
+    mock_hybrid.assert_not_called()
+
+    mock_db.recommendations.find_one.return_value = None
+    mock_hybrid.return_value = []
+    miss = client.get("/recommend/hybrid/u2").json()
+
+    assert hit["computedAt"].endswith("+00:00")
+    assert miss["computedAt"].endswith("+00:00")
+
+
+@pytest.mark.unit
+@patch('app.recommender.materialized.db')
+def test_get_materialized_stale_is_miss(mock_db):
+    """Test entries older than the TTL are treated as misses"""
+    from app.recommender.materialized import get_materialized, RECOMMENDATION_TTL_MINUTES
+
+    mock_db.recommendations.find_one.return_value = _doc(age_minutes=RECOMMENDATION_TTL_MINUTES + 1)
+    assert get_materialized("u1", top_k=5) is None
+
+
+@pytest.mark.unit
+@patch('app.recommender.materialized.db')
+def test_get_materialized_too_short_is_miss(mock_db):
+    """Test a stored list shorter than top_k is treated as a miss"""
+    from app.recommender.materialized import get_materialized
+
+    mock_db.recommendations.find_one.return_value = _doc(top_n=3)
+    assert get_materialized("u1", top_k=5) is None
+
+
+@pytest.mark.unit
+@patch('app.recommender.materialized.db')
+def test_get_materialized_absent_is_miss(mock_db):
+    """Test a user with no stored list is a miss"""
+    from app.recommender.materialized import get_materialized
+
+    mock_db.recommendations.find_one.return_value = None
+    assert get_materialized("u1") is None
+
+
+@pytest.mark.unit
+@patch('app.recommender.materialized.db')
+def test_materialize_upserts(mock_db):
+    """Test storing a list upserts by profile id with a timestamp"""
+    from app.recommender.materialized import materialize
+
+    computed_at = materialize("u1", [{"event": {"_id": "e1"}, "score": 0.5}], 20)
+
+    args, kwargs = mock_db.recommendations.replace_one.call_args
+    assert args[0] == {"_id": "u1"}
+    assert args[1]["topN"] == 20
+    assert args[1]["computedAt"] == computed_at
+    assert kwargs["upsert"] is True
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.COLLAB_SNAPSHOT_PATH', "snapshots/collab")
+@patch('app.recommender.collaborative.INTERACTION_MATRIX_TTL_SECONDS', 0)
+def test_precompute_worker_keeps_one_matrix():
+    """Test a precompute worker switches a per-request matrix rebuild to its in-memory store"""
+    from app.recommender import collaborative
+    from app.recommender.materialized import _init_worker
+
+    _init_worker()
+
+    assert collaborative.INTERACTION_MATRIX_TTL_SECONDS == float("inf")
+    assert collaborative.COLLAB_SNAPSHOT_PATH == ""
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.COLLAB_SNAPSHOT_PATH', "snapshots/collab")
+@patch('app.recommender.collaborative.INTERACTION_MATRIX_TTL_SECONDS', 300)
+def test_precompute_worker_keeps_configured_ttl():
+    """Test a configured matrix TTL and snapshot directory are left alone"""
+    from app.recommender import collaborative
+    from app.recommender.materialized import _init_worker
+
+    _init_worker()
+
+    assert collaborative.INTERACTION_MATRIX_TTL_SECONDS == 300
+    assert collaborative.COLLAB_SNAPSHOT_PATH == "snapshots/collab"
+
+
+@pytest.mark.unit
+@patch('app.recommender.materialized.recommend_hybrid')
+def test_compute_for_user_swallows_errors(mock_hybrid):
+    """Test a failing user does not abort the batch"""
+    from app.recommender.materialized import _compute_for_user
+
+    mock_hybrid.side_effect = RuntimeError("boom")
+    assert _compute_for_user(("u1", 20)) == ("u1", None)
+
+
+@pytest.mark.unit
+@patch('app.recommender.materialized.ProcessPoolExecutor')
+@patch('app.recommender.materialized.scan_db')
+@patch('app.recommender.materialized.db')
+def test_precompute_all_bulk_writes(mock_db, mock_scan_db, mock_pool_cls):
+    """Test batch precompute writes one upsert per successful user"""
+    from app.recommender.materialized import precompute_all
+
+    mock_scan_db.users.find.return_value = [{"_id": "u1"}, {"_id": "u2"}]
+    pool = MagicMock()
+    pool.map.return_value = [("u1", [{"event": {"_id": "e1"}, "score": 1.0}]), ("u2", None)]
+    mock_pool_cls.return_value.__enter__.return_value = pool
+
+    progress = MagicMock()
+    assert precompute_all(top_n=10, workers=2, progress=progress) == 1
+    assert mock_pool_cls.call_args.kwargs["initializer"].__name__ == "_init_worker"
+    ops = mock_db.recommendations.bulk_write.call_args[0][0]
+    assert len(ops) == 1
+    assert progress.call_args_list[-1].args == (2, 2)
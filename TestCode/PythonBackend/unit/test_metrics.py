@@ -0,0 +1,87 @@
+"""
+Tests for Prometheus metrics and per-stage instrumentation
+"""
+import pytest
+from unittest.mock import patch
+
+
+def _sample(metric, suffix, **labels):
+    for family in metric.collect():
+        for sample in family.samples:
+            if sample.name.endswith(suffix) and all(sample.labels.get(k) == v for k, v in labels.items()):
+                return sample.value
+    return 0.0
+
+
+@pytest.mark.unit
+def test_metrics_endpoint_exposes_stage_histogram(client):
+    """Test /metrics serves the Prometheus exposition format"""
+    from app.config.metrics import observe_stage
+
+    with observe_stage("qdrant_search"):
+        pass
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'cems_stage_duration_seconds_count{stage="qdrant_search"}' in response.text
+
+
+@pytest.mark.unit
+def test_observe_stage_as_decorator():
+    """Test decorated functions record one observation per call"""
+    from app.config.metrics import observe_stage, STAGE_LATENCY
+
+    @observe_stage("unit_test_stage")
+    def work():
+        return 42
+
+    before = _sample(STAGE_LATENCY, "_count", stage="unit_test_stage")
+    assert work() == 42
+    work()
+    assert _sample(STAGE_LATENCY, "_count", stage="unit_test_stage") == before + 2
+
+
+@pytest.mark.unit
+def test_empty_text_counts_zero_vector_fallback():
+    """Test the zero-vector fallback is counted"""
+    from app.config.metrics import ZERO_VECTOR_FALLBACKS
+    from app.recommender.content_based import get_embedding
+
+    before = _sample(ZERO_VECTOR_FALLBACKS, "_total")
+    get_embedding("   ")
+    assert _sample(ZERO_VECTOR_FALLBACKS, "_total") == before + 1
+
+
+@pytest.mark.unit
+@patch('app.recommender.content_based.embedding_provider')
+def test_embedding_failure_is_counted(mock_provider):
+    """Test API failures increment both failure and fallback counters"""
+    from app.config.metrics import EMBEDDING_FAILURES, ZERO_VECTOR_FALLBACKS
+    from app.recommender.content_based import get_embedding
+
+    mock_provider.embed.side_effect = RuntimeError("quota")
+    failures = _sample(EMBEDDING_FAILURES, "_total")
+    fallbacks = _sample(ZERO_VECTOR_FALLBACKS, "_total")
+
+    get_embedding("robotics workshop")
+
+    assert _sample(EMBEDDING_FAILURES, "_total") == failures + 1
+    assert _sample(ZERO_VECTOR_FALLBACKS, "_total") == fallbacks + 1
+
+
+@pytest.mark.unit
+def test_cache_outcomes_are_counted():
+    """Test recommendation cache hits and misses are exported"""
+    from app.config.metrics import CACHE_REQUESTS
+    from app.recommender.cache import RecommendationCache, LRUCache
+
+    cache = RecommendationCache(LRUCache())
+    hits = _sample(CACHE_REQUESTS, "_total", endpoint="metrics_test", outcome="hit")
+    misses = _sample(CACHE_REQUESTS, "_total", endpoint="metrics_test", outcome="miss")
+
+    cache.get_or_compute("metrics_test", "u1", 5, lambda: 1)
+    cache.get_or_compute("metrics_test", "u1", 5, lambda: 1)
+
+    assert _sample(CACHE_REQUESTS, "_total", endpoint="metrics_test", outcome="hit") == hits + 1
+    assert _sample(CACHE_REQUESTS, "_total", endpoint="metrics_test", outcome="miss") == misses + 1
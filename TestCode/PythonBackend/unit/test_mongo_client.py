@@ -0,0 +1,89 @@
+"""
+Tests for the shared, pooled MongoDB client factory
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+@pytest.fixture
+def mongo():
+    """app.config.mongo with a fresh client slot and a mocked MongoClient"""
+    from app.config import mongo
+
+    with patch.object(mongo, "_client", None), patch.object(mongo, "MongoClient") as mock_client_class:
+        yield mongo, mock_client_class
+
+
+@pytest.mark.unit
+def test_client_is_shared(mongo):
+    """Test every caller gets the same pooled client"""
+    module, mock_client_class = mongo
+
+    first = module.get_mongo_client()
+    second = module.get_mongo_client()
+
+    assert first is second
+    mock_client_class.assert_called_once()
+    options = mock_client_class.call_args.kwargs
+    assert options["maxPoolSize"] == module.MONGO_MAX_POOL_SIZE
+    assert options["serverSelectionTimeoutMS"] == module.MONGO_SERVER_SELECTION_TIMEOUT_MS
+
+
+@pytest.mark.unit
+def test_recommender_reads_prefer_secondaries(mongo):
+    """Test a named read preference is applied to the database handle"""
+    module, mock_client_class = mongo
+
+    module.get_db("secondaryPreferred")
+
+    kwargs = mock_client_class.return_value.get_database.call_args.kwargs
+    assert kwargs["read_preference"] is module.ReadPreference.SECONDARY_PREFERRED
+
+
+@pytest.mark.unit
+def test_unknown_read_preference_rejected(mongo):
+    """Test typos in the read preference fail loudly"""
+    module, _ = mongo
+
+    with pytest.raises(ValueError):
+        module.get_db("secondaryPrefered")
+
+
+@pytest.mark.unit
+@patch('app.config.mongo.compression_support')
+def test_missing_compressors_are_skipped(mock_support):
+    """Test compressors whose library is not installed are left out"""
+    from app.config.mongo import available_compressors
+
+    mock_support._have_zstd.return_value = False
+    mock_support._have_snappy.return_value = True
+    mock_support._have_zlib.return_value = True
+    del mock_support._have_lz4
+
+    assert available_compressors("zstd,snappy,zlib") == ["snappy", "zlib"]
+    assert available_compressors("lz4, zlib") == ["zlib"]
+
+
+@pytest.mark.unit
+def test_close_then_reconnect(mongo):
+    """Test shutdown closes the pool and a later call opens a new one"""
+    module, mock_client_class = mongo
+    first = MagicMock()
+    mock_client_class.side_effect = [first, MagicMock()]
+
+    module.get_mongo_client()
+    module.close_mongo_client()
+
+    first.close.assert_called_once()
+    assert module.get_mongo_client() is not first
+
+
+@pytest.mark.unit
+def test_reads_after_writes_use_the_primary():
+    """Test handles used right after a write stay on the primary and only bulk scans prefer secondaries"""
+    from app.config.mongo import RECOMMENDER_READ_PREFERENCE
+    from app.recommender import collaborative, content_based, demographic, materialized
+
+    for handle in (collaborative.primary_db, content_based.primary_db, demographic.primary_db, materialized.db):
+        assert "mongo:primary" in repr(handle)
+    assert f"mongo:{RECOMMENDER_READ_PREFERENCE}" in repr(materialized.scan_db)
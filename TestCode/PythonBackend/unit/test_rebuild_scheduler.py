@@ -0,0 +1,164 @@
+"""
+Tests for the single-leader periodic rebuild scheduler
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+
+
+class DuplicateKey(Exception):
+    pass
+
+
+@pytest.mark.unit
+@patch('app.recommender.utils.db')
+def test_acquire_lease_takes_free_or_own_lease(mock_db):
+    """Test the lease upsert only matches an expired lease or our own"""
+    from app.recommender.utils import acquire_lease
+
+    assert acquire_lease("periodic_rebuild", "worker-1", seconds=60) is True
+
+    query, update = mock_db.recommender_leases.update_one.call_args[0]
+    assert query["_id"] == "periodic_rebuild"
+    assert {"owner": "worker-1"} in query["$or"]
+    assert update["$set"]["owner"] == "worker-1"
+    assert mock_db.recommender_leases.update_one.call_args.kwargs["upsert"] is True
+
+
+@pytest.mark.unit
+@patch('app.recommender.utils.DuplicateKeyError', DuplicateKey)
+@patch('app.recommender.utils.db')
+def test_acquire_lease_held_by_other_worker(mock_db):
+    """Test a live lease held by another worker is not taken"""
+    from app.recommender.utils import acquire_lease
+
+    mock_db.recommender_leases.update_one.side_effect = DuplicateKey()
+
+    assert acquire_lease("periodic_rebuild", "worker-2") is False
+
+
+@pytest.mark.unit
+@patch('app.recommender.utils.job_queue')
+def test_rebuild_due(mock_queue):
+    """Test rebuild timing after no run, a recent run and a failed run"""
+    from app.recommender.utils import rebuild_due
+
+    mock_queue.last_finished.return_value = None
+    assert rebuild_due(12)
+
+    recent = datetime.now(timezone.utc) - timedelta(hours=1)
+    mock_queue.last_finished.return_value = {"status": "succeeded", "finishedAt": recent}
+    assert not rebuild_due(12)
+    assert rebuild_due(0.5)
+
+    failed = datetime.utcnow() - timedelta(hours=1)
+    mock_queue.last_finished.return_value = {"status": "failed", "finishedAt": failed}
+    assert rebuild_due(12)
+
+
+@pytest.mark.unit
+@patch('app.recommender.utils.REBUILD_LEASE_SECONDS', 0.03)
+@patch('app.recommender.utils.release_lease')
+@patch('app.recommender.utils.rebuild_due', return_value=True)
+@patch('app.recommender.utils.acquire_lease')
+@patch('app.recommender.utils.job_queue')
+def test_only_leader_queues_rebuilds(mock_queue, mock_acquire, mock_due, mock_release):
+    """Test followers never queue rebuilds and the leader releases on stop"""
+    import threading
+    from app.recommender.utils import start_periodic_rebuild
+
+    submitted = threading.Event()
+    mock_queue.submit.side_effect = lambda *args: submitted.set()
+
+    mock_acquire.return_value = False
+    stop = start_periodic_rebuild(12)
+    assert not submitted.wait(0.1)
+    stop()
+    mock_release.assert_not_called()
+
+    mock_acquire.return_value = True
+    stop = start_periodic_rebuild(12)
+    assert submitted.wait(1)
+    stop()
+    mock_queue.submit.assert_called_with("scheduled_rebuild")
+    assert mock_release.call_args[0][0] == "periodic_rebuild"
+
+
+@pytest.mark.unit
+@patch('app.recommender.utils.replay_invalidations')
+@patch('app.recommender.utils.collaborative')
+@patch('app.recommender.utils.delta_log')
+def test_delta_sync_replays_from_the_head(mock_log, mock_collab, mock_replay):
+    """Test each worker replays the log from where it started, store deltas first"""
+    import threading
+    from app.recommender.utils import start_delta_sync
+
+    replayed = threading.Event()
+    mock_log.head.return_value = 12
+    mock_replay.side_effect = lambda position: replayed.set() or position + 1
+
+    with patch('app.recommender.utils.recommendation_cache') as mock_cache:
+        mock_cache.shared = False
+        stop = start_delta_sync(0.01)
+        assert replayed.wait(1)
+        stop()
+
+    assert mock_replay.call_args_list[0].args == (12,)
+    mock_log.head.assert_called_once_with()
+    mock_collab.sync_deltas.assert_called_with()
+
+
+@pytest.mark.unit
+@patch('app.recommender.utils.precompute_all', return_value=7)
+@patch('app.recommender.utils.index_all_users')
+@patch('app.recommender.utils.index_all_events', return_value=3)
+def test_long_steps_keep_the_job_alive(mock_events, mock_users, mock_precompute):
+    """Test batches inside each step record progress, so the running job is not taken for stale"""
+    from app.recommender.utils import _scheduled_rebuild
+
+    def batches(*args, progress):
+        progress(100, 300)
+        progress(200, 300)
+
+    mock_users.side_effect = batches
+    mock_precompute.side_effect = lambda progress: batches(progress=progress) or 7
+    progress = MagicMock()
+
+    with patch('app.recommender.collaborative.COLLAB_MODEL', "knn"), \
+            patch('app.recommender.utils.recommendation_cache') as mock_cache, \
+            patch('app.recommender.utils.publish_invalidation') as mock_publish:
+        assert _scheduled_rebuild({}, progress) == {"events": 3, "materialized": 7}
+    mock_cache.invalidate.assert_called_once_with()
+    mock_publish.assert_called_once_with()
+
+    calls = [c.args for c in progress.call_args_list]
+    assert calls == [(1, 3), (1, 3), (1, 3), (2, 3), (2, 3), (2, 3), (3, 3)]
+
+
+@pytest.mark.unit
+@patch('app.recommender.utils.job_queue')
+@patch('app.recommender.utils.qdrant_client')
+def test_backfill_users_only_when_collection_empty(mock_qdrant, mock_queue):
+    """Test startup queues indexing every user only while the user collection is empty"""
+    from app.recommender.utils import backfill_users
+
+    mock_queue.submit.return_value = ({"_id": "j1"}, True)
+    mock_qdrant.count.return_value.count = 0
+    assert backfill_users() == ({"_id": "j1"}, True)
+    mock_queue.submit.assert_called_once_with("index_users")
+
+    mock_queue.submit.reset_mock()
+    mock_qdrant.count.return_value.count = 12
+    assert backfill_users() is None
+    mock_queue.submit.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.recommender.utils.index_all_users', return_value=4)
+def test_index_users_job_reports_count(mock_users):
+    """Test the backfill job indexes every user and shares the rebuild lock"""
+    from app.recommender.utils import _index_users_job
+    from app.recommender.jobs import job_queue
+
+    assert _index_users_job({}, MagicMock()) == {"users": 4}
+    assert job_queue._handlers["index_users"][1] == "rebuild"
@@ -0,0 +1,342 @@
+"""
+Tests for the recommendation response cache and single-flight coalescing
+"""
+import sys
+import threading
+import time
+from datetime import datetime
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+@pytest.mark.unit
+def test_lru_evicts_least_recently_used():
+    """Test the oldest untouched entry is evicted first"""
+    from app.recommender.cache import LRUCache
+
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == (True, 1)
+    assert cache.get("b") == (False, None)
+    assert cache.get("c") == (True, 3)
+
+
+@pytest.mark.unit
+def test_lru_expires_entries():
+    """Test entries past their TTL are misses"""
+    from app.recommender.cache import LRUCache
+
+    cache = LRUCache(max_entries=10, ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") == (False, None)
+
+
+@pytest.mark.unit
+def test_lru_delete_prefix():
+    """Test prefix deletion only drops matching keys"""
+    from app.recommender.cache import LRUCache
+
+    cache = LRUCache()
+    cache.set("rec:u1:hybrid:5", 1)
+    cache.set("rec:u1:content:5", 2)
+    cache.set("rec:u2:hybrid:5", 3)
+    cache.delete_prefix("rec:u1:")
+
+    assert len(cache) == 1
+    assert cache.get("rec:u2:hybrid:5") == (True, 3)
+
+
+@pytest.mark.unit
+def test_get_or_compute_caches_result():
+    """Test a second request is served from cache"""
+    from app.recommender.cache import RecommendationCache, LRUCache
+
+    cache = RecommendationCache(LRUCache())
+    calls = []
+    compute = lambda: calls.append(1) or {"recommendations": []}
+
+    cache.get_or_compute("hybrid", "u1", 5, compute)
+    cache.get_or_compute("hybrid", "u1", 5, compute)
+    cache.get_or_compute("hybrid", "u1", 10, compute)
+
+    assert len(calls) == 2
+    stats = cache.report()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["hit_ratio"] == round(1 / 3, 4)
+    assert stats["latency_ms"]["hit"]["p50"] is not None
+
+
+@pytest.mark.unit
+def test_invalidate_profile_only_drops_that_profile():
+    """Test profile invalidation keeps other users' entries"""
+    from app.recommender.cache import RecommendationCache, LRUCache
+
+    cache = RecommendationCache(LRUCache())
+    cache.get_or_compute("hybrid", "u1", 5, lambda: 1)
+    cache.get_or_compute("hybrid", "u2", 5, lambda: 2)
+    cache.invalidate("u1")
+
+    assert cache.get_or_compute("hybrid", "u1", 5, lambda: "fresh") == "fresh"
+    assert cache.get_or_compute("hybrid", "u2", 5, lambda: "fresh") == 2
+
+
+@pytest.mark.unit
+def test_invalidation_during_compute_is_not_cached():
+    """Test a result computed across an invalidation is not written back"""
+    from app.recommender.cache import RecommendationCache, LRUCache
+
+    cache = RecommendationCache(LRUCache())
+
+    def compute():
+        cache.invalidate()
+        return "stale"
+
+    assert cache.get_or_compute("hybrid", "u1", 5, compute) == "stale"
+    assert cache.get_or_compute("hybrid", "u1", 5, lambda: "fresh") == "fresh"
+
+
+@pytest.mark.unit
+def test_datetimes_cached_in_json_form_by_both_backends():
+    """Test a payload with datetimes caches in Redis and LRU alike and every read returns the same value"""
+    from app.recommender.cache import RecommendationCache, LRUCache, RedisCache
+
+    stored = {}
+    fake_redis = MagicMock()
+    fake_redis.Redis.from_url.return_value.get.side_effect = stored.get
+    fake_redis.Redis.from_url.return_value.set.side_effect = lambda key, value, ex: stored.__setitem__(key, value)
+    with patch.dict(sys.modules, {"redis": fake_redis}):
+        redis_backend = RedisCache("redis://cache:6379/0")
+
+    payload = {"recommendations": [{"title": "Expo", "createdAt": datetime(2026, 3, 1, 9, 30),
+                                     "timeline": [{"date": datetime(2026, 4, 2)}]}]}
+    expected = {"recommendations": [{"title": "Expo", "createdAt": "2026-03-01T09:30:00",
+                                      "timeline": [{"date": "2026-04-02T00:00:00"}]}]}
+    for backend in (LRUCache(), redis_backend):
+        cache = RecommendationCache(backend)
+        assert cache.get_or_compute("hybrid", "u1", 5, lambda: payload) == expected
+        assert cache.get_or_compute("hybrid", "u1", 5, lambda: "recomputed") == expected
+
+
+@pytest.mark.unit
+def test_single_flight_coalesces_concurrent_misses():
+    """Test a thundering herd for one key computes once"""
+    from app.recommender.cache import RecommendationCache, LRUCache
+
+    cache = RecommendationCache(LRUCache())
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("hybrid", "u1", 5, compute)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert results == ["value"] * 8
+
+
+@pytest.mark.unit
+def test_single_flight_propagates_errors():
+    """Test the leader's exception is raised and nothing is cached"""
+    from app.recommender.cache import SingleFlight
+
+    flight = SingleFlight()
+
+    def boom():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", boom)
+    assert flight.do("k", lambda: 1) == (1, False)
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.upsert_user')
+@patch('app.router.recommender_router.invalidate_recommendations')
+def test_invalidate_endpoint(mock_invalidate, mock_upsert, client):
+    """Test profile invalidation clears cache and materialized results"""
+    from app.recommender.cache import recommendation_cache
+
+    recommendation_cache.get_or_compute("hybrid", "u1", 5, lambda: {"recommendations": ["old"]})
+    response = client.post("/recommend/invalidate/u1")
+
+    assert response.status_code == 200
+    assert response.json() == {"invalidated": "u1"}
+    mock_invalidate.assert_called_once_with("u1")
+    mock_upsert.assert_called_once_with("u1")
+    assert recommendation_cache.get_or_compute("hybrid", "u1", 5, lambda: "fresh") == "fresh"
+
+
+@pytest.mark.unit
+def test_cache_stats_endpoint(client):
+    """Test cache statistics are exposed"""
+    response = client.get("/recommend/cache/stats")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert "hit_ratio" in data
+    assert set(data["latency_ms"]) == {"hit", "miss"}
+
+
+@pytest.mark.unit
+def test_invalidate_events_drops_only_entries_listing_them():
+    """Test a catalogue change only drops cached responses that include a changed event"""
+    from app.recommender.cache import RecommendationCache, LRUCache
+
+    cache = RecommendationCache(LRUCache(max_entries=10, ttl=60))
+    cache.get_or_compute("hybrid", "u1", 5, lambda: {"recommendations": [{"event": {"_id": "e1"}, "score": 1}]})
+    cache.get_or_compute("collaborative", "u2", 5, lambda: ["e2", "e1"])
+    cache.get_or_compute("hybrid", "u3", 5, lambda: {"recommendations": [{"event": {"_id": "e3"}, "score": 1}]})
+
+    cache.invalidate_events(["e1"])
+
+    assert cache.get_or_compute("hybrid", "u1", 5, lambda: "fresh") == "fresh"
+    assert cache.get_or_compute("collaborative", "u2", 5, lambda: "fresh") == "fresh"
+    assert cache.get_or_compute("hybrid", "u3", 5, lambda: "fresh") != "fresh"
+
+
+@pytest.mark.unit
+def test_redis_invalidate_events():
+    """Test the Redis backend drops only the shared entries listing a changed event"""
+    from app.recommender.cache import RecommendationCache, RedisCache
+
+    stored = {}
+    fake_redis = MagicMock()
+    client = fake_redis.Redis.from_url.return_value
+    client.get.side_effect = stored.get
+    client.set.side_effect = lambda key, value, ex: stored.__setitem__(key, value)
+    client.scan_iter.side_effect = lambda match, count: [k for k in list(stored) if k.startswith(match[:-1])]
+    client.mget.side_effect = lambda keys: [stored.get(k) for k in keys]
+    client.delete.side_effect = lambda *keys: [stored.pop(k, None) for k in keys]
+    with patch.dict(sys.modules, {"redis": fake_redis}):
+        cache = RecommendationCache(RedisCache("redis://cache:6379/0"))
+
+    cache.get_or_compute("collaborative", "u1", 5, lambda: ["e1"])
+    cache.get_or_compute("collaborative", "u2", 5, lambda: ["e2"])
+    cache.invalidate_events(["e1"])
+
+    assert sorted(stored) == ["rec:u2:collaborative:5"]
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.add_event')
+@patch('app.router.recommender_router.delete_events')
+@patch('app.router.recommender_router.invalidate_recommendations')
+@patch('app.router.recommender_router.invalidate_recommendations_with_events')
+def test_catalogue_changes_drop_lists_with_the_events(mock_with_events, mock_invalidate, mock_delete_events, mock_add, client):
+    """Test adding or removing events drops only the cached and stored lists that include them"""
+    from app.recommender.cache import recommendation_cache
+
+    mock_delete_events.return_value = {"e2": "deleted"}
+    for request, event_ids in ((lambda: client.post("/recommend/add/e1"), ["e1"]),
+                               (lambda: client.request("POST", "/recommend/bulk/delete", json={"event_ids": ["e2"]}), ["e2"])):
+        recommendation_cache.get_or_compute("collaborative", "u1", 5, lambda: event_ids)
+        recommendation_cache.get_or_compute("collaborative", "u2", 5, lambda: ["e9"])
+        mock_with_events.reset_mock()
+
+        assert request().status_code == 200
+        mock_with_events.assert_called_once_with(event_ids)
+        assert recommendation_cache.get_or_compute("collaborative", "u1", 5, lambda: "fresh") == "fresh"
+        assert recommendation_cache.get_or_compute("collaborative", "u2", 5, lambda: "fresh") == ["e9"]
+    mock_invalidate.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.index_all_events', return_value=3)
+@patch('app.router.recommender_router.add_events', return_value={"e1": "added"})
+@patch('app.router.recommender_router.invalidate_recommendations')
+@patch('app.router.recommender_router.invalidate_recommendations_with_events')
+def test_indexing_jobs_clear_cache_and_materialized(mock_with_events, mock_invalidate, mock_add_events, mock_index):
+    """Test a full rebuild drops every list and a batched job only those with its events"""
+    from app.recommender.cache import recommendation_cache
+    from app.router.recommender_router import _rebuild_job, _batched_job
+
+    recommendation_cache.get_or_compute("hybrid", "u1", 5, lambda: "old")
+    _rebuild_job({}, MagicMock())
+    mock_invalidate.assert_called_once_with()
+    assert recommendation_cache.get_or_compute("hybrid", "u1", 5, lambda: "fresh") == "fresh"
+
+    recommendation_cache.get_or_compute("collaborative", "u1", 5, lambda: ["e1"])
+    _batched_job(mock_add_events)({"event_ids": ["e1", "e1"]}, MagicMock())
+    mock_with_events.assert_called_once_with(["e1"])
+    assert recommendation_cache.get_or_compute("collaborative", "u1", 5, lambda: "fresh") == "fresh"
+
+
+@pytest.mark.unit
+@patch('app.recommender.materialized.db')
+def test_invalidate_recommendations_with_events(mock_db):
+    """Test stored lists are dropped by the events they include, through an index"""
+    from app.recommender import materialized
+
+    with patch.object(materialized, "_event_index_ready", False):
+        materialized.invalidate_recommendations_with_events(["e1", "e2"])
+        materialized.invalidate_recommendations_with_events([])
+
+    mock_db.recommendations.create_index.assert_called_once_with("recommendations.event._id")
+    mock_db.recommendations.delete_many.assert_called_once_with({"recommendations.event._id": {"$in": ["e1", "e2"]}})
+
+
+@pytest.mark.unit
+@patch('app.router.recommender_router.upsert_user')
+@patch('app.router.recommender_router.invalidate_recommendations')
+@patch('app.router.recommender_router.invalidate_recommendations_with_events')
+@patch('app.router.recommender_router.publish_invalidation')
+def test_invalidations_published_to_other_workers(mock_publish, mock_with_events, mock_invalidate, mock_upsert, client):
+    """Test profile and catalogue invalidations go to the shared log for the other workers"""
+    from app.router.recommender_router import _catalogue_changed
+
+    client.post("/recommend/invalidate/u1")
+    _catalogue_changed(["e1"])
+    _catalogue_changed()
+
+    assert [c.args for c in mock_publish.call_args_list] == [(["u1"],), (), ()]
+    assert [c.kwargs for c in mock_publish.call_args_list] == [{}, {"event_ids": ["e1"]}, {"event_ids": None}]
+
+
+@pytest.mark.unit
+@patch('app.recommender.utils.delta_log')
+def test_replay_invalidations_drops_this_workers_entries(mock_log):
+    """Test replayed deltas and invalidations from other workers drop the matching cached responses"""
+    from app.recommender import collaborative
+    from app.recommender.cache import recommendation_cache
+    from app.recommender.interactions import InteractionStore
+    from app.recommender.utils import replay_invalidations
+
+    store = InteractionStore()
+    store.remember_neighbours("u2", ["u1"])
+    mock_log.origin = "here"
+    mock_log.read.return_value = [
+        {"_id": 4, "kind": "rating", "users": ["u1"], "event_id": "e1", "rating": 5, "origin": "there"},
+        {"_id": 5, "kind": "invalidate", "users": ["u3"], "origin": "there"},
+        {"_id": 6, "kind": "invalidate", "event_ids": ["e9"], "origin": "there"},
+        {"_id": 7, "kind": "invalidate", "users": ["u5"], "origin": "here"},
+    ]
+    for profile_id in ("u1", "u2", "u3", "u4", "u5"):
+        recommendation_cache.get_or_compute("hybrid", profile_id, 5, lambda: {"recommendations": []})
+    recommendation_cache.get_or_compute("collaborative", "u6", 5, lambda: ["e9"])
+
+    with patch.object(collaborative, "interaction_store", store):
+        assert replay_invalidations(3) == 7
+
+    mock_log.read.assert_called_once_with(3)
+    fresh = lambda: "fresh"
+    assert [recommendation_cache.get_or_compute("hybrid", p, 5, fresh) for p in ("u1", "u2", "u3", "u4", "u5")] == \
+        ["fresh", "fresh", "fresh", {"recommendations": []}, {"recommendations": []}]
+    assert recommendation_cache.get_or_compute("collaborative", "u6", 5, fresh) == "fresh"
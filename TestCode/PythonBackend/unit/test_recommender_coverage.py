@@ -78,7 +78,7 @@ def test_build_event_genome(mock_db):
 
 
 @pytest.mark.unit
-@patch('app.recommender.content_based.db')
+@patch('app.recommender.content_based.primary_db')
 def test_add_event_to_collection(mock_db):
     """Test adding event to collection"""
     from app.recommender.content_based import add_event
@@ -0,0 +1,137 @@
+"""
+Tests for the startup warm-up and the /ready probe
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+@pytest.mark.unit
+def test_ready_after_all_steps_pass():
+    """Test the worker is ready once every step ran and skipped steps are reported"""
+    from app.warmup import Readiness, warm_up
+
+    state = Readiness()
+    assert not state.ready
+
+    warm_up(state, steps=[("mongo", lambda: None, True), ("agent", lambda: False, False)], retry_seconds=0)
+
+    report = state.report()
+    assert report["ready"]
+    assert report["checks"]["mongo"]["status"] == "ok"
+    assert report["checks"]["agent"]["status"] == "skipped"
+
+
+@pytest.mark.unit
+def test_optional_failure_does_not_block_readiness():
+    """Test a failed preload is reported but traffic is still accepted"""
+    from app.warmup import Readiness, warm_up
+
+    state = warm_up(
+        Readiness(),
+        steps=[("mongo", lambda: None, True), ("agent", MagicMock(side_effect=RuntimeError("no key")), False)],
+        retry_seconds=0,
+    )
+
+    assert state.ready
+    agent = state.report()["checks"]["agent"]
+    assert (agent["status"], agent["required"], agent["detail"]) == ("failed", False, "no key")
+
+
+@pytest.mark.unit
+def test_required_failure_is_retried_until_it_passes():
+    """Test a required check that fails at boot is retried and then marks the worker ready"""
+    from app.warmup import Readiness, warm_up
+
+    mongo = MagicMock(side_effect=[ConnectionError("down"), None])
+    embedding = MagicMock(return_value="Provider")
+
+    state = warm_up(
+        Readiness(),
+        steps=[("mongo", mongo, True), ("embedding_provider", embedding, True)],
+        retry_seconds=0.01,
+    )
+
+    assert state.ready
+    assert mongo.call_count == 2
+    embedding.assert_called_once()
+
+
+@pytest.mark.unit
+def test_stop_ends_retries():
+    """Test shutdown stops retrying and leaves the worker not ready"""
+    import threading
+    from app.warmup import Readiness, warm_up
+
+    stop_event = threading.Event()
+    stop_event.set()
+    state = warm_up(Readiness(), steps=[("mongo", MagicMock(side_effect=ConnectionError("down")), True)],
+                    stop_event=stop_event, retry_seconds=60)
+
+    assert not state.ready
+    assert state.failed_required() == ["mongo"]
+
+
+@pytest.mark.unit
+@patch('app.main.readiness')
+def test_ready_endpoint_status(mock_readiness, client):
+    """Test /ready answers 503 while warming up and 200 once ready"""
+    mock_readiness.report.return_value = {"ready": False, "checks": {}}
+    assert client.get("/ready").status_code == 503
+
+    mock_readiness.report.return_value = {"ready": True, "checks": {"mongo": {"status": "ok"}}}
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["checks"]["mongo"]["status"] == "ok"
+
+
+@pytest.mark.unit
+@patch('app.recommender.collaborative.INTERACTION_MATRIX_TTL_SECONDS', 60)
+@patch('app.recommender.collaborative.get_user_event_matrix')
+@patch('app.recommender.collaborative.load_interaction_store')
+def test_interaction_matrix_reused_within_ttl(mock_load, mock_build):
+    """Test a preloaded interaction matrix serves later requests"""
+    from app.recommender import collaborative
+    from app.recommender.interactions import InteractionStore
+
+    store = InteractionStore()
+    mock_load.side_effect = lambda: store.load(["u1"], ["e1"], [])
+    with patch.object(collaborative, "interaction_store", store):
+        first = collaborative.load_interaction_matrix()
+        assert collaborative.load_interaction_matrix()[0] is first[0]
+
+    mock_load.assert_called_once()
+    mock_build.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.recommender.demographic.qdrant_client')
+def test_preloaded_user_vectors_skip_qdrant(mock_qdrant):
+    """Test hot user vectors come from the in-process cache after preloading"""
+    from app.recommender import demographic
+    from app.recommender.cache import LRUCache
+
+    point = MagicMock()
+    point.vector = [0.1, 0.2]
+    point.payload = {"user_id": "u1"}
+    mock_qdrant.retrieve.return_value = [point]
+
+    with patch.object(demographic, "user_vector_cache", LRUCache(max_entries=10)):
+        assert demographic.preload_user_vectors(["u1"]) == 1
+        mock_qdrant.retrieve.reset_mock()
+
+        assert demographic.get_user_vector("u1") == [0.1, 0.2]
+        mock_qdrant.retrieve.assert_not_called()
+
+
+@pytest.mark.unit
+@patch('app.recommender.utils.backfill_users')
+def test_user_backfill_step(mock_backfill):
+    """Test the warm-up reports whether it queued the user backfill"""
+    from app import warmup
+
+    mock_backfill.return_value = ({"_id": "j1"}, True)
+    assert warmup.backfill_user_collection() == "queued job j1"
+    mock_backfill.return_value = None
+    assert warmup.backfill_user_collection() == "already indexed"
+    with patch.object(warmup, "WARMUP_BACKFILL_USERS", False):
+        assert warmup.backfill_user_collection() is False
@@ -0,0 +1,80 @@
+"""
+Offline benchmark fixtures: synthetic CEMS data in mongomock, a local
+in-memory Qdrant and a deterministic fake embedder. Nothing here touches
+the network, so results are comparable across commits and machines.
+"""
+import os
+from unittest.mock import patch
+
+import pytest
+
+from synthetic import configure_offline_environment
+
+configure_offline_environment()
+
+import mongomock
+from qdrant_client import QdrantClient
+
+from synthetic import seed_database
+from fakes import FakeEmbeddingProvider
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--interactions",
+        action="store",
+        type=int,
+        default=int(os.getenv("CEMS_BENCH_INTERACTIONS", "1000")),
+        help="Number of synthetic ratings + registrations (1k to 1M)",
+    )
+
+
+@pytest.fixture(scope="session")
+def interactions(request):
+    return request.config.getoption("--interactions")
+
+
+@pytest.fixture(scope="session")
+def cems(interactions):
+    """
+    Seeded synthetic world with every recommender module pointed at it.
+    Yields the generated documents plus the fake clients.
+    """
+    from app.recommender import collaborative, content_based, deltas, demographic, hybrid
+
+    db = mongomock.MongoClient()["main"]
+    data = seed_database(db, interactions=interactions)
+    qdrant = QdrantClient(":memory:")
+    embedder = FakeEmbeddingProvider()
+
+    patches = [
+        patch.object(collaborative, "db", db),
+        patch.object(collaborative, "primary_db", db),
+        patch.object(deltas, "db", db),
+        patch.object(content_based, "db", db),
+        patch.object(content_based, "primary_db", db),
+        patch.object(content_based, "qdrant_client", qdrant),
+        patch.object(content_based, "embedding_provider", embedder),
+        patch.object(demographic, "db", db),
+        patch.object(demographic, "primary_db", db),
+        patch.object(demographic, "qdrant_client", qdrant),
+        patch.object(demographic, "embedding_provider", embedder),
+        patch.object(hybrid, "db", db),
+    ]
+    for p in patches:
+        p.start()
+
+    content_based.index_all_events()
+    demographic.index_all_users()
+
+    yield {"db": db, "qdrant": qdrant, "embedder": embedder, **data}
+
+    for p in reversed(patches):
+        p.stop()
+
+
+@pytest.fixture(scope="session")
+def profile_ids(cems):
+    """A fixed, reproducible set of active students to recommend for."""
+    students = [u for u in cems["students"] if u["status"] == "active"]
+    return [str(u["_id"]) for u in students[:: max(1, len(students) // 20)]]
@@ -0,0 +1,73 @@
+"""
+Local stand-ins for Gemini / the embedding provider, Groq and Qdrant.
+Import after synthetic.configure_offline_environment().
+"""
+import time
+
+from app.config.embedding import EmbeddingProvider
+from app.config.qdrant import VECTOR_SIZE
+
+from synthetic import fake_embedding
+
+
+class FakeEmbeddingProvider(EmbeddingProvider):
+    """Deterministic feature-hashing embeddings with an optional per-batch delay."""
+
+    name = "fake"
+
+    def __init__(self, latency=0.0, size=VECTOR_SIZE, workers=4):
+        super().__init__(workers)
+        self.latency = latency
+        self.size = size
+        self.calls = 0
+
+    def embed_batch(self, texts):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [fake_embedding(t, self.size) for t in texts]
+
+
+class _LLMResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """
+    Stand-in for the ChatGroq client. Query-generation prompts (a message
+    list) get a fixed find query back; answer prompts (a string) get a canned
+    answer. Like the real client, invoke() blocks the calling thread.
+    """
+
+    QUERY = '{ "events": { "status": "published", "_limit": 5 } }'
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(prompt, str):
+            return _LLMResponse("Here are the upcoming published events.")
+        return _LLMResponse(self.QUERY)
+
+
+class SlowQdrant:
+    """Wraps a local QdrantClient and adds a fixed network-like delay per call."""
+
+    def __init__(self, client, latency=0.0):
+        self._client = client
+        self.latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or not self.latency:
+            return attr
+
+        def call(*args, **kwargs):
+            time.sleep(self.latency)
+            return attr(*args, **kwargs)
+        return call
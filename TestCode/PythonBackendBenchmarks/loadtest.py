@@ -0,0 +1,241 @@
+"""
+Local load-test harness for the FastAPI app in App/python_backend/app/main.py.
+
+Drives /recommend/* and /bot/query in-process through httpx's ASGI transport.
+Groq, Gemini and Qdrant are replaced with local stand-ins whose latency is
+configurable, so no real API is called. Reports throughput, p50/p95/p99
+latency per route and how long the event loop was blocked. Sync code that
+runs inside an async endpoint (for example a blocking LLM call) shows up as
+loop blocking time.
+
+Example:
+    python loadtest.py --requests 2000 --concurrency 32 \\
+        --llm-latency-ms 400 --embed-latency-ms 80 --qdrant-latency-ms 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from unittest.mock import patch
+
+from synthetic import configure_offline_environment
+
+configure_offline_environment()
+
+import httpx
+import mongomock
+from qdrant_client import QdrantClient
+
+from synthetic import seed_database
+from fakes import FakeEmbeddingProvider, FakeLLM, SlowQdrant
+
+ROUTES = ("hybrid", "content", "bot")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="total requests to send")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--mix", default="hybrid=5,content=3,bot=2",
+                        help="relative weights of hybrid / content / bot requests")
+    parser.add_argument("--interactions", type=int, default=2000, help="synthetic dataset size")
+    parser.add_argument("--profiles", type=int, default=200, help="distinct students issuing requests")
+    parser.add_argument("--embed-latency-ms", type=float, default=50.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--qdrant-latency-ms", type=float, default=3.0)
+    parser.add_argument("--no-cache", action="store_true", help="bypass the recommendation response cache")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args()
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LoopMonitor:
+    """Measures event-loop lag by scheduling a short sleep and timing the wake-up."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.blocked = 0.0
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - start - self.interval
+            if lag > 0.001:
+                self.blocked += lag
+                self.max_lag = max(self.max_lag, lag)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def build_world(args):
+    """Seed data and point every module of the app at the local stand-ins."""
+    from app.recommender import collaborative, content_based, demographic, hybrid, materialized
+    from app.recommender.cache import recommendation_cache, LRUCache
+    from app.tools import mongo_tools
+
+    db = mongomock.MongoClient()["main"]
+    data = seed_database(db, interactions=args.interactions)
+    qdrant = SlowQdrant(QdrantClient(":memory:"), args.qdrant_latency_ms / 1000)
+    embedder = FakeEmbeddingProvider(args.embed_latency_ms / 1000)
+    llm = FakeLLM(args.llm_latency_ms / 1000)
+
+    patches = [
+        patch.object(collaborative, "db", db),
+        patch.object(collaborative, "primary_db", db),
+        patch.object(content_based, "db", db),
+        patch.object(content_based, "primary_db", db),
+        patch.object(content_based, "qdrant_client", qdrant),
+        patch.object(content_based, "embedding_provider", embedder),
+        patch.object(demographic, "db", db),
+        patch.object(demographic, "primary_db", db),
+        patch.object(demographic, "qdrant_client", qdrant),
+        patch.object(demographic, "embedding_provider", embedder),
+        patch.object(hybrid, "db", db),
+        patch.object(materialized, "db", db),
+        patch.object(materialized, "scan_db", db),
+        patch.object(mongo_tools, "db", db),
+        patch.object(mongo_tools, "llm", llm),
+    ]
+    if args.no_cache:
+        # max_entries=0 evicts on every insert, so every request is a miss
+        patches.append(patch.object(recommendation_cache, "backend", LRUCache(max_entries=0)))
+    for p in patches:
+        p.start()
+
+    content_based.index_all_events()
+    demographic.index_all_users()
+
+    students = [str(u["_id"]) for u in data["students"] if u["status"] == "active"]
+    return patches, students[: args.profiles]
+
+
+def make_request(rng, routes, weights, profiles):
+    route = rng.choices(routes, weights=weights)[0]
+    profile_id = rng.choice(profiles)
+    if route == "hybrid":
+        return route, "GET", f"/recommend/hybrid/{profile_id}", None
+    if route == "content":
+        return route, "GET", f"/recommend/content-based/{profile_id}", None
+    question = rng.choice([
+        "Which events are happening this week?",
+        "Show me free robotics events",
+        "Did I register for the AI Summit?",
+    ])
+    return route, "POST", "/bot/query", {"question": question, "user_role": "student", "user_id": profile_id}
+
+
+async def run_load(args, profiles):
+    from app.main import app
+
+    weights = dict(item.split("=") for item in args.mix.split(","))
+    routes = [r for r in ROUTES if float(weights.get(r, 0)) > 0]
+    route_weights = [float(weights[r]) for r in routes]
+
+    rng = random.Random(32)
+    queue = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(make_request(rng, routes, route_weights, profiles))
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+
+        async def virtual_user():
+            while True:
+                try:
+                    route, method, url, body = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                start = time.perf_counter()
+                response = await client.request(method, url, json=body)
+                latencies[route].append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors[route] += 1
+
+        monitor = LoopMonitor()
+        monitor.start()
+        started = time.perf_counter()
+        await asyncio.gather(*[virtual_user() for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+
+    return build_report(args, latencies, errors, elapsed, monitor)
+
+
+def build_report(args, latencies, errors, elapsed, monitor):
+    def summary(samples):
+        ordered = sorted(samples)
+        ms = lambda v: None if v is None else round(v * 1000, 2)
+        return {
+            "count": len(ordered),
+            "p50_ms": ms(_percentile(ordered, 0.50)),
+            "p95_ms": ms(_percentile(ordered, 0.95)),
+            "p99_ms": ms(_percentile(ordered, 0.99)),
+            "max_ms": ms(ordered[-1] if ordered else None),
+        }
+
+    all_samples = [s for samples in latencies.values() for s in samples]
+    return {
+        "requests": len(all_samples),
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(all_samples) / elapsed, 2) if elapsed else None,
+        "overall": summary(all_samples),
+        "routes": {route: {**summary(samples), "errors": errors[route]} for route, samples in latencies.items()},
+        "event_loop": {
+            "blocked_s": round(monitor.blocked, 3),
+            "blocked_pct": round(100 * monitor.blocked / elapsed, 1) if elapsed else None,
+            "max_lag_ms": round(monitor.max_lag * 1000, 2),
+        },
+    }
+
+
+def print_report(report):
+    print(f"\n{report['requests']} requests, concurrency {report['concurrency']}, "
+          f"{report['elapsed_s']}s -> {report['throughput_rps']} req/s")
+    print(f"{'route':<10}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    rows = list(report["routes"].items()) + [("overall", {**report["overall"], "errors": sum(r["errors"] for r in report["routes"].values())})]
+    for route, r in rows:
+        print(f"{route:<10}{r['count']:>8}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}{r['errors']:>8}")
+    loop = report["event_loop"]
+    print(f"\nevent loop blocked {loop['blocked_s']}s ({loop['blocked_pct']}% of run), max lag {loop['max_lag_ms']} ms")
+
+
+def main():
+    args = parse_args()
+    patches, profiles = build_world(args)
+    try:
+        report = asyncio.run(run_load(args, profiles))
+    finally:
+        for p in reversed(patches):
+            p.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Synthetic CEMS data and a deterministic embedding function for the
+offline benchmarks.
+"""
+import hashlib
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from bson import ObjectId
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "App" / "python_backend"
+
+
+def configure_offline_environment():
+    """
+    Put the backend on sys.path and give the app modules, which build their
+    clients at import time, harmless settings that never reach real services.
+    """
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+    os.environ.setdefault("QDRANT_COLLECTION_NAME", "cems_events_bench")
+
+
+TAGS = [
+    "ai", "ml", "robotics", "web", "blockchain", "music", "dance", "drama",
+    "quiz", "finance", "design", "photography", "gaming", "security", "cloud",
+    "iot", "startup", "sports", "literature", "astronomy",
+]
+
+
+def scale_for(interactions):
+    """Derive collection sizes from the target number of interactions."""
+    return {
+        "interactions": interactions,
+        "users": max(50, interactions // 20),
+        "events": max(20, interactions // 50),
+        "colleges": max(3, interactions // 2000),
+    }
+
+
+def seed_database(db, interactions=1000, seed=18):
+    """
+    Fill `db` with colleges, users, events (with ratings), student teams and
+    registrations. About 70% of interactions are registrations (a fifth of
+    them team registrations) and 30% are ratings.
+    """
+    rng = random.Random(seed)
+    sizes = scale_for(interactions)
+    # Dates are relative to today so "upcoming" filters always have matches;
+    # everything else about the dataset is fixed by the seed.
+    now = datetime.combine(date.today(), datetime.min.time())
+
+    colleges = [
+        {"_id": ObjectId(), "name": f"College {i}", "code": f"C{i:03d}"}
+        for i in range(sizes["colleges"])
+    ]
+    db.colleges.insert_many(colleges)
+
+    users = []
+    for i in range(sizes["users"]):
+        users.append({
+            "_id": ObjectId(),
+            "role": "student" if i % 10 else rng.choice(["organizer", "sponsor"]),
+            "status": "suspended" if i % 97 == 0 else "active",
+            "email": f"user{i}@cems.test",
+            "college": rng.choice(colleges)["_id"],
+            "profile": {
+                "name": f"User {i}",
+                "areasOfInterest": rng.sample(TAGS, rng.randint(1, 4)),
+                "pastAchievements": [
+                    {"title": f"{rng.choice(TAGS)} award", "description": "won a regional contest"}
+                    for _ in range(rng.randint(0, 2))
+                ],
+            },
+        })
+    db.users.insert_many(users)
+    students = [u for u in users if u["role"] == "student"]
+
+    events = []
+    for i in range(sizes["events"]):
+        tags = rng.sample(TAGS, rng.randint(1, 3))
+        start = now + timedelta(days=rng.randint(-60, 120))
+        events.append({
+            "_id": ObjectId(),
+            "title": f"{tags[0].title()} Event {i}",
+            "description": f"A {' and '.join(tags)} event for students.",
+            "categoryTags": tags,
+            "college": rng.choice(colleges)["_id"],
+            "status": rng.choices(["published", "completed", "draft"], weights=[8, 1, 1])[0],
+            "timeline": [
+                {"title": "Round", "description": "Round", "date": start + timedelta(days=d),
+                 "duration": {"from": "10:00", "to": "12:00"}, "venue": "Hall"}
+                for d in range(rng.randint(1, 3))
+            ],
+            "config": {"isFree": rng.random() < 0.6, "fees": 0, "registrationType": "Individual"},
+            "ratings": [],
+        })
+
+    teams = []
+    for i in range(max(1, len(students) // 8)):
+        leader, *members = rng.sample(students, min(len(students), 4))
+        teams.append({
+            "_id": ObjectId(),
+            "teamName": f"Team {i}",
+            "leader": leader["_id"],
+            "members": [
+                {"member": m["_id"], "status": rng.choice(["Approved", "Approved", "Pending"])}
+                for m in members
+            ],
+        })
+    if teams:
+        db.studentteams.insert_many(teams)
+
+    registrations = []
+    n_ratings = interactions * 3 // 10
+    for _ in range(interactions - n_ratings):
+        event = rng.choice(events)
+        reg = {
+            "_id": ObjectId(),
+            "eventId": event["_id"],
+            "userId": rng.choice(students)["_id"],
+            "status": "confirmed",
+            "checkInCode": str(ObjectId()),
+        }
+        if teams and rng.random() < 0.2:
+            team = rng.choice(teams)
+            reg["userId"] = team["leader"]
+            reg["teamName"] = team["_id"]
+        registrations.append(reg)
+    db.registrations.insert_many(registrations)
+
+    for _ in range(n_ratings):
+        rng.choice(events)["ratings"].append({
+            "by": rng.choice(students)["_id"],
+            "rating": rng.randint(1, 5),
+            "review": "",
+        })
+    db.events.insert_many(events)
+
+    return {"users": users, "students": students, "events": events, "teams": teams}
+
+
+def fake_embedding(text, size):
+    """
+    Deterministic feature-hashing embedding: texts sharing words get similar
+    vectors, so nearest-neighbour results are meaningful without any model.
+    """
+    vec = np.zeros(size, dtype=np.float32)
+    for token in text.lower().split():
+        digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % size
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vec[bucket] += sign
+    norm = np.linalg.norm(vec)
+    if norm:
+        vec /= norm
+    return vec.tolist()
@@ -0,0 +1,124 @@
+"""
+Offline ALS collaborative model: quality on held-out interactions of the
+clustered matrix from test_collaborative_ann.py, training time, and serving
+latency, which should not grow with the number of users.
+
+    ALS_WORKERS=8 pytest test_als.py --benchmark-group-by=group
+"""
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from app.recommender import als, collaborative
+from app.recommender.als import AlsModel, train_als
+from app.recommender.ids import IdIndex
+from test_collaborative_ann import clustered_matrix
+
+
+def _ids(prefix, n):
+    return [f"{prefix}{i}" for i in range(n)]
+
+
+def held_out(matrix, every=25, seed=0):
+    """Remove one interaction from every `every`-th user; returns the training CSR and {user: event}."""
+    rng = np.random.default_rng(seed)
+    matrix = matrix.copy()
+    held = {}
+    for u in range(0, matrix.shape[0], every):
+        event = rng.choice(np.flatnonzero(matrix[u]))
+        held[u] = event
+        matrix[u, event] = 0
+    return sparse.csr_matrix(matrix), held
+
+
+def hit_rate(recommend, held, k=10):
+    return sum(f"e{e}" in recommend(f"u{u}", k) for u, e in held.items()) / len(held)
+
+
+@pytest.fixture(scope="module")
+def trained():
+    train, held = held_out(clustered_matrix(5000, 1500, groups=60))
+    model = AlsModel.fit(train, _ids("u", 5000), _ids("e", 1500), iterations=10)
+    return model, train, held
+
+
+def test_als_beats_popularity(trained):
+    model, train, held = trained
+    popularity = np.asarray((train != 0).sum(axis=0)).ravel()
+
+    def most_popular(profile_id, k):
+        row = int(profile_id[1:])
+        scores = popularity.astype(float)
+        scores[train[row].indices] = -1
+        return [f"e{j}" for j in np.argsort(scores)[::-1][:k]]
+
+    als_hits = hit_rate(model.recommend, held)
+    assert als_hits >= 0.5
+    assert als_hits > 2 * hit_rate(most_popular, held)
+
+
+def test_seen_events_excluded(trained):
+    model, train, _ = trained
+    for u in range(0, 5000, 500):
+        seen = {f"e{j}" for j in train[u].indices}
+        assert not seen & set(model.recommend(f"u{u}", 20))
+    assert model.recommend("unknown", 5) is None
+
+
+def test_outer_table_matches_per_batch_path():
+    train = sparse.csr_matrix(clustered_matrix(600, 200, groups=10))
+    with_table = train_als(train, iterations=3, workers=2)
+    with patch.object(als, "OUTER_TABLE_MAX_BYTES", 0):
+        per_batch = train_als(train, iterations=3, workers=2)
+    for a, b in zip(with_table, per_batch):
+        np.testing.assert_allclose(a, b, rtol=1e-3, atol=1e-5)
+
+
+def test_save_and_reload(trained, tmp_path):
+    model = trained[0]
+    path = str(tmp_path / "als")
+    model.save(path)
+
+    loaded = als.get_model(path)
+    assert isinstance(loaded.user_factors, np.memmap) and loaded.user_factors.dtype == np.float32
+    assert loaded.recommend("u7", 10) == model.recommend("u7", 10)
+    assert als.get_model(path) is loaded
+
+    # A new training run swaps every worker to the new generation
+    model.save(path)
+    assert als.get_model(path) is not loaded
+
+
+def test_served_from_recommend_collaborative(cems, profile_ids, tmp_path):
+    path = str(tmp_path / "als")
+    with patch.object(als, "ALS_MODEL_PATH", path), patch.object(collaborative, "COLLAB_MODEL", "als"):
+        result = collaborative.train_als_model()
+        assert result["interactions"] > 0
+        with patch.object(collaborative, "load_interaction_matrix", side_effect=AssertionError("fell back")):
+            recommended = collaborative.recommend_collaborative(profile_ids[0], top_k=10)
+    published = {str(e["_id"]) for e in cems["events"] if e["status"] == "published"}
+    assert recommended and set(recommended) <= published
+
+
+@pytest.mark.benchmark(group="als-train")
+def test_train_5k_users(benchmark):
+    train = sparse.csr_matrix(clustered_matrix(5000, 1500, groups=60))
+    benchmark.pedantic(train_als, args=(train,), kwargs={"iterations": 5}, rounds=1, iterations=1)
+
+
+@pytest.mark.parametrize("n_users", [2000, 20000])
+@pytest.mark.benchmark(group="als-serve")
+def test_recommend_latency(benchmark, n_users):
+    # Random factors: serving cost depends only on the array shapes
+    rng = np.random.default_rng(0)
+    n_events, factors = 2000, als.ALS_FACTORS
+    model = AlsModel(
+        rng.random((n_users, factors), dtype=np.float32), rng.random((n_events, factors), dtype=np.float32),
+        IdIndex(_ids("u", n_users)), IdIndex(_ids("e", n_events)),
+        np.arange(0, 10 * n_users + 1, 10, dtype=np.int32), rng.integers(0, n_events, 10 * n_users, dtype=np.int32),
+        None,
+    )
+    users = iter(range(10**9))
+    benchmark(lambda: model.recommend(f"u{next(users) % n_users}", 10))
@@ -0,0 +1,72 @@
+"""
+Similarity-weighted neighbour aggregation in recommend_collaborative:
+held-out hit rate for more neighbours, and the single weights @ rows product
+against the previous per-neighbour loop.
+
+    pytest test_collaborative_aggregation.py --benchmark-group-by=group
+"""
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.recommender import collaborative
+from app.recommender.collaborative import recommend_collaborative, exact_neighbours
+from test_als import held_out, hit_rate
+from test_collaborative_ann import clustered_matrix, _world
+
+
+def loop_scores(matrix, neighbours):
+    """The previous aggregation: unweighted sum of the neighbour rows, one at a time."""
+    scores = np.zeros(matrix.shape[1])
+    for u in neighbours:
+        scores += matrix[u]
+    return scores
+
+
+@pytest.fixture(scope="module")
+def held_out_world():
+    train, held = held_out(clustered_matrix(5000, 1500, groups=60))
+    return _world(train.toarray()), held
+
+
+def _hit_rate(world, held, k, min_similarity=0):
+    with patch.object(collaborative, "load_interaction_matrix", return_value=world), \
+            patch.object(collaborative, "INTERACTION_MATRIX_TTL_SECONDS", 0), \
+            patch.object(collaborative, "COLLAB_NEIGHBOURS", k), \
+            patch.object(collaborative, "COLLAB_MIN_SIMILARITY", min_similarity):
+        return hit_rate(recommend_collaborative, held)
+
+
+def test_more_weighted_neighbours_find_more_held_out_events(held_out_world):
+    world, held = held_out_world
+    assert _hit_rate(world, held, 20) > _hit_rate(world, held, 5)
+
+
+def test_threshold_drops_weak_neighbours(held_out_world):
+    matrix = held_out_world[0][0]
+    users, weights = exact_neighbours(matrix, 3, 50, min_similarity=0.5)
+    assert len(users) and np.all(weights > 0.5)
+    assert len(users) < len(exact_neighbours(matrix, 3, 50)[0])
+
+
+def test_product_matches_loop(held_out_world):
+    matrix = held_out_world[0][0]
+    users, _ = exact_neighbours(matrix, 0, 50)
+    np.testing.assert_allclose(np.ones(len(users)) @ matrix[users], loop_scores(matrix, users))
+
+
+@pytest.mark.parametrize("k", [5, 50])
+@pytest.mark.benchmark(group="collaborative-aggregation")
+def test_loop_aggregation(benchmark, held_out_world, k):
+    matrix = held_out_world[0][0]
+    users, _ = exact_neighbours(matrix, 0, k)
+    benchmark(loop_scores, matrix, users)
+
+
+@pytest.mark.parametrize("k", [5, 50])
+@pytest.mark.benchmark(group="collaborative-aggregation")
+def test_weighted_product_aggregation(benchmark, held_out_world, k):
+    matrix = held_out_world[0][0]
+    users, weights = exact_neighbours(matrix, 0, k)
+    benchmark(lambda: weights @ matrix[users])
@@ -0,0 +1,111 @@
+"""
+MinHash LSH neighbour search against exact cosine search.
+
+The seeded CEMS world has uniformly random interactions and so no real
+neighbourhoods; these tests use a clustered user x event matrix instead
+(users in taste groups that mostly interact with their group's events),
+which is what LSH relies on. Recall is measured against the exact
+recommend_collaborative results:
+
+    pytest test_collaborative_ann.py --benchmark-group-by=group
+    LSH_BANDS=48 LSH_ROWS=2 pytest test_collaborative_ann.py   # more recall, slower
+"""
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.recommender import collaborative
+from app.recommender.collaborative import recommend_collaborative, lsh_neighbours, exact_neighbours
+from app.recommender.lsh import MinHashLSH
+
+# Minimum share of the exact top-10 events that the LSH path must also return
+MIN_RECOMMENDATION_RECALL = 0.8
+
+
+def clustered_matrix(n_users, n_events, groups=40, per_user=12, noise=0.15, seed=7):
+    rng = np.random.default_rng(seed)
+    matrix = np.zeros((n_users, n_events))
+    group_events = np.array_split(rng.permutation(n_events), groups)
+    for u in range(n_users):
+        own = group_events[u % groups]
+        picks = rng.choice(own, size=min(per_user, len(own)), replace=False)
+        n_noise = rng.binomial(per_user, noise)
+        picks = np.concatenate([picks[:per_user - n_noise], rng.integers(0, n_events, n_noise)])
+        matrix[u, picks] = rng.choice([1, 1, 1, 2, 3, 4, 5], size=len(picks))
+    return matrix
+
+
+def _world(matrix):
+    users = [{"_id": f"u{i}"} for i in range(matrix.shape[0])]
+    events = [{"_id": f"e{j}"} for j in range(matrix.shape[1])]
+    return (
+        matrix,
+        {u["_id"]: i for i, u in enumerate(users)},
+        {e["_id"]: j for j, e in enumerate(events)},
+        users,
+        events,
+    )
+
+
+@pytest.fixture(scope="module")
+def small_world():
+    return _world(clustered_matrix(2000, 800))
+
+
+@pytest.fixture(scope="module")
+def large_world():
+    return _world(clustered_matrix(20000, 4000, groups=200))
+
+
+def test_lsh_recommendations_match_exact(small_world):
+    profile_ids = [f"u{i}" for i in range(0, 2000, 40)]
+    with patch.object(collaborative, "load_interaction_matrix", return_value=small_world), \
+            patch.object(collaborative, "INTERACTION_MATRIX_TTL_SECONDS", 0):
+        with patch.object(collaborative, "NEIGHBOUR_SEARCH", "exact"):
+            exact = {pid: recommend_collaborative(pid, top_k=10) for pid in profile_ids}
+        with patch.object(collaborative, "NEIGHBOUR_SEARCH", "lsh"):
+            approx = {pid: recommend_collaborative(pid, top_k=10) for pid in profile_ids}
+
+    found = sum(len(set(exact[pid]) & set(approx[pid])) for pid in profile_ids)
+    total = sum(len(exact[pid]) for pid in profile_ids)
+    assert total > 0
+    assert found / total >= MIN_RECOMMENDATION_RECALL, f"recall {found / total:.2f}"
+
+
+def test_lsh_neighbour_recall(large_world):
+    matrix = large_world[0]
+    targets = range(0, matrix.shape[0], 500)
+    found = total = 0
+    for target in targets:
+        exact = set(exact_neighbours(matrix, target, 5)[0])
+        found += len(exact & set(lsh_neighbours(matrix, target, 5)[0]))
+        total += len(exact)
+    assert found / total >= MIN_RECOMMENDATION_RECALL, f"recall {found / total:.2f}"
+
+
+def test_more_bands_more_candidates(large_world):
+    matrix = large_world[0]
+    narrow = MinHashLSH(matrix, bands=8, rows=4)
+    wide = MinHashLSH(matrix, bands=32, rows=2)
+    assert len(narrow.candidates(0)) <= len(wide.candidates(0))
+
+
+@pytest.mark.benchmark(group="collaborative-neighbours")
+def test_exact_neighbours(benchmark, large_world):
+    matrix = large_world[0]
+    targets = iter(range(10**9))
+    benchmark(lambda: exact_neighbours(matrix, next(targets) % matrix.shape[0], 5))
+
+
+@pytest.mark.benchmark(group="collaborative-neighbours")
+def test_lsh_neighbours(benchmark, large_world):
+    matrix = large_world[0]
+    lsh_neighbours(matrix, 0, 5)  # build the index outside the timed loop
+    targets = iter(range(10**9))
+    benchmark(lambda: lsh_neighbours(matrix, next(targets) % matrix.shape[0], 5))
+
+
+@pytest.mark.benchmark(group="collaborative-lsh-build")
+def test_lsh_build(benchmark, large_world):
+    benchmark.pedantic(MinHashLSH, args=(large_world[0],), rounds=3, iterations=1)
@@ -0,0 +1,230 @@
+"""
+Collaborative snapshots: a worker restoring the interaction store (and LSH
+index) from a memory-mapped snapshot gets the same matrix it would build
+from Mongo, keeps applying deltas, and starts far faster. Worker processes
+share one builder and swap generations atomically.
+
+    pytest test_collaborative_snapshot.py --benchmark-group-by=group
+"""
+import json
+import multiprocessing
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from app.recommender import collaborative, snapshot
+from app.recommender.interactions import InteractionStore
+from test_collaborative_ann import clustered_matrix
+from test_interactions import _as_dict
+
+
+@pytest.fixture
+def snapshot_env(tmp_path):
+    """Fresh module-level store and LSH cache, snapshots under tmp_path."""
+    path = str(tmp_path / "collab")
+    with patch.object(collaborative, "interaction_store", InteractionStore()), \
+            patch.object(collaborative, "_lsh_index", (None, None)), \
+            patch.object(collaborative, "INTERACTION_MATRIX_TTL_SECONDS", 300), \
+            patch.object(collaborative, "COLLAB_SNAPSHOT_PATH", path):
+        yield path
+
+
+def _restart():
+    """What a new worker process starts with."""
+    collaborative.interaction_store = InteractionStore()
+    collaborative._lsh_index = (None, None)
+    collaborative._snapshot_generation = None
+
+
+def _current_file(root, name):
+    return os.path.join(root, snapshot.current_generation(root), name)
+
+
+def test_restart_restores_same_matrix(cems, snapshot_env):
+    built, user_index, event_index, _, _ = collaborative.load_interaction_matrix()
+    expected = _as_dict(built, user_index, event_index)
+    assert os.path.exists(_current_file(snapshot_env, snapshot.META_FILE))
+
+    _restart()
+    with patch.object(collaborative, "load_interaction_store", side_effect=AssertionError("went to Mongo")):
+        matrix, user_index, event_index, _, _ = collaborative.load_interaction_matrix()
+    assert isinstance(matrix, np.memmap)
+    assert _as_dict(matrix, user_index, event_index) == expected
+
+
+def test_deltas_after_restore_stay_private(cems, snapshot_env):
+    collaborative.load_interaction_matrix()
+    on_disk = np.load(_current_file(snapshot_env, "matrix.npy"))
+
+    _restart()
+    assert collaborative.restore_snapshot()
+    store = collaborative.interaction_store
+    user, event = store.user_ids()[0], store.event_ids()[0]
+    store.set_rating(user, event, 3)
+    store.add_registration({str(ObjectId())}, event)
+
+    assert store.value(user, event) == 3
+    assert store.matrix()[0].shape[0] == on_disk.shape[0] + 1
+    # The snapshot's cells stay mapped as the base; only the deltas are in dicts
+    assert isinstance(store._base_ratings[0], np.memmap) and isinstance(store._base_registrations[0], np.memmap)
+    assert len(store._ratings) == 1 and len(store._registrations) == 1
+    # Copy-on-write: the file other workers map is unchanged
+    np.testing.assert_array_equal(np.load(_current_file(snapshot_env, "matrix.npy")), on_disk)
+
+
+def test_deltas_reach_every_worker(cems, snapshot_env):
+    collaborative.load_interaction_matrix()
+    first = collaborative.interaction_store
+    # A second worker attached to the same generation before the deltas
+    _restart()
+    collaborative.load_interaction_matrix()
+    second = collaborative.interaction_store
+
+    collaborative.interaction_store = first
+    user, event = first.user_ids()[0], first.event_ids()[0]
+    collaborative.record_interaction("rating", {user}, event, 2)
+    collaborative.record_interaction("registration", {str(ObjectId()), user}, first.event_ids()[1])
+    assert collaborative.sync_deltas() == 0
+
+    collaborative.interaction_store = second
+    assert collaborative.sync_deltas() == 2
+    # A worker started after the deltas restores the snapshot, which misses them
+    _restart()
+    collaborative.load_interaction_matrix()
+    third = collaborative.interaction_store
+
+    expected = _as_dict(*first.matrix()[:3])
+    assert expected[(user, event)] == 2
+    assert _as_dict(*second.matrix()[:3]) == expected
+    assert _as_dict(*third.matrix()[:3]) == expected
+    assert third.delta_seq == first.delta_seq
+
+
+def test_stale_or_foreign_snapshot_ignored(cems, snapshot_env):
+    collaborative.load_interaction_matrix()
+    _restart()
+    with patch.object(collaborative, "INTERACTION_MATRIX_TTL_SECONDS", 0.001):
+        assert not collaborative.restore_snapshot()
+
+    meta_path = _current_file(snapshot_env, snapshot.META_FILE)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    with open(meta_path, "w") as f:
+        json.dump({**meta, "format": snapshot.SNAPSHOT_FORMAT + 1}, f)
+    assert not collaborative.restore_snapshot()
+    # Written before the cell arrays were sorted
+    with open(meta_path, "w") as f:
+        json.dump({**meta, "store": 1}, f)
+    assert not collaborative.restore_snapshot()
+    assert not collaborative.interaction_store.loaded
+
+
+def test_lsh_index_restored(cems, snapshot_env):
+    with patch.object(collaborative, "NEIGHBOUR_SEARCH", "lsh"):
+        matrix = collaborative.load_interaction_matrix()[0]
+        before = [collaborative.get_lsh_index(matrix).candidates(i).tolist() for i in range(matrix.shape[0])]
+
+        _restart()
+        with patch.object(collaborative.MinHashLSH, "__init__", side_effect=AssertionError("rebuilt")):
+            matrix = collaborative.load_interaction_matrix()[0]
+            after = [collaborative.get_lsh_index(matrix).candidates(i).tolist() for i in range(matrix.shape[0])]
+    assert after == before
+
+
+def test_workers_swap_to_published_generation(cems, snapshot_env):
+    collaborative.load_interaction_matrix()
+    store = collaborative.interaction_store
+    old_matrix = store.matrix()[0]
+
+    # Another worker reloads from Mongo and publishes the next generation
+    user, event = store.user_ids()[0], store.event_ids()[0]
+    other = InteractionStore()
+    other.load(store.user_ids(), store.event_ids(), [(user, event, 5)], delta_seq=collaborative.delta_log.head())
+    snapshot.write_snapshot(snapshot_env, *other.snapshot_arrays())
+
+    matrix, user_index, event_index, _, _ = collaborative.load_interaction_matrix()
+    assert matrix is not old_matrix
+    assert matrix[user_index[user], event_index[event]] == 5 and np.count_nonzero(matrix) == 1
+    # A request still holding the previous generation reads it unchanged
+    assert np.count_nonzero(old_matrix) > 1
+
+
+def _build_once(root, results):
+    with snapshot.builder_lock(root):
+        if snapshot.current_generation(root) is None:
+            snapshot.write_snapshot(root, {"x": np.arange(3)}, {})
+            results.put("built")
+        else:
+            results.put("attached")
+
+
+def test_one_builder_across_processes(tmp_path):
+    root = str(tmp_path / "shared")
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_build_once, args=(root, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    outcomes = sorted(results.get(timeout=5) for _ in workers)
+    assert outcomes == ["attached"] * 3 + ["built"]
+
+
+def test_old_generations_pruned(tmp_path):
+    root = str(tmp_path / "shared")
+    for i in range(4):
+        snapshot.write_snapshot(root, {"x": np.full(3, i)}, {})
+    meta, arrays = snapshot.read_snapshot(root)
+    assert arrays["x"].tolist() == [3, 3, 3]
+    generations = [n for n in os.listdir(root) if os.path.isdir(os.path.join(root, n))]
+    assert len(generations) == 1 + snapshot.KEEP_GENERATIONS
+
+
+@pytest.fixture(scope="module")
+def large_store():
+    """A loaded store of 20k users x 4k events, ObjectId keyed like production."""
+    matrix = clustered_matrix(20000, 4000, groups=200)
+    users = [str(ObjectId()) for _ in range(matrix.shape[0])]
+    events = [str(ObjectId()) for _ in range(matrix.shape[1])]
+    rows, cols = np.nonzero(matrix)
+    store = InteractionStore()
+    store.load(users, events, ((users[i], events[j], matrix[i, j]) for i, j in zip(rows, cols)))
+    store.matrix()
+    return store
+
+
+@pytest.mark.benchmark(group="collaborative-snapshot")
+def test_write_snapshot(benchmark, large_store, tmp_path):
+    arrays, meta = large_store.snapshot_arrays()
+    benchmark.pedantic(snapshot.write_snapshot, args=(str(tmp_path / "collab"), arrays, meta), rounds=3, iterations=1)
+
+
+@pytest.mark.benchmark(group="collaborative-snapshot")
+def test_restore_from_snapshot(benchmark, large_store, tmp_path):
+    path = str(tmp_path / "collab")
+    snapshot.write_snapshot(path, *large_store.snapshot_arrays())
+
+    def restore():
+        meta, arrays = snapshot.read_snapshot(path, mmap_modes={"matrix": "c"})
+        store = InteractionStore()
+        store.restore(arrays, meta)
+        return store.matrix()
+
+    assert benchmark.pedantic(restore, rounds=5, iterations=1)[0].shape == (20000, 4000)
+
+
+@pytest.mark.benchmark(group="collaborative-snapshot")
+def test_rebuild_from_interactions(benchmark, large_store):
+    """The in-memory part of a Mongo load (no queries), for comparison."""
+    cells = large_store._ratings
+
+    def rebuild():
+        store = InteractionStore()
+        users, events = large_store.user_ids(), large_store.event_ids()
+        store.load(users, events, ((users[c >> 32], events[c & 0xFFFFFFFF], v) for c, v in cells.items()))
+        return store.matrix()
+
+    benchmark.pedantic(rebuild, rounds=3, iterations=1)
@@ -0,0 +1,73 @@
+"""
+Compact interaction-matrix index maps (IdIndex: packed ObjectIds, int32
+rows) against the {str(ObjectId): row} dicts they replace, and the float32
+matrix of the interaction store.
+"""
+import sys
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from app.recommender.collaborative import get_user_event_matrix
+from app.recommender.ids import IdIndex
+from app.recommender.interactions import InteractionStore
+
+
+@pytest.fixture(scope="module")
+def object_ids():
+    # A trailing zero byte must survive the round trip through the S12 array
+    return [str(ObjectId()) for _ in range(50000)] + ["65f0c0ffee0000000000ab00"]
+
+
+def _dict_bytes(index):
+    return sys.getsizeof(index) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in index.items())
+
+
+def test_lookups_match_dict(object_ids):
+    index = IdIndex(object_ids)
+    assert index.packed
+    assert list(index) == object_ids
+    rows = list(range(0, len(object_ids), 97)) + [len(object_ids) - 1]
+    assert all(index[object_ids[row]] == row for row in rows)
+    assert str(ObjectId()) not in index and "not-an-id" not in index and None not in index
+    with pytest.raises(KeyError):
+        index["not-an-id"]
+
+
+def test_other_ids_fall_back_to_strings():
+    index = IdIndex(["u2", "u10", "u1"])
+    assert not index.packed
+    assert dict(index) == {"u2": 0, "u10": 1, "u1": 2}
+    assert "u3" not in index
+
+
+def test_several_times_smaller_than_dict(object_ids):
+    rows = {uid: row for row, uid in enumerate(object_ids)}
+    assert IdIndex(object_ids).nbytes * 4 < _dict_bytes(rows)
+
+
+def test_store_and_mongo_build_are_float32(cems):
+    store = InteractionStore()
+    store.load(["a", "b"], ["x"], [("a", "x", 4), ("b", "x", None)])
+    matrix, user_index, _, _, _ = store.matrix()
+    assert matrix.dtype == np.float32 and matrix.tolist() == [[4.0], [1.0]]
+    assert store.matrix()[1] is user_index
+
+    matrix, user_index, event_index, users, _ = get_user_event_matrix()
+    assert matrix.dtype == np.float32
+    assert user_index.packed and user_index[str(users[3]["_id"])] == 3
+
+
+@pytest.mark.benchmark(group="id-index")
+def test_dict_lookup(benchmark, object_ids):
+    rows = {uid: row for row, uid in enumerate(object_ids)}
+    probes = iter(object_ids * 100)
+    benchmark(lambda: rows[next(probes)])
+
+
+@pytest.mark.benchmark(group="id-index")
+def test_id_index_lookup(benchmark, object_ids):
+    index = IdIndex(object_ids)
+    probes = iter(object_ids * 100)
+    benchmark(lambda: index[next(probes)])
@@ -0,0 +1,79 @@
+"""
+Cold import cost of app.main, measured in a fresh interpreter each time so
+it can gate CI: heavy optional stacks must stay out of the import path, no
+client may be created at import, and the total stays under a budget.
+
+    CEMS_IMPORT_BUDGET_MS=1500 pytest test_import_time.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from synthetic import BACKEND_DIR, configure_offline_environment
+
+IMPORT_BUDGET_MS = float(os.getenv("CEMS_IMPORT_BUDGET_MS", "2500"))
+
+# Loaded on first use (chatbot question, local embeddings), never at import
+DEFERRED_MODULES = ("sklearn", "langgraph", "langchain_core", "langchain_groq", "google.genai", "sentence_transformers")
+
+CHECK_CLIENTS = """
+import json
+import app.main
+from app.config import embedding, llm, mongo, qdrant
+print(json.dumps({
+    "qdrant": qdrant.qdrant_client.initialized,
+    "embedding": embedding.embedding_provider.initialized,
+    "llm": llm.llm.initialized,
+    "mongo": mongo._client is not None,
+}))
+"""
+
+
+def _run(*args):
+    configure_offline_environment()
+    return subprocess.run(
+        [sys.executable, *args], cwd=BACKEND_DIR, env=dict(os.environ), capture_output=True, text=True, check=True,
+    )
+
+
+def import_times():
+    """{module: cumulative microseconds} from python -X importtime."""
+    stderr = _run("-X", "importtime", "-c", "import app.main").stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.fixture(scope="module")
+def times():
+    return import_times()
+
+
+def test_heavy_modules_are_deferred(times):
+    assert "app.main" in times
+    loaded = [m for m in times if any(m == d or m.startswith(d + ".") for d in DEFERRED_MODULES)]
+    assert loaded == []
+
+
+def test_no_clients_created_at_import():
+    created = json.loads(_run("-c", CHECK_CLIENTS).stdout.strip().splitlines()[-1])
+    assert not any(created.values()), created
+
+
+def test_import_within_budget(times):
+    total_ms = times["app.main"] / 1000
+    slowest = sorted(((t, m) for m, t in times.items() if "." not in m), reverse=True)[:5]
+    assert total_ms <= IMPORT_BUDGET_MS, f"import app.main took {total_ms:.0f} ms; slowest: {slowest}"
+
+
+@pytest.mark.benchmark(group="startup")
+def test_cold_import(benchmark):
+    benchmark.pedantic(lambda: _run("-c", "import app.main"), rounds=3, iterations=1)
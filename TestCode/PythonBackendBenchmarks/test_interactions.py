@@ -0,0 +1,126 @@
+"""
+The in-memory interaction store against the full Mongo matrix build: after
+a load, and after registration/rating deltas have been applied to both the
+store and the database, the two must produce the same matrix. Each test
+runs on a store loaded from Mongo and on one restored from its snapshot
+(snapshot arrays as the base, deltas in the overlay).
+"""
+import itertools
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from bson import ObjectId
+
+from app.recommender import collaborative, snapshot
+from app.recommender.collaborative import get_user_event_matrix
+from app.recommender.interactions import InteractionStore
+
+
+def _restored(store, path):
+    snapshot.write_snapshot(path, *store.snapshot_arrays())
+    meta, arrays = snapshot.read_snapshot(path, mmap_modes={"matrix": "c"})
+    restored = InteractionStore()
+    restored.restore(arrays, meta)
+    return restored
+
+
+@pytest.fixture(params=["loaded", "restored"])
+def store(cems, request, tmp_path):
+    store = InteractionStore()
+    collaborative.load_interaction_store(store)
+    if request.param == "restored":
+        store = _restored(store, str(tmp_path / "collab"))
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(collaborative, "interaction_store", store)
+        yield store
+
+
+def _as_dict(matrix, user_index, event_index):
+    """{(user_id, event_id): value} for non-zero cells, independent of row/column order."""
+    users = {i: u for u, i in user_index.items()}
+    events = {j: e for e, j in event_index.items()}
+    rows, cols = np.nonzero(matrix)
+    return {(users[i], events[j]): matrix[i, j] for i, j in zip(rows, cols)}
+
+
+def _assert_same_as_mongo(store):
+    expected, user_index, event_index, _, _ = get_user_event_matrix()
+    actual, store_users, store_events, _, _ = store.matrix()
+    assert _as_dict(actual, store_users, store_events) == _as_dict(expected, user_index, event_index)
+
+
+def test_load_matches_matrix_build(store):
+    _assert_same_as_mongo(store)
+
+
+def test_deltas_match_matrix_build(store, cems, tmp_path):
+    db = cems["db"]
+    published = [e for e in cems["events"] if e["status"] == "published"]
+    students = cems["students"]
+
+    # Register students who are not yet registered, then rate and cancel some of them
+    existing = {(r["userId"], r["eventId"]) for r in db.registrations.find({}, {"userId": 1, "eventId": 1})}
+    new = [(u["_id"], e["_id"]) for u, e in itertools.product(students[:20], published[:10]) if (u["_id"], e["_id"]) not in existing][:30]
+    assert len(new) == 30
+    for user_id, event_id in new:
+        db.registrations.insert_one({"eventId": event_id, "userId": user_id, "status": "confirmed"})
+        store.add_registration({str(user_id)}, str(event_id))
+
+    for user_id, event_id in new[:10]:
+        db.events.update_one({"_id": event_id}, {"$push": {"ratings": {"by": user_id, "rating": 2, "createdAt": datetime.now()}}})
+        store.set_rating(str(user_id), str(event_id), 2)
+
+    for user_id, event_id in new[5:15]:
+        db.registrations.delete_one({"eventId": event_id, "userId": user_id})
+        store.remove_registration({str(user_id)}, str(event_id))
+
+    # Node posts interactions for any event; unpublished ones have no column in the full build
+    unpublished = [e for e in cems["events"] if e["status"] != "published"][:5]
+    for event in unpublished:
+        user_id = students[0]["_id"]
+        db.registrations.insert_one({"eventId": event["_id"], "userId": user_id, "status": "confirmed"})
+        new.append((user_id, event["_id"]))
+        store.add_registration({str(user_id)}, str(event["_id"]))
+        store.set_rating(str(user_id), str(event["_id"]), 2)
+
+    # A user without a row yet, so the matrix is rebuilt from the cells
+    newcomer = ObjectId()
+    db.users.insert_one({"_id": newcomer, "role": "student"})
+    db.registrations.insert_one({"eventId": published[0]["_id"], "userId": newcomer, "status": "confirmed"})
+    new.append((newcomer, published[0]["_id"]))
+    store.add_registration({str(newcomer)}, str(published[0]["_id"]))
+
+    try:
+        _assert_same_as_mongo(store)
+        # and the store's own snapshot round-trips
+        _assert_same_as_mongo(_restored(store, str(tmp_path / "again")))
+    finally:
+        db.users.delete_one({"_id": newcomer})
+        db.registrations.delete_many({"$or": [{"eventId": e, "userId": u} for u, e in new]})
+        db.events.update_many({}, {"$pull": {"ratings": {"rating": 2, "by": {"$in": [u for u, _ in new]}}}})
+
+
+@pytest.mark.benchmark(group="interactions")
+def test_apply_registration_delta(benchmark, store, cems):
+    student = str(cems["students"][0]["_id"])
+    events = itertools.cycle(str(e["_id"]) for e in cems["events"] if e["status"] == "published")
+    store.matrix()
+
+    def apply():
+        event_id = next(events)
+        store.add_registration({student}, event_id)
+        store.remove_registration({student}, event_id)
+
+    benchmark(apply)
+
+
+@pytest.mark.benchmark(group="interactions")
+def test_matrix_from_store(benchmark, store):
+    def rebuild():
+        store._matrix = None
+        return store.matrix()
+
+    matrix = benchmark(rebuild)[0]
+    assert matrix is not None
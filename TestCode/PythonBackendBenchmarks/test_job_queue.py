@@ -0,0 +1,90 @@
+"""
+Background job queue against a real (mongomock) job table: concurrent
+rebuild requests collapse into one job, a rebuild job reports progress
+over the synthetic event set, and exactly one worker holds the scheduler
+lease.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import mongomock
+import pytest
+
+from app.recommender import content_based, utils
+from app.recommender.jobs import JobQueue
+
+
+def _wait(queue, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def jobs_collection():
+    return mongomock.MongoClient()["main"]["recommender_jobs"]
+
+
+def test_concurrent_rebuilds_share_one_job(jobs_collection):
+    release, runs = threading.Event(), []
+
+    def rebuild(params, progress):
+        runs.append(1)
+        release.wait(10)
+
+    queue = JobQueue(jobs_collection, workers=2)
+    queue.register("rebuild", rebuild, dedupe=True)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        submitted = list(pool.map(lambda _: queue.submit("rebuild"), range(16)))
+    release.set()
+
+    job_ids = {job["_id"] for job, _ in submitted}
+    assert len(job_ids) == 1
+    assert sum(created for _, created in submitted) == 1
+    assert _wait(queue, job_ids.pop())["status"] == "succeeded"
+    assert runs == [1]
+
+    # once finished, the next rebuild starts a fresh job
+    job, created = queue.submit("rebuild")
+    assert created
+    _wait(queue, job["_id"])
+
+
+def test_rebuild_job_reports_progress(cems, jobs_collection):
+    queue = JobQueue(jobs_collection, workers=1)
+    queue.register("rebuild", lambda params, progress: content_based.index_all_events(progress=progress, batch_size=50))
+
+    job, _ = queue.submit("rebuild")
+    job = _wait(queue, job["_id"])
+
+    published = sum(1 for e in cems["events"] if e["status"] == "published")
+    assert job["status"] == "succeeded"
+    assert job["result"] == published
+    assert job["progress"] == {"done": published, "total": published}
+
+
+def test_single_scheduler_leader():
+    db = mongomock.MongoClient()["main"]
+    workers = [f"worker-{i}" for i in range(8)]
+    with patch.object(utils, "db", db), patch.object(utils, "_lease_index_ready", False):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            won = list(pool.map(lambda w: utils.acquire_lease("periodic_rebuild", w, seconds=60), workers))
+        assert sum(won) == 1
+        leader = workers[won.index(True)]
+
+        # the leader renews, followers keep losing until the lease lapses
+        assert utils.acquire_lease("periodic_rebuild", leader, seconds=60)
+        assert not any(utils.acquire_lease("periodic_rebuild", w) for w in workers if w != leader)
+
+        later = datetime.now(timezone.utc) + timedelta(seconds=61)
+        with patch.object(utils, "_utcnow", return_value=later):
+            assert utils.acquire_lease("periodic_rebuild", "worker-new")
+        assert not utils.acquire_lease("periodic_rebuild", leader)
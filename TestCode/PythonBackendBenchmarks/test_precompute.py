@@ -0,0 +1,52 @@
+"""
+Precompute workers: with INTERACTION_MATRIX_TTL_SECONDS=0 every user's
+hybrid recommendation rebuilt the interaction matrix from Mongo. A worker
+initialised by materialized._init_worker loads it once and reuses it, with
+the same results.
+"""
+from unittest.mock import patch
+
+import pytest
+
+from app.recommender import collaborative, materialized
+from app.recommender.interactions import InteractionStore
+
+
+@pytest.fixture
+def worker_state():
+    """The collaborative module globals a precompute worker process starts with (TTL 0)."""
+    with patch.object(collaborative, "INTERACTION_MATRIX_TTL_SECONDS", 0), \
+            patch.object(collaborative, "COLLAB_SNAPSHOT_PATH", ""), \
+            patch.object(collaborative, "interaction_store", InteractionStore()):
+        yield
+
+
+def _precompute(profile_ids):
+    return [materialized._compute_for_user((pid, 10)) for pid in profile_ids]
+
+
+@pytest.fixture
+def profile_ids(cems):
+    return [str(s["_id"]) for s in cems["students"][:20]]
+
+
+def test_initialised_worker_loads_matrix_once(cems, worker_state, profile_ids):
+    expected = _precompute(profile_ids)
+    assert all(recs is not None for _, recs in expected)
+
+    materialized._init_worker()
+    with patch.object(collaborative, "get_user_event_matrix", side_effect=AssertionError("rebuilt per user")), \
+            patch.object(collaborative, "load_interaction_store", wraps=collaborative.load_interaction_store) as load:
+        assert _precompute(profile_ids) == expected
+    load.assert_called_once()
+
+
+@pytest.mark.benchmark(group="precompute")
+def test_precompute_rebuilding_matrix(benchmark, cems, worker_state, profile_ids):
+    benchmark.pedantic(_precompute, args=(profile_ids,), rounds=3, iterations=1)
+
+
+@pytest.mark.benchmark(group="precompute")
+def test_precompute_initialised_worker(benchmark, cems, worker_state, profile_ids):
+    materialized._init_worker()
+    benchmark.pedantic(_precompute, args=(profile_ids,), rounds=3, iterations=1)
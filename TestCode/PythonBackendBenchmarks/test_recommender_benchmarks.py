@@ -0,0 +1,114 @@
+"""
+Benchmarks for the recommender entry points.
+
+Run from this directory:
+    pytest --benchmark-autosave
+and compare against earlier runs with:
+    pytest --benchmark-compare --benchmark-compare-fail=mean:20%
+"""
+import itertools
+from datetime import datetime
+
+import pytest
+
+from app.recommender import content_based
+from app.recommender.collaborative import get_user_event_matrix, recommend_collaborative
+from app.recommender.content_based import (
+    recommend_events_for_user, index_all_events, get_registered_event_ids,
+    add_event, add_events, delete_events,
+)
+from app.recommender.demographic import recommend_demographic
+from app.recommender.hybrid import recommend_hybrid
+
+
+def _cycle(profile_ids):
+    ids = itertools.cycle(profile_ids)
+    return lambda: next(ids)
+
+
+@pytest.mark.benchmark(group="collaborative")
+def test_get_user_event_matrix(benchmark, cems):
+    matrix, user_index, event_index, users, events = benchmark(get_user_event_matrix)
+    assert matrix.shape == (len(users), len(events))
+
+
+@pytest.mark.benchmark(group="collaborative")
+def test_recommend_collaborative(benchmark, cems, profile_ids):
+    next_id = _cycle(profile_ids)
+    result = benchmark(lambda: recommend_collaborative(next_id(), top_k=10))
+    assert isinstance(result, list)
+
+
+@pytest.mark.benchmark(group="content")
+def test_recommend_events_for_user(benchmark, cems, profile_ids):
+    next_id = _cycle(profile_ids)
+    result = benchmark(lambda: recommend_events_for_user(next_id(), top_k=10))
+    assert isinstance(result, list)
+
+
+def test_content_excludes_registered_events(cems, profile_ids):
+    for profile_id in profile_ids:
+        registered = set(get_registered_event_ids(profile_id))
+        result = recommend_events_for_user(profile_id, top_k=10)
+        assert not registered & {item["event"]["_id"] for item in result}
+
+
+@pytest.mark.benchmark(group="content")
+def test_recommend_events_filtered(benchmark, cems, profile_ids):
+    next_id = _cycle(profile_ids)
+    result = benchmark(lambda: recommend_events_for_user(next_id(), top_k=10, upcoming=True, free_only=True))
+    now = datetime.now()
+    for item in result:
+        event = item["event"]
+        assert event["status"] == "published" and event["config"]["isFree"]
+        assert max(step["date"] for step in event["timeline"]) >= now
+
+
+@pytest.mark.benchmark(group="content")
+def test_index_all_events(benchmark, cems):
+    benchmark.pedantic(index_all_events, rounds=3, iterations=1)
+
+
+def _published_ids(cems, n=50):
+    return [str(e["_id"]) for e in cems["events"] if e["status"] == "published"][:n]
+
+
+@pytest.mark.benchmark(group="content-bulk")
+def test_add_events_bulk(benchmark, cems):
+    ids = _published_ids(cems)
+    results = benchmark(add_events, ids)
+    assert set(results.values()) == {"added"}
+
+
+@pytest.mark.benchmark(group="content-bulk")
+def test_add_event_one_by_one(benchmark, cems):
+    ids = _published_ids(cems)
+    benchmark(lambda: [add_event(eid) for eid in ids])
+
+
+def test_bulk_delete_then_add_roundtrip(cems):
+    ids = _published_ids(cems, 5)
+    qdrant = cems["qdrant"]
+    before = qdrant.count(content_based.COLLECTION_NAME).count
+
+    assert delete_events(ids) == {eid: "deleted" for eid in ids}
+    assert delete_events(ids) == {eid: "not_indexed" for eid in ids}
+    assert qdrant.count(content_based.COLLECTION_NAME).count == before - len(ids)
+
+    assert add_events(ids) == {eid: "added" for eid in ids}
+    assert add_events(ids) == {eid: "added" for eid in ids}
+    assert qdrant.count(content_based.COLLECTION_NAME).count == before
+
+
+@pytest.mark.benchmark(group="demographic")
+def test_recommend_demographic(benchmark, cems, profile_ids):
+    next_id = _cycle(profile_ids)
+    result = benchmark(lambda: recommend_demographic(next_id(), top_k=10))
+    assert isinstance(result, list)
+
+
+@pytest.mark.benchmark(group="hybrid")
+def test_recommend_hybrid(benchmark, cems, profile_ids):
+    next_id = _cycle(profile_ids)
+    result = benchmark(lambda: recommend_hybrid(next_id(), top_k=10))
+    assert isinstance(result, list)
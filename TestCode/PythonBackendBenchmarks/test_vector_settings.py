@@ -0,0 +1,16 @@
+"""
+Sanity checks for the vector_settings.py recall / memory simulation.
+"""
+from vector_settings import evaluate, synthetic_vectors
+
+
+def test_quantization_tradeoffs():
+    events, queries = synthetic_vectors(600, 40)
+    rows = evaluate(events, queries, k=10, dims=(768, 256), quantizations=("none", "scalar", "binary"))
+    by = {(r["dim"], r["quantization"], r["rescore"]): r for r in rows}
+
+    assert by[(768, "none", False)]["recall@10"] == 1.0
+    for quantization in ("scalar", "binary"):
+        assert by[(768, quantization, True)]["recall@10"] >= by[(768, quantization, False)]["recall@10"]
+    assert by[(256, "none", False)]["ram_mb"] < by[(768, "none", False)]["ram_mb"]
+    assert by[(768, "binary", False)]["ram_mb"] < by[(768, "scalar", False)]["ram_mb"]
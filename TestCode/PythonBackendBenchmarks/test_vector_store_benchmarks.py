@@ -0,0 +1,257 @@
+"""
+In-process LocalVectorStore vs Qdrant on the synthetic event and user
+collections: search latency, filtered search latency, startup load time,
+plus a parity check that both return the same neighbours. Also the local
+store's persistence: upserts appended to a log, several processes sharing
+one path, and the cost of a single-point upsert into a large collection.
+"""
+import itertools
+import json
+import multiprocessing
+import os
+import uuid
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+from app.config import vector_store
+from app.config.qdrant import COLLECTION_NAME, USER_COLLECTION_NAME
+from app.config.vector_store import LocalVectorStore
+
+BACKENDS = ["qdrant", "local", "local-mmap"]
+
+STUDENT_FILTER = qmodels.Filter(
+    must=[
+        qmodels.FieldCondition(key="role", match=qmodels.MatchValue(value="student")),
+        qmodels.FieldCondition(key="status", match=qmodels.MatchValue(value="active")),
+    ],
+)
+
+
+def _dump(client, collection_name):
+    points, _ = client.scroll(collection_name, limit=1_000_000, with_payload=True, with_vectors=True)
+    return [qmodels.PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points]
+
+
+def _fill(client, snapshot):
+    for name, points in snapshot.items():
+        client.create_collection(name, vectors_config=qmodels.VectorParams(size=len(points[0].vector), distance="Cosine"))
+        client.upsert(name, points=points)
+    return client
+
+
+@pytest.fixture(scope="session")
+def snapshot(cems):
+    return {name: _dump(cems["qdrant"], name) for name in (COLLECTION_NAME, USER_COLLECTION_NAME)}
+
+
+@pytest.fixture(scope="session")
+def stores(snapshot, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("vector_store"))
+    _fill(LocalVectorStore(path), snapshot)
+    return {
+        "qdrant": _fill(QdrantClient(":memory:"), snapshot),
+        "local": LocalVectorStore(path),
+        "local-mmap": LocalVectorStore(path, mmap=True),
+    }
+
+
+@pytest.fixture(scope="session")
+def queries(snapshot):
+    return [p.vector for p in snapshot[USER_COLLECTION_NAME][:20]]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.benchmark(group="vector-store-search")
+def test_event_search(benchmark, stores, queries, backend):
+    client, query = stores[backend], itertools.cycle(queries)
+    hits = benchmark(lambda: client.search(COLLECTION_NAME, query_vector=next(query), limit=10))
+    assert len(hits) == 10
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.benchmark(group="vector-store-filtered")
+def test_filtered_user_search(benchmark, stores, queries, backend):
+    client, query = stores[backend], itertools.cycle(queries)
+    hits = benchmark(lambda: client.search(USER_COLLECTION_NAME, query_vector=next(query),
+                                           query_filter=STUDENT_FILTER, limit=5))
+    assert all(h.payload["role"] == "student" for h in hits)
+
+
+@pytest.mark.parametrize("mmap", [False, True], ids=["local", "local-mmap"])
+@pytest.mark.benchmark(group="vector-store-load")
+def test_local_store_startup(benchmark, snapshot, tmp_path, mmap):
+    path = str(tmp_path)
+    _fill(LocalVectorStore(path), snapshot)
+    store = benchmark(lambda: LocalVectorStore(path, mmap=mmap))
+    assert store.count(COLLECTION_NAME).count == len(snapshot[COLLECTION_NAME])
+
+
+@pytest.mark.benchmark(group="vector-store-load")
+def test_qdrant_local_mode_startup(benchmark, snapshot, tmp_path):
+    path = str(tmp_path)
+    client = _fill(QdrantClient(path=path), snapshot)
+    client.close()
+
+    def load():
+        c = QdrantClient(path=path)
+        n = c.count(COLLECTION_NAME).count
+        c.close()
+        return n
+
+    assert benchmark(load) == len(snapshot[COLLECTION_NAME])
+
+
+@pytest.mark.parametrize("backend", ["local", "local-mmap"])
+def test_local_store_matches_qdrant(stores, queries, backend):
+    qdrant, local = stores["qdrant"], stores[backend]
+    exclude = qmodels.Filter(must_not=[qmodels.FieldCondition(key="status", match=qmodels.MatchValue(value="suspended"))])
+    for query in queries:
+        for name, flt in ((COLLECTION_NAME, None), (USER_COLLECTION_NAME, STUDENT_FILTER), (USER_COLLECTION_NAME, exclude)):
+            expected = qdrant.search(name, query_vector=query, query_filter=flt, limit=10)
+            actual = local.search(name, query_vector=query, query_filter=flt, limit=10)
+            assert [round(h.score, 4) for h in actual] == [round(h.score, 4) for h in expected]
+            # Synthetic users with identical genomes tie; only the order within a tie may differ
+            cutoff = round(expected[-1].score, 4) if expected else None
+            assert ({h.id for h in actual if round(h.score, 4) != cutoff}
+                    == {h.id for h in expected if round(h.score, 4) != cutoff})
+
+
+@pytest.mark.parametrize("backend", ["local", "local-mmap"])
+def test_local_store_scroll_matches_qdrant(stores, backend):
+    def scroll_all(client):
+        seen, offset = [], None
+        while True:
+            points, offset = client.scroll(USER_COLLECTION_NAME, scroll_filter=STUDENT_FILTER, limit=7, offset=offset)
+            seen.extend(p.id for p in points)
+            if offset is None:
+                return seen
+
+    assert sorted(scroll_all(stores[backend])) == sorted(scroll_all(stores["qdrant"]))
+
+
+def _points(n, size=8, seed=0, start=0):
+    rng = np.random.default_rng(seed)
+    return [qmodels.PointStruct(id=start + i, vector=rng.normal(size=size).tolist(), payload={"n": start + i})
+            for i in range(n)]
+
+
+def _new_store(path, **kwargs):
+    store = LocalVectorStore(path, sync_seconds=0, **kwargs)
+    store.create_collection("c", vectors_config=qmodels.VectorParams(size=8, distance="Cosine"))
+    return store
+
+
+def _state(store):
+    points, _ = store.scroll("c", limit=1_000_000, with_vectors=True)
+    return {p.id: (p.payload, np.round(p.vector, 5).tolist()) for p in points}
+
+
+@pytest.mark.parametrize("mmap", [False, True], ids=["local", "local-mmap"])
+def test_upserts_logged_then_compacted(tmp_path, mmap):
+    path = str(tmp_path)
+    store = _new_store(path, mmap=mmap)
+    for point in _points(50):
+        store.upsert("c", points=[point])
+    store.upsert("c", points=_points(5, seed=1))  # overwrites 0..4
+    directory = os.path.join(path, "c")
+    with open(os.path.join(directory, "points.json")) as f:
+        assert json.load(f)["ids"] == []
+    assert _state(LocalVectorStore(path, mmap=mmap)) == _state(store)
+
+    with patch.object(vector_store, "COMPACT_MIN_ROWS", 10):
+        store.upsert("c", points=_points(60, start=50))
+    with open(os.path.join(directory, "points.json")) as f:
+        assert len(json.load(f)["ids"]) == 110
+    assert os.path.getsize(os.path.join(directory, "updates.jsonl")) == 0
+    assert _state(LocalVectorStore(path, mmap=mmap)) == _state(store)
+
+
+def test_workers_see_each_others_writes(tmp_path):
+    path = str(tmp_path)
+    first = _new_store(path)
+    second = LocalVectorStore(path, sync_seconds=0)
+
+    first.upsert("c", points=_points(3))
+    second.upsert("c", points=_points(2, seed=1, start=2))
+    assert _state(first) == _state(second) and len(_state(first)) == 4
+
+    first.delete("c", points_selector=[0])
+    assert second.count("c").count == 3
+    first.delete_collection("c")
+    assert [c.name for c in second.get_collections().collections] == []
+    with pytest.raises(ValueError):
+        second.search("c", query_vector=[1.0] * 8)
+
+
+def test_checks_for_other_writers_are_throttled(tmp_path):
+    path = str(tmp_path)
+    writer = _new_store(path)
+    reader = LocalVectorStore(path, sync_seconds=3600)
+    assert reader.count("c").count == 0
+    writer.upsert("c", points=_points(3))
+    assert reader.count("c").count == 0
+    reader.sync_seconds = 0
+    assert reader.count("c").count == 3
+
+
+def test_partial_log_tail_from_dead_writer_ignored(tmp_path):
+    path = str(tmp_path)
+    store = _new_store(path)
+    store.upsert("c", points=_points(3))
+    directory = os.path.join(path, "c")
+    with open(os.path.join(directory, "updates.f32"), "ab") as f:
+        f.write(b"\0" * 12)
+    with open(os.path.join(directory, "updates.jsonl"), "ab") as f:
+        f.write(b'{"generation": "x", "off')
+
+    assert _state(LocalVectorStore(path)) == _state(store)
+    store.upsert("c", points=_points(2, seed=1, start=3))
+    assert _state(LocalVectorStore(path)) == _state(store) and len(_state(store)) == 5
+
+
+@pytest.mark.parametrize("condition", [
+    qmodels.FieldCondition(key="title", match=qmodels.MatchText(text="x")),
+    qmodels.FieldCondition(key="tags", values_count=qmodels.ValuesCount(gte=1)),
+], ids=["match-text", "values-count"])
+def test_unsupported_filter_rejected(condition):
+    store = _new_store(None)
+    store.upsert("c", points=_points(3))
+    with pytest.raises(ValueError, match=f"'{condition.key}'"):
+        store.search("c", query_vector=[1.0] * 8, query_filter=qmodels.Filter(must=[condition]))
+
+
+def _upsert_one_by_one(path, start):
+    store = LocalVectorStore(path, sync_seconds=0)
+    for point in _points(100, seed=start, start=start):
+        store.upsert("c", points=[point])
+
+
+def test_concurrent_writer_processes(tmp_path):
+    path = str(tmp_path)
+    _new_store(path)
+    with patch.object(vector_store, "COMPACT_MIN_ROWS", 50):
+        workers = [multiprocessing.Process(target=_upsert_one_by_one, args=(path, start)) for start in (0, 1000, 2000)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(60)
+    assert sorted(_state(LocalVectorStore(path))) == sorted(range(0, 100)) + sorted(range(1000, 1100)) + sorted(range(2000, 2100))
+
+
+@pytest.fixture(scope="module")
+def large_store(tmp_path_factory):
+    store = LocalVectorStore(str(tmp_path_factory.mktemp("upsert")), sync_seconds=0)
+    store.create_collection("c", vectors_config=qmodels.VectorParams(size=384, distance="Cosine"))
+    store.upsert("c", points=_points(50000, size=384))
+    return store
+
+
+@pytest.mark.benchmark(group="vector-store-upsert")
+def test_single_point_upsert(benchmark, large_store):
+    vector = np.random.default_rng(1).normal(size=384).tolist()
+    benchmark(lambda: large_store.upsert("c", points=[qmodels.PointStruct(id=str(uuid.uuid4()), vector=vector, payload={})]))
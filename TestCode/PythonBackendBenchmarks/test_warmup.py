@@ -0,0 +1,70 @@
+"""
+Startup warm-up against the synthetic world: the steps that touch data
+(vector store, interaction matrix, hot user vectors) must pass, and the
+first requests after warm-up must not pay for building the matrix or
+fetching user vectors.
+"""
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from app import warmup
+from app.recommender import collaborative, demographic, materialized
+from app.recommender.cache import LRUCache
+from app.recommender.interactions import InteractionStore
+from app.recommender.collaborative import recommend_collaborative
+from app.recommender.materialized import materialize
+
+
+@pytest.fixture
+def warm(cems, profile_ids):
+    """Matrix cache and user vector cache enabled, with materialized recommendations for profile_ids."""
+    with patch.object(materialized, "db", cems["db"]), \
+            patch.object(collaborative, "INTERACTION_MATRIX_TTL_SECONDS", 300), \
+            patch.object(collaborative, "interaction_store", InteractionStore()), \
+            patch.object(demographic, "USER_VECTOR_CACHE_SIZE", len(profile_ids)), \
+            patch.object(demographic, "user_vector_cache", LRUCache(max_entries=len(profile_ids))):
+        for pid in profile_ids:
+            materialize(pid, [], 10)
+        yield cems
+        cems["db"].recommendations.delete_many({})
+
+
+def _steps():
+    # Mongo is mongomock and the agent needs an LLM key, so only the data steps run here
+    return [step for step in warmup.WARMUP_STEPS if step[0] in ("vector_store", "interaction_matrix", "user_vectors")]
+
+
+def test_warm_up_preloads(warm, profile_ids):
+    state = warmup.warm_up(warmup.Readiness(), steps=_steps(), retry_seconds=0)
+
+    report = state.report()
+    assert report["ready"], report
+    assert {c["status"] for c in report["checks"].values()} == {"ok"}
+    assert len(demographic.user_vector_cache) == len(profile_ids)
+
+    rebuilt = MagicMock(side_effect=AssertionError("rebuilt"))
+    with patch.object(collaborative, "get_user_event_matrix", rebuilt), \
+            patch.object(collaborative, "load_interaction_store", rebuilt):
+        recommend_collaborative(profile_ids[0], top_k=10)
+
+    with patch.object(demographic, "qdrant_client", MagicMock()) as qdrant:
+        demographic.get_user_vector(profile_ids[0])
+        qdrant.retrieve.assert_not_called()
+
+
+@pytest.mark.benchmark(group="warmup")
+def test_warm_up(benchmark, warm):
+    def run():
+        collaborative.interaction_store.clear()
+        demographic.user_vector_cache.delete_prefix("")
+        return warmup.warm_up(warmup.Readiness(), steps=_steps(), retry_seconds=0)
+
+    assert benchmark(run).ready
+
+
+@pytest.mark.benchmark(group="warmup")
+def test_recommend_collaborative_after_warm_up(benchmark, warm, profile_ids):
+    warmup.warm_up(warmup.Readiness(), steps=_steps(), retry_seconds=0)
+    result = benchmark(lambda: recommend_collaborative(profile_ids[0], top_k=10))
+    assert isinstance(result, list)
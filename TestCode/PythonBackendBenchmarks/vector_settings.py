@@ -0,0 +1,211 @@
+"""
+Recall@k vs latency vs memory for event-collection settings.
+
+Compares Matryoshka dimensionality (truncate + renormalize), scalar / binary
+quantization and rescoring against exact full-dimension cosine search.
+
+By default every setting is simulated in NumPy on synthetic dense vectors
+whose leading dimensions carry most of the signal (as in Matryoshka-trained
+models like gemini-embedding-001). Pass --vectors with a .npy matrix
+exported from the real embedding provider for numbers that transfer, and
+--qdrant-url to also measure latency on a real Qdrant server with the
+app's collection_config() / search_params().
+
+Example:
+    python vector_settings.py --events 5000 --dims 768,512,256
+    python vector_settings.py --vectors events.npy --qdrant-url http://localhost:6333 --json
+"""
+import argparse
+import json
+import time
+import uuid
+
+from synthetic import configure_offline_environment
+
+configure_offline_environment()
+
+import numpy as np
+
+from app.config.qdrant import collection_config, search_params
+
+QUANTIZED_BYTES = {"none": lambda d: 0, "scalar": lambda d: d, "binary": lambda d: (d + 7) // 8}
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000, help="synthetic collection size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10, help="recall@k")
+    parser.add_argument("--dims", default="768,512,256")
+    parser.add_argument("--quantization", default="none,scalar,binary")
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--hnsw-m", type=int, default=16, help="used for the HNSW memory estimate")
+    parser.add_argument("--on-disk", action="store_true", help="original vectors on disk (excluded from RAM)")
+    parser.add_argument("--vectors", help=".npy matrix of real event embeddings (rows are events)")
+    parser.add_argument("--qdrant-url", help="also measure on this Qdrant server")
+    parser.add_argument("--json", action="store_true")
+    return parser.parse_args()
+
+
+def _normalize(x):
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.where(norms == 0, 1, norms)
+
+
+def synthetic_vectors(n, queries, size=768, clusters=60, seed=37):
+    """Clustered unit vectors with variance decaying over the dimensions."""
+    rng = np.random.default_rng(seed)
+    scale = 1 / np.sqrt(1 + np.arange(size) / 64)
+    centres = rng.normal(size=(clusters, size)) * scale
+    events = centres[rng.integers(clusters, size=n)] + 0.7 * rng.normal(size=(n, size)) * scale
+    asks = centres[rng.integers(clusters, size=queries)] + 0.9 * rng.normal(size=(queries, size)) * scale
+    return _normalize(events).astype(np.float32), _normalize(asks).astype(np.float32)
+
+
+def top_k(scores, k):
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, part, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(part, order, axis=1)
+
+
+def recall(found, truth):
+    k = truth.shape[1]
+    return float(np.mean([len(set(f[:k]) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+class Simulated:
+    """NumPy model of Qdrant's scalar (int8, 0.99 quantile) and binary quantization."""
+
+    def __init__(self, events, quantization):
+        self.events = events
+        self.quantization = quantization
+        if quantization == "scalar":
+            lo, hi = np.quantile(events, [0.005, 0.995])
+            step = (hi - lo) / 255
+            codes = np.clip(np.round((events - lo) / step), 0, 255).astype(np.uint8)
+            self.approx = (codes * step + lo).astype(np.float32)
+        elif quantization == "binary":
+            self.bits = np.packbits(events > 0, axis=1)
+
+    def approx_scores(self, queries):
+        if self.quantization == "scalar":
+            return queries @ self.approx.T
+        if self.quantization == "binary":
+            q_bits = np.packbits(queries > 0, axis=1)
+            hamming = POPCOUNT[q_bits[:, None, :] ^ self.bits[None, :, :]].sum(axis=2, dtype=np.int32)
+            return -hamming.astype(np.float32)
+        return queries @ self.events.T
+
+    def search(self, queries, k, rescore, oversampling):
+        scores = self.approx_scores(queries)
+        if self.quantization == "none" or not rescore:
+            return top_k(scores, k)
+        candidates = top_k(scores, min(len(self.events), int(np.ceil(k * oversampling))))
+        exact = np.einsum("qd,qcd->qc", queries, self.events[candidates])
+        return np.take_along_axis(candidates, top_k(exact, k), axis=1)
+
+
+def memory_mb(n, dim, quantization, hnsw_m, on_disk):
+    floats = 0 if on_disk else n * dim * 4
+    links = n * hnsw_m * 2 * 4  # level-0 HNSW graph, u32 neighbour ids
+    return round((floats + n * QUANTIZED_BYTES[quantization](dim) + links) / 2**20, 2)
+
+
+def run_qdrant(url, events, queries, truth, dim, quantization, rescore, args):
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models as qmodels
+
+    client = QdrantClient(url=url, timeout=60)
+    name = f"cems_settings_{dim}_{quantization}_{uuid.uuid4().hex[:6]}"
+    try:
+        client.create_collection(
+            collection_name=name,
+            optimizers_config=qmodels.OptimizersConfigDiff(indexing_threshold=0),
+            **collection_config(size=dim, quantization=quantization, on_disk=args.on_disk, hnsw_m=args.hnsw_m),
+        )
+        for start in range(0, len(events), 256):
+            client.upsert(name, wait=True, points=[
+                qmodels.PointStruct(id=i, vector=v.tolist())
+                for i, v in enumerate(events[start:start + 256], start)
+            ])
+        while client.get_collection(name).status != qmodels.CollectionStatus.GREEN:
+            time.sleep(0.2)
+
+        params = search_params(quantization=quantization, rescore=rescore, oversampling=args.oversampling)
+        found, latencies = [], []
+        for q in queries:
+            start = time.perf_counter()
+            hits = client.search(name, query_vector=q.tolist(), limit=args.k, search_params=params)
+            latencies.append(time.perf_counter() - start)
+            found.append([h.id for h in hits])
+        latencies.sort()
+        return {
+            "qdrant_recall": round(recall(found, truth), 4),
+            "qdrant_p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+            "qdrant_p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 3),
+        }
+    finally:
+        client.delete_collection(name)
+
+
+def evaluate(events, queries, k=10, dims=(768,), quantizations=("none",), oversampling=2.0,
+             hnsw_m=16, on_disk=False, qdrant_url=None, args=None):
+    truth = top_k(queries @ events.T, k)
+    rows = []
+    for dim in dims:
+        ev, qs = _normalize(events[:, :dim]), _normalize(queries[:, :dim])
+        for quantization in quantizations:
+            index = Simulated(ev, quantization)
+            for rescore in ([False] if quantization == "none" else [False, True]):
+                start = time.perf_counter()
+                found = index.search(qs, k, rescore, oversampling)
+                elapsed = time.perf_counter() - start
+                row = {
+                    "dim": dim,
+                    "quantization": quantization,
+                    "rescore": rescore,
+                    f"recall@{k}": round(recall(found, truth), 4),
+                    "numpy_ms_per_query": round(elapsed / len(qs) * 1000, 4),
+                    "ram_mb": memory_mb(len(ev), dim, quantization, hnsw_m, on_disk),
+                }
+                if qdrant_url:
+                    row.update(run_qdrant(qdrant_url, ev, qs, truth, dim, quantization, rescore, args))
+                rows.append(row)
+    return rows
+
+
+def print_rows(rows):
+    headers = list(rows[0])
+    widths = [max(len(h), *(len(str(r[h])) for r in rows)) + 2 for h in headers]
+    print("".join(h.rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("".join(str(row[h]).rjust(w) for h, w in zip(headers, widths)))
+
+
+def main():
+    args = parse_args()
+    if args.vectors:
+        events = _normalize(np.load(args.vectors).astype(np.float32))
+        rng = np.random.default_rng(37)
+        picks = rng.choice(len(events), size=min(args.queries, len(events)), replace=False)
+        queries = _normalize(events[picks] + 0.05 * rng.normal(size=events[picks].shape).astype(np.float32))
+    else:
+        events, queries = synthetic_vectors(args.events, args.queries)
+
+    dims = [d for d in map(int, args.dims.split(",")) if d <= events.shape[1]]
+    rows = evaluate(
+        events, queries, k=args.k, dims=dims, quantizations=args.quantization.split(","),
+        oversampling=args.oversampling, hnsw_m=args.hnsw_m, on_disk=args.on_disk,
+        qdrant_url=args.qdrant_url, args=args,
+    )
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{len(events)} events x {events.shape[1]} dims, {len(queries)} queries, "
+              f"ground truth = exact cosine at {events.shape[1]} dims")
+        print_rows(rows)
+
+
+if __name__ == "__main__":
+    main()